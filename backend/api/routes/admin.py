@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from supabase import Client
+from typing import Any, Callable, Dict, List
+from datetime import date, timedelta
+import asyncio
+
+from api.schemas.admin_schemas import LLMUsageBreakdown, LLMUsageReport, PlanCacheStats, SubtaskDraftStats
+from services.supabase_service import get_supabase_client
+from services.auth_service import get_user_from_token
+from services.llm_metering import llm_meter
+from services.plan_cache_service import plan_cache
+from services.subtask_draft_service import subtask_drafts, ENDPOINT as SPECULATIVE_ENDPOINT
+from config import settings
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+# PostgREST caps rows per response; reports read their rows in ranges
+ADMIN_QUERY_PAGE_SIZE = 1000
+
+def fetch_all_rows(build_query: Callable[[], Any]) -> List[Dict]:
+    """Every row of a query, read page by page (the query must have a stable order)"""
+    rows = []
+    offset = 0
+    while True:
+        page = build_query().range(offset, offset + ADMIN_QUERY_PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < ADMIN_QUERY_PAGE_SIZE:
+            return rows
+        offset += ADMIN_QUERY_PAGE_SIZE
+
+def require_admin(user_id: str = Depends(get_user_from_token)) -> str:
+    """Only users listed in ADMIN_USER_IDS"""
+    if user_id not in settings.admin_user_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user_id
+
+def summarize_usage(rows: List[Dict], key: Callable[[Dict], str], limit: int) -> List[LLMUsageBreakdown]:
+    """Sum usage rows by key, most expensive first"""
+    totals: Dict[str, Dict[str, float]] = {}
+    for row in rows:
+        total = totals.setdefault(key(row), {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latency_ms": 0,
+        })
+        for name in total:
+            total[name] += float(row.get(name) or 0)
+
+    breakdown = [
+        LLMUsageBreakdown(
+            key=name,
+            calls=int(total["calls"]),
+            prompt_tokens=int(total["prompt_tokens"]),
+            completion_tokens=int(total["completion_tokens"]),
+            cost_usd=round(total["cost_usd"], 4),
+            avg_latency_ms=round(total["latency_ms"] / total["calls"], 1) if total["calls"] else 0,
+        )
+        for name, total in totals.items()
+    ]
+    breakdown.sort(key=lambda item: item.cost_usd, reverse=True)
+    return breakdown[:limit]
+
+@router.get("/llm-usage", response_model=LLMUsageReport)
+async def get_llm_usage(
+    days: int = 7,
+    limit: int = 20,
+    supabase: Client = Depends(get_supabase_client),
+    admin_id: str = Depends(require_admin),
+):
+    """LLM cost hotspots by user, endpoint and model over the last `days` days"""
+    try:
+        # Include this worker's unflushed usage
+        await asyncio.to_thread(llm_meter.flush_sync, supabase)
+
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        rows = fetch_all_rows(lambda: supabase.table("llm_usage_daily")
+            .select("*")
+            .gte("day", since)
+            .order("day").order("user_id").order("endpoint").order("model"))
+
+        return LLMUsageReport(
+            days=days,
+            total_calls=sum(int(row["calls"]) for row in rows),
+            total_cost_usd=round(sum(float(row["cost_usd"]) for row in rows), 4),
+            by_user=summarize_usage(rows, lambda row: row["user_id"], limit),
+            by_endpoint=summarize_usage(rows, lambda row: row["endpoint"], limit),
+            by_model=summarize_usage(rows, lambda row: row["model"], limit),
+            hotspots=summarize_usage(rows, lambda row: f"{row['user_id']} / {row['endpoint']}", limit),
+        )
+
+    except Exception as e:
+        print(f"Error fetching LLM usage: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/plan-cache", response_model=PlanCacheStats)
+async def get_plan_cache_stats(admin_id: str = Depends(require_admin)):
+    """Hit rate and latency saved by the semantic plan cache (this worker)"""
+    return PlanCacheStats(**plan_cache.stats())
+
+@router.get("/subtask-drafts", response_model=SubtaskDraftStats)
+async def get_subtask_draft_stats(
+    days: int = 7,
+    supabase: Client = Depends(get_supabase_client),
+    admin_id: str = Depends(require_admin),
+):
+    """Use rate and wasted spend of speculative subtask drafts over the last `days` days"""
+    try:
+        await asyncio.to_thread(llm_meter.flush_sync, supabase)
+
+        since = date.today() - timedelta(days=days - 1)
+        drafts = fetch_all_rows(lambda: supabase.table("subtask_drafts")
+            .select("status, created_at")
+            .gte("created_at", since.isoformat())
+            .order("task_id"))
+        usage = fetch_all_rows(lambda: supabase.table("llm_usage_daily")
+            .select("cost_usd")
+            .eq("endpoint", SPECULATIVE_ENDPOINT)
+            .gte("day", since.isoformat())
+            .order("day").order("user_id").order("model"))
+        spend_usd = sum(float(row["cost_usd"]) for row in usage)
+
+        return SubtaskDraftStats(days=days, **subtask_drafts.stats(drafts, spend_usd))
+
+    except Exception as e:
+        print(f"Error fetching subtask draft stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -44,7 +44,7 @@ async def generate_alerts(
     """Manually trigger alert generation for the user"""
     try:
         alerts = AlertEngineService.generate_alerts_for_user(supabase, user_id)
-        AlertEngineService.save_alerts(supabase, alerts)
+        AlertEngineService.save_alerts(supabase, alerts, {user_id: None})
         
         return AlertGenerateResponse(
             message="Alerts generated successfully",
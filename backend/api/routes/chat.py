@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from supabase import Client
 from pydantic import BaseModel, Field
 from typing import List, Optional
@@ -6,15 +7,18 @@ from datetime import datetime
 
 from services.supabase_service import get_supabase_client
 from services.chat_ai_service import get_chat_response
+from services.chat_context_service import chat_context_builder
 from services.auth_service import get_user_from_token
+from services.llm_metering import get_metered_user
 from services.chat_suggestion_service import (
-    generate_proactive_suggestions,
     get_pending_suggestions,
     dismiss_suggestion,
     accept_suggestion
 )
+from services.suggestion_refresh_service import suggestion_refresher
+from services.task_event_service import TaskEventService
 from api.schemas.chat_suggestion_schemas import ChatSuggestionResponse
-from utils.rate_limiter import suggestion_rate_limiter
+from utils.rate_limiter import suggestion_rate_limiter, chat_rate_limiter, rate_limit
 
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
@@ -88,24 +92,29 @@ def verify_suggestion_ownership(supabase: Client, suggestion_id: str, user_id: s
             detail="Failed to verify suggestion ownership"
         )
 
-@router.post("/plans/{plan_id}/messages", response_model=ChatResponse)
+@router.post(
+    "/plans/{plan_id}/messages",
+    response_model=ChatResponse,
+    dependencies=[Depends(rate_limit(chat_rate_limiter))],
+)
 async def send_message(
     plan_id: str,
     request: ChatMessageRequest,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
-    user_id: str = Depends(get_user_from_token)
+    user_id: str = Depends(get_metered_user)
 ):
     """Send a message to AI and get response"""
     try:
         verify_plan_ownership(supabase, plan_id, user_id)
         
-        # Get plan and tasks in a single query (avoids N+1)
-        plan_result = supabase.table("plans").select("*, tasks(*)").eq("id", plan_id).execute()
+        # Get plan, tasks and resources in a single query (avoids N+1)
+        plan_result = supabase.table("plans").select("*, tasks(*), resources(*)").eq("id", plan_id).execute()
         plan = plan_result.data[0]
         tasks = plan.get("tasks", [])
         
-        history_result = supabase.table("messages").select("*").eq("plan_id", plan_id).order("created_at", desc=False).limit(10).execute()
-        chat_history = history_result.data
+        # Latest messages plus the summary of older ones
+        history = chat_context_builder.load_history(supabase, plan_id)
         
         user_message_data = {
             "plan_id": plan_id,
@@ -114,11 +123,14 @@ async def send_message(
         }
         user_msg_result = supabase.table("messages").insert(user_message_data).execute()
         
-        ai_response = get_chat_response(
+        ai_response = await run_in_threadpool(
+            get_chat_response,
             user_message=request.message,
             plan=plan,
             tasks=tasks,
-            chat_history=chat_history
+            chat_history=history["messages"],
+            summary=history["summary"],
+            resources=plan.get("resources", []),
         )
         
         ai_message_data = {
@@ -127,6 +139,7 @@ async def send_message(
             "content": ai_response["content"]
         }
         ai_msg_result = supabase.table("messages").insert(ai_message_data).execute()
+        background_tasks.add_task(chat_context_builder.refresh_summary, supabase, plan_id)
         
         return ChatResponse(
             message=ChatMessage(**ai_msg_result.data[0]),
@@ -172,36 +185,29 @@ async def get_suggestions(
     supabase: Client = Depends(get_supabase_client),
     user_id: str = Depends(get_user_from_token)
 ):
-    """Get proactive suggestions for a plan. Optionally generate new ones."""
+    """
+    Get proactive suggestions for a plan. They are precomputed in the
+    background after the plan changes; `refresh` (or having none yet)
+    schedules a new round instead of waiting for it.
+    """
     try:
         verify_plan_ownership(supabase, plan_id, user_id)
         
         suggestions = get_pending_suggestions(plan_id, supabase)
         
-        # If no suggestions or forced refresh, generate new ones
-        if not suggestions or refresh:
-            # Check rate limit
-            if not suggestion_rate_limiter.is_allowed(user_id, plan_id):
-                remaining = suggestion_rate_limiter.get_remaining(user_id, plan_id)
+        if refresh:
+            # Check rate limit (the store may do file I/O; keep it off the event loop)
+            limit = await run_in_threadpool(suggestion_rate_limiter.hit, f"{user_id}:{plan_id}")
+            if not limit.allowed:
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded. Try again later. Remaining: {remaining}"
+                    detail=f"Rate limit exceeded. Try again later. Remaining: {limit.remaining}",
+                    headers=limit.headers(),
                 )
-            
-            # Fetch plan and tasks in a single query
-            plan_result = supabase.table("plans").select("*, tasks(*)").eq("id", plan_id).execute()
-            plan_data = plan_result.data[0] if plan_result.data else None
-            tasks_data = plan_data.get("tasks", []) if plan_data else []
-            
-            if plan_data:
-                new_suggestions = generate_proactive_suggestions(
-                    plan_data,
-                    tasks_data,
-                    user_id,
-                    supabase
-                )
-                # Combine existing (if any) with new
-                suggestions.extend(new_suggestions)
+            suggestion_refresher.mark_dirty(plan_id, user_id, force=True)
+        elif not suggestions:
+            # Skipped by the refresher if the plan hasn't changed since it was last analyzed
+            suggestion_refresher.mark_dirty(plan_id, user_id)
                 
         return [ChatSuggestionResponse(**s) for s in suggestions]
         
@@ -236,15 +242,21 @@ async def dismiss_suggestion_endpoint(
 @router.post("/suggestions/{suggestion_id}/act")
 async def act_on_suggestion_endpoint(
     suggestion_id: str,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
-    user_id: str = Depends(get_user_from_token)
+    user_id: str = Depends(get_metered_user)
 ):
     """Accept and execute suggestion action"""
     try:
         # Verify ownership
         verify_suggestion_ownership(supabase, suggestion_id, user_id)
         
-        accept_suggestion(suggestion_id, supabase)
+        # Breakdowns call the LLM; keep the event loop free
+        suggestion, created_tasks = await run_in_threadpool(accept_suggestion, suggestion_id, supabase)
+        # The plan's tasks changed
+        suggestion_refresher.mark_dirty(suggestion["plan_id"], user_id)
+        if created_tasks:
+            background_tasks.add_task(TaskEventService.dispatch_created, supabase, user_id, created_tasks)
 
         return {"status": "success"}
     except HTTPException:
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Header
+from fastapi.concurrency import run_in_threadpool
 from supabase import Client
 from typing import List
 from datetime import datetime
@@ -14,8 +15,12 @@ from api.schemas.plan_schemas import (
 )
 from services.supabase_service import get_supabase_client
 from services.plan_generator import generate_plan_with_ai
+from services.subtask_draft_service import subtask_drafts
+from services.task_event_service import TaskEventService
 from services.auth_service import get_user_from_token
+from services.llm_metering import get_metered_user
 from services.monitoring_service import MonitoringService, PerformanceTimer
+from utils.rate_limiter import plan_generation_rate_limiter, rate_limit
 
 router = APIRouter(prefix="/api/plans", tags=["plans"])
 
@@ -148,11 +153,13 @@ async def get_all_plans(
     "/generate",
     response_model=PlanGenerateResponse,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit(plan_generation_rate_limiter))],
 )
 async def generate_plan(
     request: PlanGenerateRequest,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
-    user_id: str = Depends(get_user_from_token),
+    user_id: str = Depends(get_metered_user),
 ):
     """
     Generate a new plan using AI
@@ -160,6 +167,7 @@ async def generate_plan(
     - Calls OpenAI to generate tasks and resources
     - Saves plan, tasks, and resources to database
     - Returns complete plan structure
+    - Optionally drafts subtasks for the first tasks in the background
     """
 
     try:
@@ -171,7 +179,9 @@ async def generate_plan(
         
         with PerformanceTimer("ai_plan_generation") as timer:
             try:
-                ai_response = generate_plan_with_ai(
+                # Blocking OpenAI call (may queue in the LLM gateway); keep it off the event loop
+                ai_response = await run_in_threadpool(
+                    generate_plan_with_ai,
                     title=request.title,
                     description=request.description,
                     timeline=request.timeline,
@@ -277,6 +287,11 @@ async def generate_plan(
         tasks_result = supabase.table("tasks").insert(tasks_data).execute()
         resources_result = supabase.table("resources").insert(resources_data).execute()
 
+        # Alerts and indexes for the new tasks
+        background_tasks.add_task(TaskEventService.dispatch_created, supabase, user_id, tasks_result.data)
+        if subtask_drafts.enabled:
+            background_tasks.add_task(subtask_drafts.speculate, supabase, tasks_result.data)
+
         # Build response with AI intelligence metadata
         response = PlanGenerateResponse(
             plan=PlanResponse(
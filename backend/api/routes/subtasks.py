@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from supabase import Client
 from typing import List
 
@@ -6,11 +7,15 @@ from api.schemas.subtask_schemas import (
     SubtaskCreateRequest,
     SubtaskUpdateRequest,
     SubtaskResponse,
-    SubtaskGenerateRequest
+    SubtaskGenerateRequest,
+    SubtaskBatchGenerateRequest
 )
 from services.supabase_service import get_supabase_client
 from services.auth_service import get_user_from_token
-from services.subtask_generator import generate_subtasks_with_ai
+from services.llm_metering import get_metered_user
+from services.subtask_generator import generate_subtasks_with_ai, generate_subtasks_batch, build_subtask_rows
+from services.subtask_draft_service import subtask_drafts
+from config import settings
 
 router = APIRouter(prefix="/api/subtasks", tags=["subtasks"])
 
@@ -194,28 +199,24 @@ async def delete_subtask(
 async def generate_subtasks(
     request: SubtaskGenerateRequest,
     supabase: Client = Depends(get_supabase_client),
-    user_id: str = Depends(get_user_from_token)
+    user_id: str = Depends(get_metered_user)
 ):
     """Generate subtasks for a task using AI"""
     try:
         verify_task_ownership(supabase, request.task_id, user_id)
         
-        # Generate subtasks with AI
-        ai_subtasks = generate_subtasks_with_ai(
-            task_title=request.task_title,
-            task_description=request.task_description or ""
-        )
+        # A speculative draft saves the LLM round trip
+        ai_subtasks = subtask_drafts.take(supabase, request.task_id, request.task_title, request.task_description)
+        if ai_subtasks is None:
+            # Generate subtasks with AI
+            ai_subtasks = await run_in_threadpool(
+                generate_subtasks_with_ai,
+                task_title=request.task_title,
+                task_description=request.task_description or ""
+            )
         
         # Insert subtasks
-        subtasks_data = []
-        for i, subtask in enumerate(ai_subtasks):
-            subtasks_data.append({
-                "task_id": request.task_id,
-                "title": subtask["title"],
-                "description": subtask.get("description"),
-                "status": "pending",
-                "order": i
-            })
+        subtasks_data = build_subtask_rows({request.task_id: ai_subtasks})
         
         result = supabase.table("subtasks").insert(subtasks_data).execute()
         
@@ -228,3 +229,51 @@ async def generate_subtasks(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate subtasks: {str(e)}"
         )
+
+@router.post("/generate-batch", response_model=List[SubtaskResponse], status_code=status.HTTP_201_CREATED)
+async def generate_subtasks_for_tasks(
+    request: SubtaskBatchGenerateRequest,
+    supabase: Client = Depends(get_supabase_client),
+    user_id: str = Depends(get_metered_user)
+):
+    """Generate subtasks for several tasks with one batched AI call and one insert"""
+    try:
+        task_ids = list(dict.fromkeys(request.task_ids))
+        if len(task_ids) > settings.subtask_batch_max_tasks:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {settings.subtask_batch_max_tasks} tasks per request"
+            )
+        
+        # Load the tasks and verify ownership in one query
+        tasks_result = supabase.table("tasks")\
+            .select("id, title, description, plans!inner(user_id)")\
+            .in_("id", task_ids)\
+            .execute()
+        tasks = tasks_result.data or []
+        
+        if len(tasks) != len(task_ids):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+        if any(task["plans"]["user_id"] != user_id for task in tasks):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this task"
+            )
+        
+        # Generate subtasks with AI
+        ai_subtasks = await run_in_threadpool(generate_subtasks_batch, tasks)
+        
+        result = supabase.table("subtasks").insert(build_subtask_rows(ai_subtasks)).execute()
+        
+        return [SubtaskResponse(**st) for st in result.data]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate subtasks: {str(e)}"
+        )
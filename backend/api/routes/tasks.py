@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, BackgroundTasks
 from supabase import Client
 from typing import List
 
@@ -11,6 +11,8 @@ from api.schemas.plan_schemas import TaskResponse
 from services.supabase_service import get_supabase_client
 from services.auth_service import get_user_from_token
 from services.monitoring_service import MonitoringService
+from services.task_event_service import TaskEventService
+from services.suggestion_refresh_service import suggestion_refresher
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
@@ -69,6 +71,7 @@ def verify_task_ownership(supabase: Client, task_id: str, user_id: str) -> str:
 async def create_task(
     plan_id: str,
     request: TaskCreateRequest,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
     user_id: str = Depends(get_user_from_token)
 ):
@@ -97,7 +100,14 @@ async def create_task(
                 detail="Failed to create task"
             )
         
-        return TaskResponse(**result.data[0])
+        task = result.data[0]
+        background_tasks.add_task(
+            TaskEventService.dispatch,
+            supabase,
+            TaskEventService.build_event("created", user_id, plan_id, task["id"], task),
+        )
+        
+        return TaskResponse(**task)
         
     except HTTPException:
         raise
@@ -113,6 +123,7 @@ async def create_task(
 async def update_task(
     task_id: str,
     request: TaskUpdateRequest,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
     user_id: str = Depends(get_user_from_token)
 ):
@@ -166,6 +177,12 @@ async def update_task(
         if request.status == "completed":
             MonitoringService.track_task_completed(user_id, task_id, plan_id)
         
+        background_tasks.add_task(
+            TaskEventService.dispatch,
+            supabase,
+            TaskEventService.build_event("updated", user_id, plan_id, task_id, result.data[0]),
+        )
+        
         return TaskResponse(**result.data[0])
         
     except HTTPException:
@@ -181,15 +198,22 @@ async def update_task(
 @router.delete("/{task_id}", status_code=status.HTTP_200_OK)
 async def delete_task(
     task_id: str,
+    background_tasks: BackgroundTasks,
     supabase: Client = Depends(get_supabase_client),
     user_id: str = Depends(get_user_from_token)
 ):
     """Delete a task"""
     try:
-        verify_task_ownership(supabase, task_id, user_id)
+        plan_id = verify_task_ownership(supabase, task_id, user_id)
         
         result = supabase.table("tasks").delete().eq("id", task_id).execute()
         
+        background_tasks.add_task(
+            TaskEventService.dispatch,
+            supabase,
+            TaskEventService.build_event("deleted", user_id, plan_id, task_id),
+        )
+        
         return {"message": "Task deleted successfully", "id": task_id}
         
     except HTTPException:
@@ -233,6 +257,10 @@ async def reorder_tasks(
                 "order": task_order.new_order
             }).eq("id", task_order.task_id).execute()
         
+        # Task order feeds the plans' suggestions
+        for plan_id in verified_plans:
+            suggestion_refresher.mark_dirty(plan_id, user_id)
+        
         return {"message": "Tasks reordered successfully"}
         
     except HTTPException:
@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from typing import List
+
+# LLM Usage Schemas
+class LLMUsageBreakdown(BaseModel):
+    key: str
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    avg_latency_ms: float
+
+class LLMUsageReport(BaseModel):
+    days: int
+    total_calls: int
+    total_cost_usd: float
+    by_user: List[LLMUsageBreakdown]
+    by_endpoint: List[LLMUsageBreakdown]
+    by_model: List[LLMUsageBreakdown]
+    # Most expensive (user, endpoint) pairs
+    hotspots: List[LLMUsageBreakdown]
+
+# Plan Cache Schemas
+class PlanCacheStats(BaseModel):
+    size: int
+    capacity: int
+    hits: int
+    misses: int
+    hit_rate: float
+    saved_ms: int  # Generation time the hits avoided
+    avg_lookup_ms: float
+
+# Subtask Draft Schemas
+class SubtaskDraftStats(BaseModel):
+    enabled: bool
+    days: int
+    generated: int
+    used: int
+    wasted: int  # Discarded or expired without being served
+    pending: int
+    use_rate: float
+    spend_usd: float  # LLM spend on speculation
+    wasted_spend_usd: float
+    # /api/subtasks/generate requests served from a draft (this worker)
+    hits: int
+    misses: int
+    hit_rate: float
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class SubtaskCreateRequest(BaseModel):
@@ -29,3 +29,6 @@ class SubtaskGenerateRequest(BaseModel):
     task_id: str
     task_title: str
     task_description: Optional[str] = None
+
+class SubtaskBatchGenerateRequest(BaseModel):
+    task_ids: List[str] = Field(..., min_length=1)
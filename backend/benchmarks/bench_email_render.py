@@ -0,0 +1,75 @@
+"""
+Email rendering benchmark: 10k renders of the reminder/digest templates
+
+Compares the old path (template lookup + render per email on a
+default Environment) with EmailRenderer serially and with its process pool.
+Run from backend/ with the usual .env in place:
+    python benchmarks/bench_email_render.py [--renders 10000] [--processes 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from services.email_render_service import EmailRenderer, TEMPLATE_DIR
+
+
+def build_jobs(count: int):
+    plan = {"id": "plan-1", "user_id": "user-1", "title": "Launch the website"}
+    tasks = [
+        {"title": f"Task {i}", "due_date": "2024-01-10T09:00:00", "priority": "high", "plans": plan}
+        for i in range(5)
+    ]
+    stats = {
+        "completed_tasks": 4, "active_plans": 2, "completion_rate": 60,
+        "overdue_tasks": 1, "hours_remaining": 12.5, "cost_remaining": 80.0,
+    }
+    dashboard_url = "https://app.example.com/dashboard"
+    kinds = [
+        ("task_reminder.html", {"task": tasks[0], "plan": plan, "action_url": "https://app.example.com/plans/plan-1", "dashboard_url": dashboard_url}),
+        ("due_soon.html", {"tasks": tasks, "dashboard_url": dashboard_url}),
+        ("overdue.html", {"tasks": tasks[:2], "due_soon_tasks": tasks[2:], "dashboard_url": dashboard_url}),
+        ("weekly_digest.html", {"stats": stats, "upcoming_tasks": tasks, "dashboard_url": dashboard_url}),
+    ]
+    return [kinds[i % len(kinds)] for i in range(count)]
+
+
+def timed(label: str, fn, count: int):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>9.0f} ms  {count / elapsed:>9.0f} renders/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=10_000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    jobs = build_jobs(args.renders)
+
+    # Previous setup: no bytecode cache, templates re-checked on every lookup
+    baseline_env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(["html", "xml"]))
+    baseline_renderer = EmailRenderer(processes=0)
+    baseline_env.globals["fragment"] = lambda name, **context: baseline_renderer.env.get_template(name).render(**context)
+
+    serial = EmailRenderer(processes=0)
+    serial.precompile()
+    pooled = EmailRenderer(pool_threshold=0, processes=args.processes)
+    pooled.precompile()
+    # Warm the pool so worker start-up isn't counted
+    pooled.render_many(jobs[:100])
+
+    print(f"{args.renders} renders")
+    timed("baseline (per-email env)", lambda: [baseline_env.get_template(n).render(**c) for n, c in jobs], args.renders)
+    timed("precompiled, serial", lambda: serial.render_many(jobs), args.renders)
+    timed("precompiled, process pool", lambda: pooled.render_many(jobs), args.renders)
+    pooled.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Rate limiter microbenchmark
+
+Times hit() for the GCRA limiter on the memory and SQLite stores against the
+previous sliding-log limiter (a list of timestamps per key, scanned on every
+call), with many distinct keys and a few hot ones.
+Run from backend/ with the usual .env in place:
+    python benchmarks/bench_rate_limiter.py [--calls 200000] [--keys 50000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import MemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore
+
+
+class SlidingLogLimiter:
+    """The previous implementation: every timestamp kept and rescanned, keys never evicted"""
+
+    def __init__(self, max_requests: int, window: timedelta):
+        self._requests = defaultdict(list)
+        self.max_requests = max_requests
+        self.window = window
+
+    def hit(self, key: str) -> bool:
+        now = datetime.now()
+        cutoff = now - self.window
+        self._requests[key] = [ts for ts in self._requests[key] if ts > cutoff]
+        if len(self._requests[key]) >= self.max_requests:
+            return False
+        self._requests[key].append(now)
+        return True
+
+
+def timed(label: str, hit, keys):
+    start = time.perf_counter()
+    for key in keys:
+        hit(key)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed * 1000:>9.0f} ms  {len(keys) / elapsed:>11.0f} calls/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # Half the traffic from a handful of hot keys, the rest spread out
+    keys = [f"hot-{i % 10}" if i % 2 else f"user-{i % args.keys}" for i in range(args.calls)]
+    limit, period = 1000, 60
+
+    print(f"{args.calls} calls over {args.keys} keys")
+    timed("sliding log (old)", SlidingLogLimiter(limit, timedelta(seconds=period)).hit, keys)
+    memory_store = MemoryRateLimitStore()
+    timed("GCRA, memory", RateLimiter("bench", limit, period, store=memory_store).hit, keys)
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_keys = keys[: args.calls // 10]
+        store = SQLiteRateLimitStore(os.path.join(tmp, "limits.db"))
+        timed(f"GCRA, sqlite ({len(sqlite_keys)})", RateLimiter("bench", limit, period, store=store).hit, sqlite_keys)
+    print(f"memory store holds {len(memory_store)} keys")
+
+
+if __name__ == "__main__":
+    main()
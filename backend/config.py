@@ -11,12 +11,123 @@ class Settings(BaseSettings):
     
     # Resend (Email Service)
     resend_api_key: str | None = None
+    email_from: str = "PlanGenie <notifications@plangenie.app>"
+    email_transport: str = "resend"  # "resend" or "memory" (records instead of sending)
+    email_send_concurrency: int = 4
+    email_batch_size: int = 100
+    email_max_retries: int = 3
+    email_recipient_hourly_limit: int = 20
+    email_template_cache_dir: str | None = None  # Jinja bytecode cache (defaults to the system temp dir)
+    email_render_pool_threshold: int = 200  # Batches this large render in a process pool
+    email_render_processes: int | None = None  # Pool size (defaults to CPU count)
+
+    # OpenAI client (one shared, lazily built client per process)
+    llm_model: str = "gpt-4o-mini"
+    llm_endpoint_models: dict[str, str] = {}  # Per-endpoint overrides, e.g. {"chat": "gpt-4o"}
+    openai_timeout_seconds: float = 60.0
+    openai_connect_timeout_seconds: float = 5.0
+    openai_max_retries: int = 0  # The LLM gateway owns deadlines and fallbacks
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 30.0
+    plan_classifier_path: str | None = None  # Trained plan type classifier (defaults to the bundled model)
+    plan_classifier_min_confidence: float = 0.6  # Below this the LLM classifies the plan
+    plan_cache_enabled: bool = True  # Reuse plans generated for near-duplicate requests
+    plan_cache_capacity: int = 1000  # Plans kept per worker (least recently used are evicted)
+    plan_cache_similarity_threshold: float = 0.85
+    plan_cache_scope: str = "user"  # "user" (only a user's own plans) or "global"
+    prompt_variant: str = "full"  # "full" or "compact" (shorter instructions, no worked examples)
+    prompt_variants: dict[str, str] = {}  # Per-prompt overrides, e.g. {"chat": "compact"}
+
+    # Chat context: plan, summary and history share a token budget per turn
+    chat_context_token_budget: int = 1500
+    chat_history_max_messages: int = 12  # Recent messages kept out of the summary
+    chat_summary_trigger_messages: int = 10  # Older unsummarized messages before the summary is updated
+    chat_summary_max_tokens: int = 250
+    chat_retrieval_top_k: int = 8  # Tasks and resources retrieved per message
+    retrieval_index_max_plans: int = 500  # Plan indexes kept in memory per worker
+
+    # Suggestions: regenerated in the background after a plan changes and goes quiet
+    suggestion_refresh_quiet_seconds: float = 30.0
+    suggestion_refresh_max_delay_seconds: float = 300.0  # Refresh a constantly edited plan at least this often
+    suggestion_refresh_interval_seconds: float = 5.0  # How often each worker checks for due plans
+    suggestion_refresh_max_concurrency: int = 4
+
+    # Subtask generation
+    subtask_batch_size: int = 5  # Tasks broken down per LLM call; larger batches run in parallel
+    subtask_batch_max_tasks: int = 20  # Tasks accepted by one /api/subtasks/generate-batch request
+    # Speculative drafts: after a plan is generated, break down its first tasks in the background
+    subtask_speculation_enabled: bool = False
+    subtask_speculation_tasks: int = 3
+    subtask_draft_ttl_hours: float = 24.0  # Older drafts are discarded instead of served
+
+    # LLM gateway (admission control for OpenAI calls)
+    llm_max_concurrency: int = 16  # In-flight calls per model
+    llm_model_concurrency: dict[str, int] = {}  # Per-model overrides, e.g. {"gpt-4o": 4}
+    llm_background_max_concurrency: int = 4  # Slots background work (suggestions, templates) may use
+    llm_max_queue_depth: int = 64  # Calls waiting per model before new ones are shed
+    llm_interactive_max_wait_seconds: float = 10.0
+    llm_background_max_wait_seconds: float = 30.0
+    # Total time budget per endpoint (queueing + request) before callers fall back
+    llm_deadlines: dict[str, float] = {
+        "plan_generation": 45.0,
+        "plan_classification": 5.0,
+        "chat": 20.0,
+        "chat_summary": 30.0,
+        "subtasks": 15.0,
+        "subtasks_batch": 40.0,
+        "subtasks_speculative": 90.0,
+        "suggestions": 30.0,
+        "templates": 60.0,
+    }
+    llm_default_deadline_seconds: float = 30.0
+    llm_circuit_failure_threshold: int = 5  # Consecutive provider failures before the circuit opens
+    llm_circuit_reset_seconds: float = 30.0  # Open time before a probe call is allowed
+    # Hedging: re-send slow interactive calls once they pass the endpoint's recent p95 latency
+    llm_hedging_enabled: bool = False
+    llm_hedge_max_ratio: float = 0.1  # At most this fraction of calls may be hedged
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_default_delay_seconds: float = 3.0  # Until enough latency samples exist
+    llm_hedge_min_delay_seconds: float = 1.0
+
+    # LLM metering and per-user budgets
+    llm_pricing: dict[str, dict[str, float]] = {  # USD per 1M tokens
+        "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+        "gpt-4o": {"input": 2.50, "output": 10.00},
+    }
+    llm_user_daily_budget_usd: float = 0.50  # 0 disables budgets
+    llm_budget_downgrade_model: str | None = None  # Model to use once a user is over budget
+    llm_budget_hard_limit_multiplier: float = 2.0  # Past budget x this, calls fall back without the LLM
+    llm_usage_flush_seconds: float = 60.0
+    admin_user_ids: list[str] = []  # Users allowed to call /api/admin endpoints
+
+    # Rate limiting
+    rate_limit_backend: str = "memory"  # "memory" (per process) or "sqlite" (shared on one host)
+    rate_limit_sqlite_path: str = "/tmp/plangenie_rate_limits.db"
+    chat_rate_limit_per_minute: int = 20
+    plan_generation_rate_limit_per_hour: int = 10
+
+    # Reminders
+    reminder_individual_max: int = 2  # More items than this are sent as one digest
+    reminder_overdue_lookback_days: int = 14  # Older overdue tasks are left out of reminders
     
     # App
     environment: str = "development"
     debug: bool = True
     frontend_url: str = "http://localhost:3004"
 
+    # Scheduler
+    # "embedded": API workers elect one leader to run the scheduler
+    # "disabled": API workers never run it (use scheduler_worker.py instead)
+    scheduler_mode: str = "embedded"
+    scheduler_lock_backend: str = "file"  # "file" or "postgres"
+    scheduler_lock_path: str = "/tmp/plangenie-scheduler.lock"
+    database_url: str | None = None  # Direct Postgres connection for the advisory lock
+
+    # Scheduler fan-out
+    scheduler_batch_size: int = 500
+    scheduler_max_concurrency: int = 20
+
     # Sentry
     sentry_dsn: str | None = None
     sentry_traces_sample_rate: float = 1.0
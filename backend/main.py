@@ -6,8 +6,15 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.starlette import StarletteIntegration
 
 from contextlib import asynccontextmanager
-from api.routes import plans, tasks, chat, uploads, subtasks, templates, preferences, alerts
-from services.scheduler_service import start_scheduler, shutdown_scheduler
+import asyncio
+from api.routes import plans, tasks, chat, uploads, subtasks, templates, preferences, alerts, admin
+from services.scheduler_service import build_scheduler_elector
+from services.email_delivery_service import email_outbox
+from services.email_render_service import email_renderer
+from services.ai_service import llm_clients
+from services.llm_metering import llm_meter
+from services.suggestion_refresh_service import suggestion_refresher
+from services.supabase_service import get_supabase_client
 from config import settings
 
 # Load environment variables
@@ -40,11 +47,34 @@ else:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize scheduler
-    start_scheduler()
+    # Startup: Compile email templates now rather than on the first send
+    email_renderer.precompile()
+    # Startup: Compete for scheduler leadership (only the leader runs jobs)
+    elector = build_scheduler_elector() if settings.scheduler_mode == "embedded" else None
+    if elector:
+        await elector.start()
+    # Startup: Flush LLM usage counters to the database periodically
+    usage_flusher = asyncio.create_task(
+        llm_meter.run_flusher(get_supabase_client, settings.llm_usage_flush_seconds)
+    )
+    # Startup: Refresh suggestions of plans that changed and went quiet
+    refresher = asyncio.create_task(
+        suggestion_refresher.run(get_supabase_client, settings.suggestion_refresh_interval_seconds)
+    )
     yield
-    # Shutdown: Stop scheduler
-    shutdown_scheduler()
+    usage_flusher.cancel()
+    refresher.cancel()
+    # Shutdown: Stop scheduler and hand leadership to another worker
+    if elector:
+        await elector.stop()
+    # Deliver anything still sitting in the email outbox
+    await email_outbox.stop()
+    email_renderer.shutdown()
+    llm_clients.close()
+    try:
+        await asyncio.to_thread(llm_meter.flush_sync, get_supabase_client())
+    except Exception as e:
+        print(f"Final LLM usage flush failed: {e}")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -75,6 +105,7 @@ app.include_router(subtasks.router)
 app.include_router(templates.router)
 app.include_router(preferences.router)
 app.include_router(alerts.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
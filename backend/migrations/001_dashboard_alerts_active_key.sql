@@ -0,0 +1,20 @@
+-- At most one active (undismissed) alert per user, alert type and task.
+-- AlertEngineService.save_alerts dedupes against these keys in one query
+-- before a bulk insert; the index guards against concurrent writers
+-- (insert_dashboard_alerts in 010 skips rows that conflict with it).
+
+-- Collapse any duplicates that slipped in before the index existed
+update dashboard_alerts a
+set dismissed_at = now()
+from dashboard_alerts b
+where a.dismissed_at is null
+  and b.dismissed_at is null
+  and a.user_id = b.user_id
+  and a.type = b.type
+  and a.task_id = b.task_id
+  -- Keep the newest alert; ids break ties between equal created_at values
+  and (a.created_at, a.id) < (b.created_at, b.id);
+
+create unique index if not exists dashboard_alerts_active_key
+    on dashboard_alerts (user_id, type, task_id)
+    where dismissed_at is null;
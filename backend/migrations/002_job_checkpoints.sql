@@ -0,0 +1,10 @@
+-- Progress of scheduled fan-out jobs (see services/fanout_service.py).
+-- One row per job; a "running" row with a cursor lets a crashed run resume
+-- after the last fully processed page.
+create table if not exists job_checkpoints (
+    job_id text primary key,
+    run_id uuid not null,
+    cursor text,
+    status text not null check (status in ('running', 'completed')),
+    updated_at timestamptz not null default now()
+);
@@ -0,0 +1,22 @@
+-- Daily reminders fetch every task due in a page of users' reminder windows
+-- with one range query on due_date, then resolve the owners' emails in one
+-- RPC call (see services/scheduler_service.py and user_email_service.py).
+
+create index if not exists tasks_due_date_status_idx
+    on tasks (due_date, status);
+
+-- Emails for a batch of users. auth.users is not exposed over PostgREST,
+-- so this runs as the function owner; only the service role may call it.
+create or replace function get_user_emails(user_ids uuid[])
+returns table (id uuid, email text)
+language sql
+security definer
+set search_path = public, auth
+as $$
+    select u.id, u.email::text
+    from auth.users u
+    where u.id = any(user_ids);
+$$;
+
+revoke all on function get_user_emails(uuid[]) from public, anon, authenticated;
+grant execute on function get_user_emails(uuid[]) to service_role;
@@ -0,0 +1,65 @@
+-- Weekly digests need to know when a task was completed, and compute every
+-- user's stats in one grouped query per page of users
+-- (see load_digest_batch in services/scheduler_service.py).
+
+alter table tasks add column if not exists completed_at timestamptz;
+
+-- Stamp completed_at when a task moves to completed, clear it if reopened
+create or replace function set_task_completed_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.status = 'completed' and (tg_op = 'INSERT' or old.status is distinct from 'completed') then
+        new.completed_at := now();
+    elsif new.status <> 'completed' then
+        new.completed_at := null;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists tasks_set_completed_at on tasks;
+create trigger tasks_set_completed_at
+    before insert or update of status on tasks
+    for each row execute function set_task_completed_at();
+
+-- Per-user digest stats for a batch of users, one row per user with plans
+create or replace function get_weekly_digest_stats(
+    user_ids uuid[],
+    week_start timestamptz,
+    now_at timestamptz,
+    week_end timestamptz
+)
+returns table (
+    user_id uuid,
+    completed_this_week bigint,
+    upcoming bigint,
+    overdue bigint,
+    hours_remaining numeric,
+    cost_remaining numeric,
+    active_plans bigint,
+    total_tasks bigint,
+    completed_tasks bigint
+)
+language sql
+stable
+as $$
+    select
+        p.user_id,
+        count(t.id) filter (where t.status = 'completed' and t.completed_at >= week_start),
+        count(t.id) filter (where t.status <> 'completed' and t.due_date >= now_at and t.due_date < week_end),
+        count(t.id) filter (where t.status <> 'completed' and t.due_date < now_at),
+        coalesce(sum(t.estimated_time_hours) filter (where t.status <> 'completed'), 0),
+        coalesce(sum(t.estimated_cost_usd) filter (where t.status <> 'completed'), 0),
+        count(distinct p.id) filter (where p.status = 'active'),
+        count(t.id),
+        count(t.id) filter (where t.status = 'completed')
+    from plans p
+    left join tasks t on t.plan_id = p.id
+    where p.user_id = any(user_ids)
+    group by p.user_id;
+$$;
+
+revoke all on function get_weekly_digest_stats(uuid[], timestamptz, timestamptz, timestamptz) from public, anon, authenticated;
+grant execute on function get_weekly_digest_stats(uuid[], timestamptz, timestamptz, timestamptz) to service_role;
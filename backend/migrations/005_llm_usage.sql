@@ -0,0 +1,56 @@
+-- Daily LLM usage per user, endpoint and model. Each API worker aggregates
+-- in memory and flushes batches through record_llm_usage, which adds to the
+-- stored totals (see services/llm_metering.py).
+
+create table if not exists llm_usage_daily (
+    day date not null,
+    -- Auth user id, or 'system' for calls made outside a user request
+    user_id text not null,
+    endpoint text not null,
+    model text not null,
+    calls bigint not null default 0,
+    prompt_tokens bigint not null default 0,
+    completion_tokens bigint not null default 0,
+    latency_ms bigint not null default 0,
+    cost_usd numeric(12, 6) not null default 0,
+    primary key (day, user_id, endpoint, model)
+);
+
+create index if not exists llm_usage_daily_day_idx on llm_usage_daily (day);
+
+-- Add a batch of usage rows and return each affected user's total cost for
+-- that day, which workers use as the baseline for budget checks.
+-- The output columns share names with table columns; use_column makes the
+-- unqualified references below mean the table columns.
+create or replace function record_llm_usage(usage jsonb)
+returns table (user_id text, day date, cost_usd numeric)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+    insert into llm_usage_daily as u
+        (day, user_id, endpoint, model, calls, prompt_tokens, completion_tokens, latency_ms, cost_usd)
+    select r.day, r.user_id, r.endpoint, r.model, r.calls, r.prompt_tokens, r.completion_tokens, r.latency_ms, r.cost_usd
+    from jsonb_to_recordset(usage) as r(
+        day date, user_id text, endpoint text, model text, calls bigint,
+        prompt_tokens bigint, completion_tokens bigint, latency_ms bigint, cost_usd numeric
+    )
+    on conflict on constraint llm_usage_daily_pkey do update set
+        calls = u.calls + excluded.calls,
+        prompt_tokens = u.prompt_tokens + excluded.prompt_tokens,
+        completion_tokens = u.completion_tokens + excluded.completion_tokens,
+        latency_ms = u.latency_ms + excluded.latency_ms,
+        cost_usd = u.cost_usd + excluded.cost_usd;
+
+    return query
+        select t.user_id, t.day, sum(t.cost_usd)
+        from llm_usage_daily t
+        where (t.day, t.user_id) in (
+            select distinct (r->>'day')::date, r->>'user_id' from jsonb_array_elements(usage) r
+        )
+        group by t.user_id, t.day;
+end;
+$$;
+
+revoke all on function record_llm_usage(jsonb) from public, anon, authenticated;
+grant execute on function record_llm_usage(jsonb) to service_role;
@@ -0,0 +1,14 @@
+-- Rolling per-plan summary of chat turns that have fallen out of the recent
+-- window, so chat prompts carry older context at a bounded size
+-- (see services/chat_context_service.py).
+
+create table if not exists chat_summaries (
+    plan_id uuid primary key references plans(id) on delete cascade,
+    summary text not null,
+    -- created_at of the newest message folded into the summary
+    summarized_until timestamptz not null,
+    message_count integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists messages_plan_created_idx on messages (plan_id, created_at desc);
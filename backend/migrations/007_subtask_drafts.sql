@@ -0,0 +1,17 @@
+-- Subtasks generated speculatively for a new plan's first tasks, served by
+-- /api/subtasks/generate instead of a fresh LLM call
+-- (see services/subtask_draft_service.py). Rows are kept after they are used
+-- or discarded so the hit rate and wasted spend can be reported.
+
+create table if not exists subtask_drafts (
+    task_id uuid primary key,
+    plan_id uuid not null references plans(id) on delete cascade,
+    subtasks jsonb not null,
+    -- Hash of the task title and description the draft was generated for
+    source_hash text not null,
+    status text not null default 'ready' check (status in ('ready', 'used', 'discarded')),
+    created_at timestamptz not null default now(),
+    resolved_at timestamptz
+);
+
+create index if not exists subtask_drafts_created_idx on subtask_drafts (created_at);
@@ -0,0 +1,9 @@
+-- Last background suggestion refresh per plan and the hash of the plan
+-- content it saw, so refreshes are skipped when nothing relevant changed
+-- (see services/suggestion_refresh_service.py).
+
+create table if not exists suggestion_refresh_state (
+    plan_id uuid primary key references plans(id) on delete cascade,
+    content_hash text not null,
+    refreshed_at timestamptz not null default now()
+);
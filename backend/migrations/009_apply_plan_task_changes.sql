@@ -0,0 +1,39 @@
+-- Apply an accepted suggestion's task changes to a plan in one transaction:
+-- set the final order of existing tasks and append new tasks after the
+-- current last one (see _apply_task_changes in
+-- services/chat_suggestion_service.py). Returns the inserted tasks.
+create or replace function apply_plan_task_changes(
+    target_plan_id uuid,
+    task_orders jsonb default '[]'::jsonb,
+    new_tasks jsonb default '[]'::jsonb
+)
+returns setof tasks
+language plpgsql
+as $$
+declare
+    last_order integer;
+begin
+    -- Serialize concurrent changes to the same plan
+    perform 1 from plans where id = target_plan_id for update;
+
+    -- [{"id": ..., "order": ...}]
+    update tasks t
+    set "order" = (o.value->>'order')::integer
+    from jsonb_array_elements(task_orders) o
+    where t.id = (o.value->>'id')::uuid
+      and t.plan_id = target_plan_id;
+
+    select coalesce(max("order"), 0) into last_order from tasks where plan_id = target_plan_id;
+
+    -- [{"title": ..., "description": ...}]
+    return query
+        insert into tasks (plan_id, title, description, status, "order")
+        select target_plan_id, n.task->>'title', n.task->>'description', 'pending', last_order + n.position::integer
+        from jsonb_array_elements(new_tasks) with ordinality as n(task, position)
+        order by n.position
+        returning *;
+end;
+$$;
+
+revoke all on function apply_plan_task_changes(uuid, jsonb, jsonb) from public, anon, authenticated;
+grant execute on function apply_plan_task_changes(uuid, jsonb, jsonb) to service_role;
@@ -0,0 +1,24 @@
+-- Bulk insert of generated alerts that skips any whose (user, type, task)
+-- already has an active alert, so a concurrent writer inserting the same
+-- key can't fail the whole batch on dashboard_alerts_active_key (001).
+-- Returns the number of alerts inserted.
+create or replace function insert_dashboard_alerts(alerts jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    inserted integer;
+begin
+    insert into dashboard_alerts
+        (user_id, type, priority, task_id, plan_id, title, message, action_label, action_url)
+    select r.user_id, r.type, r.priority, r.task_id, r.plan_id, r.title, r.message, r.action_label, r.action_url
+    from jsonb_populate_recordset(null::dashboard_alerts, alerts) r
+    on conflict (user_id, type, task_id) where dismissed_at is null do nothing;
+
+    get diagnostics inserted = row_count;
+    return inserted;
+end;
+$$;
+
+revoke all on function insert_dashboard_alerts(jsonb) from public, anon, authenticated;
+grant execute on function insert_dashboard_alerts(jsonb) to service_role;
@@ -0,0 +1,41 @@
+"""
+Run the scheduler as a standalone process
+
+Set SCHEDULER_MODE=disabled on the API workers and run:
+    python scheduler_worker.py
+
+Leader election still applies, so running more than one of these (for
+failover) never executes a job twice.
+"""
+
+import asyncio
+import signal
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.scheduler_service import build_scheduler_elector
+from services.email_delivery_service import email_outbox
+from services.email_render_service import email_renderer
+
+
+async def main():
+    email_renderer.precompile()
+    elector = build_scheduler_elector()
+    stop_event = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await elector.start()
+    print("Scheduler worker running")
+    await stop_event.wait()
+    await elector.stop()
+    await email_outbox.stop()
+    email_renderer.shutdown()
+    print("Scheduler worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,78 @@
+"""
+Shared OpenAI client
+One client per process, built on first use, over a tuned httpx connection
+pool so calls reuse keep-alive connections instead of opening new ones.
+Modules keep a module-level `client` (a LazyOpenAIClient) so nothing is
+constructed at import time and tests can still patch `<module>.client`.
+"""
+
+import threading
+from typing import Dict, Optional
+import httpx
 from openai import OpenAI
 from config import get_settings
 
 settings = get_settings()
 
+
+class LLMClientRegistry:
+    """Lazily built, process-wide OpenAI clients keyed by name"""
+
+    def __init__(self):
+        self._clients: Dict[str, OpenAI] = {}
+        self._lock = threading.Lock()
+
+    def _build(self) -> OpenAI:
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+            ),
+            timeout=httpx.Timeout(
+                settings.openai_timeout_seconds, connect=settings.openai_connect_timeout_seconds
+            ),
+        )
+        return OpenAI(
+            api_key=settings.openai_api_key,
+            http_client=http_client,
+            max_retries=settings.openai_max_retries,
+        )
+
+    def get(self, name: str = "default") -> OpenAI:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = self._build()
+        return client
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+
+
+class LazyOpenAIClient:
+    """Stand-in that forwards to the shared client, building it on first use"""
+
+    def __init__(self, name: str = "default"):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(llm_clients.get(self._name), attribute)
+
+
 def get_openai_client() -> OpenAI:
-    """Get OpenAI client instance"""
-    return OpenAI(api_key=settings.openai_api_key)
+    """Get the shared OpenAI client instance"""
+    return llm_clients.get()
+
+
+def model_for(endpoint: Optional[str] = None) -> str:
+    """Model for an endpoint: LLM_ENDPOINT_MODELS override, else LLM_MODEL"""
+    return settings.llm_endpoint_models.get(endpoint, settings.llm_model)
+
+# Global instance
+llm_clients = LLMClientRegistry()
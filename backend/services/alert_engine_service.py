@@ -1,34 +1,38 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable
 from datetime import datetime, timedelta
 from supabase import Client
 
+# High priority tasks due within this window get a "due soon" alert
+DUE_SOON_WINDOW = timedelta(days=2)
+
+# Alert types owned by the engine (and therefore auto-resolved by it)
+ALERT_TYPES = ["quick_win", "overdue_task", "high_priority"]
+
+# Max user ids per IN (...) filter, keeps PostgREST URLs short
+USER_ID_CHUNK_SIZE = 100
+
 class AlertEngineService:
     @staticmethod
-    def generate_alerts_for_user(supabase: Client, user_id: str) -> List[Dict[str, Any]]:
+    def build_task_alerts(task: Dict[str, Any], user_id: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
-        Generate smart alerts for a user based on their tasks and plans
+        Evaluate a single task and return the alerts that currently apply to it
         """
         alerts = []
-        
-        # Fetch active tasks
-        tasks_result = (
-            supabase.table("tasks")
-            .select("*, plans(title)")
-            .eq("plans.user_id", user_id)
-            .neq("status", "completed")
-            .execute()
-        )
-        tasks = tasks_result.data
-        
+
+        if task.get("status") == "completed":
+            return alerts
+
+        now = now or datetime.now()
+        now_iso = now.isoformat()
+        due_soon_iso = (now + DUE_SOON_WINDOW).isoformat()
+        due_date = task.get("due_date")
+
         # 1. Quick Win Alerts
         # Tasks with low effort (< 1 hour) and high priority
-        quick_wins = [
-            t for t in tasks 
-            if t.get("estimated_time_hours") and t["estimated_time_hours"] < 1.0 
-            and t.get("priority") == "high"
-        ]
-        
-        for task in quick_wins:
+        if (
+            task.get("estimated_time_hours") and task["estimated_time_hours"] < 1.0
+            and task.get("priority") == "high"
+        ):
             alerts.append({
                 "user_id": user_id,
                 "type": "quick_win",
@@ -40,16 +44,10 @@ class AlertEngineService:
                 "action_label": "Complete Now",
                 "action_url": f"/plans/{task['plan_id']}",
             })
-            
+
         # 2. Overdue Alerts
         # Tasks with due date in the past
-        now = datetime.now().isoformat()
-        overdue = [
-            t for t in tasks
-            if t.get("due_date") and t["due_date"] < now
-        ]
-        
-        for task in overdue:
+        if due_date and due_date < now_iso:
             alerts.append({
                 "user_id": user_id,
                 "type": "overdue_task",
@@ -57,22 +55,14 @@ class AlertEngineService:
                 "task_id": task["id"],
                 "plan_id": task["plan_id"],
                 "title": "Task Overdue",
-                "message": f"'{task['title']}' was due on {task['due_date']}.",
+                "message": f"'{task['title']}' was due on {due_date}.",
                 "action_label": "Reschedule",
                 "action_url": f"/plans/{task['plan_id']}",
             })
-            
+
         # 3. High Priority Due Soon
         # High priority tasks due in next 48 hours
-        two_days_from_now = (datetime.now() + timedelta(days=2)).isoformat()
-        due_soon = [
-            t for t in tasks
-            if t.get("priority") == "high" 
-            and t.get("due_date") 
-            and now < t["due_date"] < two_days_from_now
-        ]
-        
-        for task in due_soon:
+        if task.get("priority") == "high" and due_date and now_iso < due_date < due_soon_iso:
             alerts.append({
                 "user_id": user_id,
                 "type": "high_priority",
@@ -84,26 +74,165 @@ class AlertEngineService:
                 "action_label": "View Task",
                 "action_url": f"/plans/{task['plan_id']}",
             })
-            
+
         return alerts
 
     @staticmethod
-    def save_alerts(supabase: Client, alerts: List[Dict[str, Any]]):
-        """Save generated alerts to database, avoiding duplicates"""
-        if not alerts:
+    def generate_alerts_for_user(supabase: Client, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Generate smart alerts for a user based on their tasks and plans.
+        Full scan over every incomplete task - used for manual refreshes and
+        the nightly reconciliation; task writes and the time wheel cover the rest.
+        """
+        alerts = []
+
+        # Fetch active tasks
+        tasks_result = (
+            supabase.table("tasks")
+            .select("*, plans(title)")
+            .eq("plans.user_id", user_id)
+            .neq("status", "completed")
+            .execute()
+        )
+
+        now = datetime.now()
+        for task in tasks_result.data:
+            alerts.extend(AlertEngineService.build_task_alerts(task, user_id, now))
+
+        return alerts
+
+    @staticmethod
+    def handle_task_event(supabase: Client, event: Dict[str, Any]):
+        """
+        Incrementally re-evaluate alerts for a task that was created, updated or deleted
+        """
+        task = event.get("task")
+        if event["type"] == "deleted" or not task:
+            alerts = []
+        else:
+            alerts = AlertEngineService.build_task_alerts(task, event["user_id"])
+
+        AlertEngineService.save_alerts(supabase, alerts, {event["user_id"]: [event["task_id"]]})
+
+    @staticmethod
+    def save_alerts(
+        supabase: Client,
+        alerts: List[Dict[str, Any]],
+        evaluated: Optional[Dict[str, Optional[Iterable[str]]]] = None,
+    ):
+        """
+        Save generated alerts to database, avoiding duplicates.
+
+        Loads the active alert keys for the affected users in one query and
+        inserts everything new in a single bulk insert, which skips keys
+        another writer has inserted in the meantime.
+
+        Args:
+            alerts: Alerts that currently apply
+            evaluated: {user_id: task ids that were evaluated, or None for all
+                of the user's tasks}. Active alerts in that scope that were not
+                regenerated no longer apply and are resolved.
+        """
+        evaluated = evaluated or {}
+        user_ids = sorted({a["user_id"] for a in alerts} | set(evaluated))
+        if not user_ids:
             return
-            
-        # For each alert, check if similar active alert exists
-        for alert in alerts:
-            existing = (
+
+        # Active alerts for every affected user
+        existing = []
+        for i in range(0, len(user_ids), USER_ID_CHUNK_SIZE):
+            result = (
                 supabase.table("dashboard_alerts")
-                .select("id")
-                .eq("user_id", alert["user_id"])
-                .eq("type", alert["type"])
-                .eq("task_id", alert["task_id"])
+                .select("id, user_id, type, task_id")
+                .in_("user_id", user_ids[i:i + USER_ID_CHUNK_SIZE])
+                .in_("type", ALERT_TYPES)
                 .is_("dismissed_at", "null")
                 .execute()
             )
-            
-            if not existing.data:
-                supabase.table("dashboard_alerts").insert(alert).execute()
+            existing.extend(result.data)
+
+        def alert_key(alert):
+            return (str(alert["user_id"]), alert["type"], str(alert["task_id"]))
+
+        existing_keys = {alert_key(a) for a in existing}
+
+        new_alerts = []
+        for alert in alerts:
+            key = alert_key(alert)
+            if key not in existing_keys:
+                existing_keys.add(key)
+                new_alerts.append(alert)
+
+        if new_alerts:
+            # Skips keys a concurrent writer inserted since the lookup (migration 010)
+            supabase.rpc("insert_dashboard_alerts", {"alerts": new_alerts}).execute()
+
+        # Resolve active alerts that were re-evaluated and no longer apply
+        current_keys = {alert_key(a) for a in alerts}
+        scopes = {
+            str(user_id): None if task_ids is None else {str(t) for t in task_ids}
+            for user_id, task_ids in evaluated.items()
+        }
+        stale_ids = [
+            a["id"] for a in existing
+            if str(a["user_id"]) in scopes
+            and (scopes[str(a["user_id"])] is None or str(a["task_id"]) in scopes[str(a["user_id"])])
+            and alert_key(a) not in current_keys
+        ]
+
+        if stale_ids:
+            supabase.table("dashboard_alerts").update({
+                "dismissed_at": datetime.now().isoformat()
+            }).in_("id", stale_ids).execute()
+
+
+class AlertTimeWheel:
+    """
+    Hourly time wheel over due-date thresholds.
+
+    A task's alerts only change with time when its due date crosses a
+    threshold: it becomes overdue (offset 0) or enters the due-soon window
+    (offset DUE_SOON_WINDOW). Each tick covers the slot (last tick, now] and
+    only fetches tasks whose thresholds fall inside that slot.
+    """
+
+    THRESHOLDS = [timedelta(0), DUE_SOON_WINDOW]
+
+    def __init__(self, slot: timedelta = timedelta(hours=1)):
+        self.slot = slot
+        self.last_tick: Optional[datetime] = None
+
+    def fetch_crossing_tasks(self, supabase: Client, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Fetch incomplete tasks whose due date crosses a threshold in (start, end]"""
+        tasks = {}
+        for offset in self.THRESHOLDS:
+            result = (
+                supabase.table("tasks")
+                .select("*, plans!inner(user_id, title)")
+                .gt("due_date", (start + offset).isoformat())
+                .lte("due_date", (end + offset).isoformat())
+                .neq("status", "completed")
+                .execute()
+            )
+            for task in result.data:
+                tasks[task["id"]] = task
+        return list(tasks.values())
+
+    def tick(self, supabase: Client, now: Optional[datetime] = None) -> int:
+        """Advance the wheel to now and refresh alerts for crossing tasks. Returns alert count."""
+        now = now or datetime.now()
+        start = self.last_tick or now - self.slot
+
+        alerts = []
+        evaluated = {}
+        for task in self.fetch_crossing_tasks(supabase, start, now):
+            user_id = task["plans"]["user_id"]
+            alerts.extend(AlertEngineService.build_task_alerts(task, user_id, now))
+            evaluated.setdefault(user_id, []).append(task["id"])
+
+        AlertEngineService.save_alerts(supabase, alerts, evaluated)
+        self.last_tick = now
+        return len(alerts)
+
+# Global instance
+alert_time_wheel = AlertTimeWheel()
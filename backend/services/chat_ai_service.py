@@ -1,58 +1,17 @@
-from openai import OpenAI
+from services.ai_service import LazyOpenAIClient, model_for
 from config import get_settings
 import json
 from typing import Dict, List, Any, Optional
+from services.llm_gateway import llm_gateway, INTERACTIVE, LLMOverloadedError
+from services.chat_context_service import chat_context_builder
+from utils.prompt_layout import PromptTemplate, FULL, COMPACT
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+client = LazyOpenAIClient()
 
 
-def get_chat_response(
-    user_message: str,
-    plan: Dict[str, Any],
-    tasks: List[Dict[str, Any]],
-    chat_history: List[Dict[str, Any]],
-) -> Dict[str, Any]:
-    """
-    Get intelligent AI response with actionable suggestions
-    """
-
-    # Calculate plan statistics
-    total_tasks = len(tasks)
-    completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-    pending_tasks = len([t for t in tasks if t["status"] == "pending"])
-    progress_percent = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-
-    # Build detailed task context
-    tasks_text = "\n".join(
-        [
-            f"{i+1}. [{task['status'].upper()}] {task['title']}\n   Description: {task.get('description', 'No description')[:150]}..."
-            for i, task in enumerate(tasks)
-        ]
-    )
-
-    # Build chat history
-    history_text = "\n".join(
-        [
-            f"{msg['role'].title()}: {msg['content']}"
-            for msg in chat_history[-6:]  # Last 6 messages for context
-        ]
-    )
-
-    system_prompt = f"""You are PlanGenie's AI Assistant - an expert planning copilot that helps users execute their plans successfully.
-
-CURRENT PLAN OVERVIEW:
-Title: {plan['title']}
-Description: {plan['description']}
-Status: {plan['status']}
-Progress: {completed_tasks}/{total_tasks} tasks complete ({progress_percent:.0f}%)
-Pending: {pending_tasks} tasks
-
-CURRENT TASKS:
-{tasks_text}
-
-RECENT CONVERSATION:
-{history_text}
+CHAT_PROMPT = PromptTemplate("chat", "2", {
+    FULL: """You are PlanGenie's AI Assistant - an expert planning copilot that helps users execute their plans successfully. The user's plan, its tasks and the recent conversation are given in the following messages.
 
 YOUR CAPABILITIES:
 You can help users in these ways:
@@ -99,15 +58,62 @@ When relevant, suggest concrete actions the user can take:
 - "Would you like specific hotel recommendations for your budget?"
 - "I can help you create a day-by-day itinerary"
 
-Remember: Your goal is to make execution EASY. The user should feel supported and clear on next steps after every response."""
+Remember: Your goal is to make execution EASY. The user should feel supported and clear on next steps after every response.""",
+    COMPACT: """You are PlanGenie's AI Assistant - an expert planning copilot that helps users execute their plans. The user's plan, its tasks and the recent conversation are given in the following messages.
+
+Help with: step-by-step task guidance, specific tool/service recommendations (with pros/cons), plan refinements and new tasks, getting unstuck, progress analysis, what to do next, and cost/time estimates.
+
+Style: conversational and professional, no emojis. Reference task numbers ("For Task 3..."), name specific brands/URLs/steps, offer 2-3 options when there are alternatives, use numbered steps for complex answers, and ask when intent is unclear. When useful, offer a concrete next action (e.g. "Want me to break Task X into smaller subtasks?"). Keep every answer focused and actionable.""",
+})
+
+
+def build_chat_messages(
+    user_message: str,
+    plan: Dict[str, Any],
+    tasks: List[Dict[str, Any]],
+    chat_history: List[Dict[str, Any]],
+    variant: Optional[str] = None,
+    summary: Optional[str] = None,
+    resources: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, str]]:
+    """Messages for a chat reply: static assistant prompt, plan context, history, message"""
+
+    # Relevant tasks, summary and the newest history, within the context token budget
+    context = chat_context_builder.build(user_message, plan, tasks, chat_history, summary, resources)
+
+    # Static instructions first, then the plan, the recent conversation and the new message
+    return CHAT_PROMPT.messages(
+        [
+            {"role": "system", "content": context["plan_context"]},
+            *[{"role": msg["role"], "content": msg["content"]} for msg in context["history"]],
+            {"role": "user", "content": user_message},
+        ],
+        variant,
+    )
+
+
+def get_chat_response(
+    user_message: str,
+    plan: Dict[str, Any],
+    tasks: List[Dict[str, Any]],
+    chat_history: List[Dict[str, Any]],
+    summary: Optional[str] = None,
+    resources: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Get intelligent AI response with actionable suggestions
+    """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Using GPT-4 for better reasoning
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message},
-            ],
+        response = llm_gateway.create_chat_completion(
+            client,
+            INTERACTIVE,
+            endpoint="chat",
+            hedge=True,
+            model=model_for("chat"),
+            messages=build_chat_messages(
+                user_message, plan, tasks, chat_history, summary=summary, resources=resources
+            ),
             temperature=0.7,
             max_tokens=800,  # Increased for detailed responses
         )
@@ -119,6 +125,8 @@ Remember: Your goal is to make execution EASY. The user should feel supported an
 
         return {"content": ai_content, "suggested_actions": suggested_actions}
 
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"AI chat error: {e}")
         return {
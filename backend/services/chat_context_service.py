@@ -0,0 +1,266 @@
+"""
+Chat context builder
+Keeps what a chat turn sends to the model within a token budget: the most
+recent messages, a rolling per-plan summary of older turns (chat_summaries,
+migrations/006), and only the tasks and resources relevant to the user's
+question, found with the plan's local retrieval index.
+
+The summary is updated incrementally after a turn, in the background: once
+enough messages have fallen out of the recent window, they are folded into
+the existing summary with one small LLM call.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+from supabase import Client
+from config import settings
+from services.ai_service import LazyOpenAIClient, model_for
+from services.llm_gateway import llm_gateway, BACKGROUND
+from services.monitoring_service import MonitoringService
+from services.plan_index_service import plan_indexes, TASK, RESOURCE
+from utils.prompt_layout import PromptTemplate, FULL, count_tokens
+
+client = LazyOpenAIClient()
+
+# Share of the budget (after the summary) the task list may use; history gets the rest
+TASK_BUDGET_SHARE = 0.4
+DESCRIPTION_EXCERPT_CHARS = 150
+PLAN_DESCRIPTION_CHARS = 500
+
+_TASK_REFERENCE = re.compile(r"\btasks?\s*#?\s*(\d+)", re.IGNORECASE)
+SUMMARY_PROMPT = PromptTemplate("chat_summary", "1", {
+    FULL: """You maintain a running summary of a conversation between a user and a planning assistant about one plan.
+
+Update the existing summary with the new messages. Keep decisions made, preferences and constraints the user stated (budget, dates, tools), questions still open and advice the user accepted. Drop greetings and small talk. Write plain sentences, at most 150 words, no headings.""",
+})
+
+
+class ChatContextBuilder:
+    """
+    Select chat history, summary and tasks for one chat turn
+
+    Usage:
+        history = chat_context_builder.load_history(supabase, plan_id)
+        context = chat_context_builder.build(question, plan, tasks, history)
+        ...
+        chat_context_builder.refresh_summary(supabase, plan_id)   # after the turn
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        max_messages: int = 12,
+        summary_trigger_messages: int = 10,
+        summary_max_tokens: int = 250,
+        top_k: int = 8,
+    ):
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summary_trigger_messages = summary_trigger_messages
+        self.summary_max_tokens = summary_max_tokens
+        # Tasks and resources retrieved per turn (services/plan_index_service.py)
+        self.top_k = top_k
+
+    def load_history(self, supabase: Client, plan_id: str) -> Dict[str, Any]:
+        """
+        The plan's summary (if any) and its unsummarized messages, oldest first.
+        Messages that left the recent window wait for refresh_summary until
+        summary_trigger_messages of them pile up; they are loaded too, so the
+        turn still sees them (budget permitting) before they are folded in.
+        """
+        summary_result = supabase.table("chat_summaries").select("*").eq("plan_id", plan_id).execute()
+        summary = summary_result.data[0] if summary_result.data else None
+
+        query = supabase.table("messages").select("*").eq("plan_id", plan_id)
+        if summary:
+            query = query.gt("created_at", summary["summarized_until"])
+        messages_result = query.order("created_at", desc=True)\
+            .limit(self.max_messages + self.summary_trigger_messages)\
+            .execute()
+
+        return {
+            "summary": summary["summary"] if summary else None,
+            "messages": list(reversed(messages_result.data or [])),
+        }
+
+    def select_history(self, messages: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """Newest messages that fit in `budget` tokens, oldest first"""
+        selected = []
+        for message in reversed(messages):
+            tokens = count_tokens(message["content"]) + 4
+            if tokens > budget:
+                break
+            budget -= tokens
+            selected.append(message)
+        return list(reversed(selected))
+
+    def select_tasks(
+        self,
+        question: str,
+        tasks: List[Dict[str, Any]],
+        budget: int,
+        task_scores: Optional[Dict[str, float]] = None,
+    ) -> str:
+        """
+        Task list for the prompt within `budget` tokens. Tasks named in the
+        question or retrieved for it come first with a description excerpt;
+        the rest follow by title, open before completed, while the budget
+        lasts. Tasks keep their plan numbering.
+        """
+        task_scores = task_scores or {}
+        referenced = {int(number) for number in _TASK_REFERENCE.findall(question)}
+
+        scored = []
+        for number, task in enumerate(tasks, start=1):
+            relevance = task_scores.get(str(task.get("id")), 0.0) + (100.0 if number in referenced else 0.0)
+            is_open = task["status"] != "completed"
+            scored.append((relevance, is_open, number, task))
+        scored.sort(key=lambda item: (-item[0], not item[1], item[2]))
+
+        lines = {}
+        for relevance, _, number, task in scored:
+            line = f"{number}. [{task['status'].upper()}] {task['title']}"
+            if relevance > 0:
+                description = (task.get("description") or "")[:DESCRIPTION_EXCERPT_CHARS]
+                if description:
+                    line += f"\n   Description: {description}"
+            tokens = count_tokens(line) + 1
+            if tokens > budget:
+                if relevance > 0:
+                    continue
+                # Title-only lines are all about the same size; the rest won't fit either
+                break
+            budget -= tokens
+            lines[number] = line
+
+        omitted = len(tasks) - len(lines)
+        text = "\n".join(lines[number] for number in sorted(lines))
+        if omitted:
+            text += f"\n(+{omitted} more tasks not shown)"
+        return text
+
+    def select_resources(self, resources: List[Dict[str, Any]], resource_ids: List[str], budget: int) -> str:
+        """Retrieved resources, best first, within `budget` tokens"""
+        by_id = {str(resource["id"]): resource for resource in resources}
+        lines = []
+        for resource_id in resource_ids:
+            resource = by_id.get(resource_id)
+            if not resource:
+                continue
+            line = f"- {resource['title']} ({resource.get('url') or 'no link'})"
+            tokens = count_tokens(line) + 1
+            if tokens > budget:
+                break
+            budget -= tokens
+            lines.append(line)
+        return "\n".join(lines)
+
+    def build(
+        self,
+        question: str,
+        plan: Dict[str, Any],
+        tasks: List[Dict[str, Any]],
+        history: List[Dict[str, Any]],
+        summary: Optional[str] = None,
+        resources: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Plan context text and history messages for a turn, together within the
+        token budget. Returns {"plan_context": str, "history": [...], "tokens": int}.
+        """
+        tasks = sorted(tasks, key=lambda task: task.get("order") or 0)
+        total_tasks = len(tasks)
+        completed_tasks = len([t for t in tasks if t["status"] == "completed"])
+        pending_tasks = len([t for t in tasks if t["status"] == "pending"])
+        progress_percent = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+
+        overview = f"""CURRENT PLAN OVERVIEW:
+Title: {plan['title']}
+Description: {(plan.get('description') or '')[:PLAN_DESCRIPTION_CHARS]}
+Status: {plan['status']}
+Progress: {completed_tasks}/{total_tasks} tasks complete ({progress_percent:.0f}%)
+Pending: {pending_tasks} tasks"""
+        budget = self.token_budget - count_tokens(overview)
+
+        summary_text = ""
+        if summary:
+            summary_text = f"\n\nEARLIER CONVERSATION (summary):\n{summary}"
+            budget -= count_tokens(summary_text)
+
+        # Ground the turn in the tasks and resources the question is about
+        hits = plan_indexes.search(plan["id"], question, tasks, resources or [], self.top_k)
+        plan_budget = max(0, int(budget * TASK_BUDGET_SHARE))
+
+        resources_text = ""
+        if resources:
+            resources_text = self.select_resources(
+                resources, [resource_id for resource_id, _ in hits[RESOURCE]], plan_budget // 4
+            )
+            plan_budget -= count_tokens(resources_text)
+            budget -= count_tokens(resources_text)
+            if resources_text:
+                resources_text = f"\n\nRELEVANT RESOURCES:\n{resources_text}"
+
+        tasks_text = self.select_tasks(question, tasks, plan_budget, dict(hits[TASK]))
+        budget -= count_tokens(tasks_text)
+        selected_history = self.select_history(history, max(0, budget))
+
+        plan_context = f"{overview}\n\nCURRENT TASKS:\n{tasks_text}{resources_text}{summary_text}"
+        tokens = count_tokens(plan_context) + sum(count_tokens(m["content"]) for m in selected_history)
+        MonitoringService.track_custom_metric("chat_context_tokens", tokens, {"plan_tasks": total_tasks})
+        return {"plan_context": plan_context, "history": selected_history, "tokens": tokens}
+
+    def refresh_summary(self, supabase: Client, plan_id: str) -> bool:
+        """
+        Fold messages that have left the recent window into the plan's summary
+        once there are enough of them. Returns True if the summary was updated.
+        """
+        try:
+            summary_result = supabase.table("chat_summaries").select("*").eq("plan_id", plan_id).execute()
+            summary = summary_result.data[0] if summary_result.data else None
+
+            query = supabase.table("messages").select("role, content, created_at").eq("plan_id", plan_id)
+            if summary:
+                query = query.gt("created_at", summary["summarized_until"])
+            messages = query.order("created_at", desc=False).execute().data or []
+
+            older = messages[:-self.max_messages]
+            if len(older) < self.summary_trigger_messages:
+                return False
+
+            transcript = "\n".join(f"{m['role'].title()}: {m['content']}" for m in older)
+            existing = summary["summary"] if summary else "(none yet)"
+            response = llm_gateway.create_chat_completion(
+                client,
+                BACKGROUND,
+                endpoint="chat_summary",
+                model=model_for("chat_summary"),
+                messages=SUMMARY_PROMPT.messages([
+                    {"role": "user", "content": f"EXISTING SUMMARY:\n{existing}\n\nNEW MESSAGES:\n{transcript}"},
+                ]),
+                temperature=0.3,
+                max_tokens=self.summary_max_tokens,
+            )
+
+            supabase.table("chat_summaries").upsert({
+                "plan_id": plan_id,
+                "summary": response.choices[0].message.content.strip(),
+                "summarized_until": older[-1]["created_at"],
+                "message_count": (summary["message_count"] if summary else 0) + len(older),
+            }).execute()
+            return True
+
+        except Exception as e:
+            # The next turn retries; chat keeps working on recent history meanwhile
+            print(f"Chat summary refresh failed for plan {plan_id}: {e}")
+            MonitoringService.capture_exception(e, {"action": "chat_summary", "plan_id": plan_id})
+            return False
+
+# Global instance
+chat_context_builder = ChatContextBuilder(
+    token_budget=settings.chat_context_token_budget,
+    max_messages=settings.chat_history_max_messages,
+    summary_trigger_messages=settings.chat_summary_trigger_messages,
+    summary_max_tokens=settings.chat_summary_max_tokens,
+    top_k=settings.chat_retrieval_top_k,
+)
@@ -1,16 +1,17 @@
-from openai import OpenAI
+from services.ai_service import LazyOpenAIClient, model_for
 from config import get_settings
 import json
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from supabase import Client
 from api.schemas.chat_suggestion_schemas import ChatSuggestionCreate, SuggestionType, SuggestionPriority
-from services.subtask_generator import generate_subtasks_with_ai
+from services.subtask_generator import generate_subtasks_batch, build_subtask_rows
+from services.llm_gateway import llm_gateway, BACKGROUND, LLMOverloadedError
 
 
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+client = LazyOpenAIClient()
 
 # Security limits
 MAX_SUGGESTED_TASKS = 10
@@ -37,27 +38,14 @@ def _sanitize_text(text: str, max_length: int) -> str:
     # Limit length
     return text[:max_length].strip()
 
-def _validate_task_ids_belong_to_plan(task_ids: List[str], plan_id: str, supabase: Client) -> List[str]:
-    """Validate that task IDs belong to the specified plan."""
+def _validate_task_ids_belong_to_plan(task_ids: List[str], plan_task_ids: Set[str]) -> List[str]:
+    """Validate that task IDs belong to the plan (checked against the plan's loaded task IDs)."""
     if not task_ids:
         return []
     
-    valid_ids = []
-    for task_id in task_ids:
-        if not _is_valid_uuid(task_id):
-            continue
-        
-        # Verify task belongs to plan
-        try:
-            result = supabase.table("tasks").select("id").eq("id", task_id).eq("plan_id", plan_id).execute()
-            if result.data:
-                valid_ids.append(task_id)
-        except Exception as e:
-            continue
-    
-    return valid_ids
+    return [task_id for task_id in task_ids if _is_valid_uuid(task_id) and task_id in plan_task_ids]
 
-def _validate_suggestion_data(suggestion_data: Dict[str, Any], plan_id: str, supabase: Client) -> Dict[str, Any]:
+def _validate_suggestion_data(suggestion_data: Dict[str, Any], plan_task_ids: Set[str]) -> Dict[str, Any]:
     """Validate and sanitize AI-generated suggestion data."""
     validated = {}
     
@@ -85,7 +73,7 @@ def _validate_suggestion_data(suggestion_data: Dict[str, Any], plan_id: str, sup
     # Validate related_task_ids
     task_ids = suggestion_data.get("related_task_ids", [])
     if isinstance(task_ids, list):
-        validated["related_task_ids"] = _validate_task_ids_belong_to_plan(task_ids, plan_id, supabase)
+        validated["related_task_ids"] = _validate_task_ids_belong_to_plan(task_ids, plan_task_ids)
     else:
         validated["related_task_ids"] = []
     
@@ -130,7 +118,7 @@ def _validate_suggestion_data(suggestion_data: Dict[str, Any], plan_id: str, sup
                 if isinstance(op, dict) and op.get("type") == "reorder":
                     task_id = op.get("task_id")
                     before_task_id = op.get("before_task_id")
-                    if _is_valid_uuid(task_id) and _is_valid_uuid(before_task_id):
+                    if _validate_task_ids_belong_to_plan([task_id, before_task_id], plan_task_ids) == [task_id, before_task_id]:
                         validated_ops.append({
                             "type": "reorder",
                             "task_id": task_id,
@@ -181,10 +169,20 @@ For 'optimize' suggestions that involve reordering, provide the 'operations' in
 """
 
 
-def generate_proactive_suggestions(plan: Dict[str, Any], tasks: List[Dict[str, Any]], user_id: str, supabase: Client) -> List[Dict[str, Any]]:
+def generate_proactive_suggestions(
+    plan: Dict[str, Any],
+    tasks: List[Dict[str, Any]],
+    user_id: str,
+    supabase: Client,
+    pending_suggestions: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
     """
     Analyzes the plan and generates proactive suggestions.
     Saves them to the database and returns the new suggestions.
+
+    Task IDs are validated against `tasks` and duplicates are checked
+    against `pending_suggestions` (loaded in one query if not given), so a
+    refresh costs at most one select and one bulk insert.
     """
     
     # 1. Prepare context for LLM
@@ -208,8 +206,12 @@ def generate_proactive_suggestions(plan: Dict[str, Any], tasks: List[Dict[str, A
 
     try:
         # 2. Call LLM
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        # Background lane: if shed, LLMOverloadedError reaches the caller
+        response = llm_gateway.create_chat_completion(
+            client,
+            BACKGROUND,
+            endpoint="suggestions",
+            model=model_for("suggestions"),
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT_SUGGESTIONS},
                 {"role": "user", "content": prompt}
@@ -225,24 +227,26 @@ def generate_proactive_suggestions(plan: Dict[str, Any], tasks: List[Dict[str, A
         # Limit number of suggestions
         suggestions_data = suggestions_data[:MAX_SUGGESTIONS_PER_GENERATION]
         
-        new_suggestions = []
+        # 3. Validate against the loaded tasks and pending suggestions
+        plan_task_ids = {str(t["id"]) for t in tasks}
+        if pending_suggestions is None:
+            pending_suggestions = supabase.table("chat_suggestions")\
+                .select("title")\
+                .eq("plan_id", plan["id"])\
+                .eq("status", "pending")\
+                .execute().data or []
+        # Check if similar suggestion already exists to avoid spam
+        seen_titles = {p["title"] for p in pending_suggestions}
         
-        # 3. Validate and save to DB
+        rows = []
         for s in suggestions_data:
             try:
                 # Validate and sanitize AI-generated data
-                validated_data = _validate_suggestion_data(s, plan["id"], supabase)
-                
-                # Check if similar suggestion already exists to avoid spam
-                existing = supabase.table("chat_suggestions")\
-                    .select("id")\
-                    .eq("plan_id", plan["id"])\
-                    .eq("title", validated_data["title"])\
-                    .eq("status", "pending")\
-                    .execute()
-                if existing.data:
+                validated_data = _validate_suggestion_data(s, plan_task_ids)
+                if validated_data["title"] in seen_titles:
 
                     continue
+                seen_titles.add(validated_data["title"])
 
                 suggestion = ChatSuggestionCreate(
                     plan_id=plan["id"],
@@ -254,17 +258,21 @@ def generate_proactive_suggestions(plan: Dict[str, Any], tasks: List[Dict[str, A
                 suggestion_dict = suggestion.model_dump()
                 suggestion_dict["suggestion_type"] = suggestion.suggestion_type.value
                 suggestion_dict["priority"] = suggestion.priority.value
-                
-                result = supabase.table("chat_suggestions").insert(suggestion_dict).execute()
-                if result.data:
-                    new_suggestions.append(result.data[0])
+                rows.append(suggestion_dict)
 
             except Exception as e:
 
                 continue
-                
-        return new_suggestions
-
+        
+        # 4. Save to DB in one insert
+        if not rows:
+            return []
+        result = supabase.table("chat_suggestions").insert(rows).execute()
+        return result.data or []
+
+    except LLMOverloadedError:
+        # Shed: let the caller retry later
+        raise
     except json.JSONDecodeError as e:
 
         return []
@@ -289,9 +297,10 @@ def dismiss_suggestion(suggestion_id: str, supabase: Client):
         .eq("id", suggestion_id)\
         .execute()
 
-def accept_suggestion(suggestion_id: str, supabase: Client):
+def accept_suggestion(suggestion_id: str, supabase: Client) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
     """
     Execute the action associated with the suggestion and mark as accepted.
+    Returns the suggestion and the tasks the action inserted.
     """
     # 1. Get suggestion details
     result = supabase.table("chat_suggestions").select("*").eq("id", suggestion_id).execute()
@@ -301,10 +310,11 @@ def accept_suggestion(suggestion_id: str, supabase: Client):
     suggestion = result.data[0]
     
     # 2. Perform Action based on type
+    created_tasks = []
     if suggestion["suggestion_type"] == "breakdown":
         _handle_breakdown_action(suggestion, supabase)
     elif suggestion["suggestion_type"] == "add_task":
-        _handle_add_task_action(suggestion, supabase)
+        created_tasks = _handle_add_task_action(suggestion, supabase)
     elif suggestion["suggestion_type"] == "optimize":
         _handle_optimize_action(suggestion, supabase)
     
@@ -313,124 +323,123 @@ def accept_suggestion(suggestion_id: str, supabase: Client):
         .update({"status": "accepted", "acted_at": "now()"})\
         .eq("id", suggestion_id)\
         .execute()
+    
+    return suggestion, created_tasks
+
+def _apply_task_changes(
+    supabase: Client,
+    plan_id: str,
+    task_orders: List[Dict[str, Any]],
+    new_tasks: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Write reorders and new tasks in one transaction (apply_plan_task_changes
+    in migrations/009). New tasks are appended after the plan's last task.
+    Returns the inserted tasks.
+    """
+    if not task_orders and not new_tasks:
+        return []
+    result = supabase.rpc("apply_plan_task_changes", {
+        "target_plan_id": plan_id,
+        "task_orders": task_orders,
+        "new_tasks": new_tasks,
+    }).execute()
+    return result.data or []
+
+def _reorder_tasks(tasks: List[Dict[str, Any]], operations: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Apply every reorder operation to the plan's tasks in memory.
+    Returns {"id", "order"} for the tasks whose order changed (orders 1..n).
+    """
+    tasks_list = sorted(tasks, key=lambda t: t.get("order") or 0)
+    task_ids = {t["id"] for t in tasks_list}
+    
+    for op in operations:
+        if not isinstance(op, dict) or op.get("type") != "reorder":
+            continue
+            
+        task_id = op.get("task_id")
+        before_task_id = op.get("before_task_id")
+        
+        # Validate UUIDs and verify both tasks belong to the plan
+        if not _is_valid_uuid(task_id) or not _is_valid_uuid(before_task_id):
+
+            continue
+        if task_id not in task_ids or before_task_id not in task_ids or task_id == before_task_id:
+
+            continue
+        
+        # Move the task in front of before_task_id
+        task_to_move = next(t for t in tasks_list if t["id"] == task_id)
+        tasks_list = [t for t in tasks_list if t["id"] != task_id]
+        insert_idx = next(i for i, t in enumerate(tasks_list) if t["id"] == before_task_id)
+        tasks_list.insert(insert_idx, task_to_move)
+    
+    # Re-assign orders, keeping only the ones that changed
+    return [
+        {"id": t["id"], "order": i + 1}
+        for i, t in enumerate(tasks_list)
+        if t.get("order") != i + 1
+    ]
 
-def _handle_add_task_action(suggestion: Dict[str, Any], supabase: Client):
+def _handle_add_task_action(suggestion: Dict[str, Any], supabase: Client) -> List[Dict[str, Any]]:
     """
-    Handle 'add_task' action: Add suggested tasks to the plan.
+    Handle 'add_task' action: Append suggested tasks to the plan in one insert.
+    Returns the inserted tasks.
     """
     metadata = suggestion.get("metadata", {})
     suggested_tasks = metadata.get("suggested_tasks", [])
     
     if not isinstance(suggested_tasks, list):
 
-        return
+        return []
     
     # Enforce limit
     suggested_tasks = suggested_tasks[:MAX_SUGGESTED_TASKS]
     
     if not suggested_tasks:
         # Fallback if no structured data
-        new_task = {
-            "plan_id": suggestion["plan_id"],
+        new_tasks = [{
             "title": _sanitize_text(f"New Task: {suggestion['title']}", MAX_TITLE_LENGTH),
             "description": _sanitize_text(suggestion["description"], MAX_DESCRIPTION_LENGTH),
-            "status": "pending",
-            "order": 999
-        }
-        try:
-            supabase.table("tasks").insert(new_task).execute()
-        except Exception as e:
-            pass
-        return
-
-    for st in suggested_tasks:
-        if not isinstance(st, dict):
-            continue
-            
-        new_task = {
-            "plan_id": suggestion["plan_id"],
-            "title": _sanitize_text(st.get("title", "New Task"), MAX_TITLE_LENGTH),
-            "description": _sanitize_text(st.get("description", ""), MAX_DESCRIPTION_LENGTH),
-            "status": "pending",
-            "order": 999
-        }
-        try:
-            supabase.table("tasks").insert(new_task).execute()
-
-        except Exception as e:
-
-            continue
+        }]
+    else:
+        new_tasks = [
+            {
+                "title": _sanitize_text(st.get("title", "New Task"), MAX_TITLE_LENGTH),
+                "description": _sanitize_text(st.get("description", ""), MAX_DESCRIPTION_LENGTH),
+            }
+            for st in suggested_tasks
+            if isinstance(st, dict)
+        ]
+    
+    return _apply_task_changes(supabase, suggestion["plan_id"], [], new_tasks)
 
 def _handle_optimize_action(suggestion: Dict[str, Any], supabase: Client):
     """
     Handle 'optimize' action: Reorder tasks.
+    The plan's tasks are loaded once, every operation is applied in memory
+    and the final order is written in one statement.
     """
     metadata = suggestion.get("metadata", {})
     operations = metadata.get("operations", [])
     
-    if not isinstance(operations, list):
+    if not isinstance(operations, list) or not operations:
 
         return
     
-    for op in operations:
-        if not isinstance(op, dict) or op.get("type") != "reorder":
-            continue
-            
-        task_id = op.get("task_id")
-        before_task_id = op.get("before_task_id")
-        
-        # Validate UUIDs
-        if not _is_valid_uuid(task_id) or not _is_valid_uuid(before_task_id):
-
-            continue
-        
-        try:
-            # Verify both tasks belong to the plan
-            plan_id = suggestion["plan_id"]
-            task_check = supabase.table("tasks").select("id").eq("id", task_id).eq("plan_id", plan_id).execute()
-            before_check = supabase.table("tasks").select("id").eq("id", before_task_id).eq("plan_id", plan_id).execute()
-            
-            if not task_check.data or not before_check.data:
-
-                continue
-            
-            # Get all tasks for plan
-            all_tasks = supabase.table("tasks").select("id, order").eq("plan_id", plan_id).order("order").execute()
-            tasks_list = all_tasks.data
-            
-            # Find current index of task to move
-            task_to_move = next((t for t in tasks_list if t["id"] == task_id), None)
-            if not task_to_move:
-                continue
-                
-            # Remove from list
-            tasks_list = [t for t in tasks_list if t["id"] != task_id]
-            
-            # Find index to insert
-            insert_idx = -1
-            for i, t in enumerate(tasks_list):
-                if t["id"] == before_task_id:
-                    insert_idx = i
-                    break
-            
-            if insert_idx != -1:
-                tasks_list.insert(insert_idx, task_to_move)
-            else:
-                tasks_list.append(task_to_move)
-                
-            # Re-assign orders
-            for i, t in enumerate(tasks_list):
-                supabase.table("tasks").update({"order": i + 1}).eq("id", t["id"]).execute()
-            
-
-        except Exception as e:
-
-            continue
+    # Get all tasks for plan
+    all_tasks = supabase.table("tasks").select("id, order").eq("plan_id", suggestion["plan_id"]).execute()
+    task_orders = _reorder_tasks(all_tasks.data or [], operations)
+    
+    _apply_task_changes(supabase, suggestion["plan_id"], task_orders, [])
 
 
 def _handle_breakdown_action(suggestion: Dict[str, Any], supabase: Client):
     """
     Handle 'breakdown' action: Generate subtasks for related tasks.
+    All tasks are loaded in one query, broken down in one batched LLM call
+    and their subtasks saved with one insert.
     """
     task_ids = suggestion.get("related_task_ids", [])
     
@@ -438,47 +447,36 @@ def _handle_breakdown_action(suggestion: Dict[str, Any], supabase: Client):
 
         return
     
-    for task_id in task_ids:
-        # Validate UUID
-        if not _is_valid_uuid(task_id):
-
-            continue
-        
-        try:
-            # Verify task belongs to the plan
-            plan_id = suggestion["plan_id"]
-            task_res = supabase.table("tasks").select("*").eq("id", task_id).eq("plan_id", plan_id).execute()
-            if not task_res.data:
-
-                continue
-                
-            task = task_res.data[0]
-            
-            # Generate subtasks
-            subtasks = generate_subtasks_with_ai(task["title"], task.get("description", ""))
-            
-            # Enforce limit
-            subtasks = subtasks[:MAX_SUBTASKS]
-            
-            # Save subtasks
-            for i, st in enumerate(subtasks):
-                if not isinstance(st, dict):
-                    continue
-                    
-                subtask_data = {
-                    "task_id": task_id,
-                    "title": _sanitize_text(st.get("title", "Subtask"), MAX_TITLE_LENGTH),
-                    "description": _sanitize_text(st.get("description", ""), MAX_DESCRIPTION_LENGTH),
-                    "is_completed": False,
-                    "order": i + 1
-                }
-                try:
-                    supabase.table("subtasks").insert(subtask_data).execute()
-
-                except Exception as e:
-
-                    continue
-        except Exception as e:
-
-            continue
+    # Validate UUIDs
+    task_ids = list(dict.fromkeys(task_id for task_id in task_ids if _is_valid_uuid(task_id)))
+    if not task_ids:
+        return
+    
+    # Only tasks that belong to the plan
+    tasks = supabase.table("tasks")\
+        .select("id, title, description")\
+        .in_("id", task_ids)\
+        .eq("plan_id", suggestion["plan_id"])\
+        .execute().data or []
+    if not tasks:
+        return
+    
+    # Generate subtasks
+    subtasks_by_task = generate_subtasks_batch(tasks)
+    
+    # Sanitize and enforce limit
+    for task_id, subtasks in subtasks_by_task.items():
+        subtasks_by_task[task_id] = [
+            {
+                "title": _sanitize_text(st.get("title", "Subtask"), MAX_TITLE_LENGTH),
+                "description": _sanitize_text(st.get("description", ""), MAX_DESCRIPTION_LENGTH),
+            }
+            for st in subtasks
+            if isinstance(st, dict)
+        ]
+    rows = build_subtask_rows(subtasks_by_task, max_per_task=MAX_SUBTASKS)
+    
+    # Save subtasks
+    if rows:
+        supabase.table("subtasks").insert(rows).execute()
 
@@ -0,0 +1,104 @@
+"""
+Circuit breaker for LLM calls
+After `failure_threshold` consecutive provider failures (timeouts, connection
+errors, 429s, 5xx) the circuit opens and calls fail immediately, so callers
+serve their fallback at once instead of waiting out a timeout. After
+`reset_timeout_seconds` one probe call is let through (half-open): success
+closes the circuit, failure opens it again.
+"""
+
+import threading
+import time
+import openai
+from services.monitoring_service import MonitoringService
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Errors that say the provider is unhealthy, as opposed to a bad request
+PROVIDER_FAILURES = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open; the call was not attempted"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_provider_failure(error: Exception) -> bool:
+    return isinstance(error, PROVIDER_FAILURES)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing
+
+    Usage:
+        breaker.before_call()         # raises CircuitOpenError while open
+        try:
+            result = call()
+        except Exception as e:
+            breaker.record_failure() if is_provider_failure(e) else breaker.record_success()
+            raise
+        breaker.record_success()
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        print(f"Circuit {self.name}: {self.state} -> {state}")
+        MonitoringService.track_custom_metric(f"llm_circuit_{state}", 1, {"circuit": self.name})
+        self.state = state
+
+    def before_call(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == OPEN and elapsed >= self.reset_timeout_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through
+                self._probe_in_flight = True
+                return
+            MonitoringService.track_custom_metric("llm_circuit_rejected", 1, {"circuit": self.name})
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout_seconds - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self._transition(CLOSED)
+
+    def abandon(self):
+        """The permitted call never reached the provider (e.g. shed while queued)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
@@ -0,0 +1,196 @@
+"""
+Email delivery pipeline
+Rendered emails go into an outbox queue. A fixed number of sender tasks
+drain it in batches through the provider's batch API, running the blocking
+HTTP call in a worker thread so the event loop never waits on email.
+Failed batches are retried with exponential backoff, and a per-recipient
+limit stops a bug or a busy plan from flooding someone's inbox.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import resend
+from config import settings
+
+
+@dataclass
+class EmailMessage:
+    """A rendered email ready to send"""
+    to_email: str
+    subject: str
+    html: str
+
+
+class ResendTransport:
+    """Send through Resend's batch endpoint (up to 100 emails per call)"""
+
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, from_address: str):
+        self.from_address = from_address
+
+    def send_batch(self, messages: List[EmailMessage]):
+        resend.Batch.send([
+            {
+                "from": self.from_address,
+                "to": [message.to_email],
+                "subject": message.subject,
+                "html": message.html,
+            }
+            for message in messages
+        ])
+
+
+class InMemoryTransport:
+    """Stand-in transport that records batches instead of sending (tests, local dev)"""
+
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, fail_times: int = 0):
+        self.batches: List[List[EmailMessage]] = []
+        # Fail this many calls before succeeding, to exercise retries
+        self.fail_times = fail_times
+
+    @property
+    def sent(self) -> List[EmailMessage]:
+        return [message for batch in self.batches for message in batch]
+
+    def send_batch(self, messages: List[EmailMessage]):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("Simulated transport failure")
+        self.batches.append(list(messages))
+
+
+class RecipientRateLimiter:
+    """Allow at most `limit` emails per recipient per fixed window"""
+
+    def __init__(self, limit: int, window_seconds: int = 3600):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._window_start = time.time()
+        self._counts: Dict[str, int] = {}
+
+    def is_allowed(self, recipient: str) -> bool:
+        now = time.time()
+        if now - self._window_start >= self.window_seconds:
+            # New window: drop every counter at once so memory stays bounded
+            self._window_start = now
+            self._counts = {}
+
+        count = self._counts.get(recipient, 0)
+        if count >= self.limit:
+            return False
+        self._counts[recipient] = count + 1
+        return True
+
+
+class EmailOutbox:
+    """
+    Queue of outgoing emails drained by bounded concurrent senders
+
+    Usage:
+        await outbox.enqueue(EmailMessage(...))
+        await outbox.flush()  # wait until everything queued so far is sent
+    """
+
+    def __init__(
+        self,
+        transport,
+        concurrency: int = 4,
+        batch_size: int = 100,
+        max_retries: int = 3,
+        retry_base_seconds: float = 1.0,
+        rate_limiter: Optional[RecipientRateLimiter] = None,
+    ):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.batch_size = min(batch_size, transport.MAX_BATCH_SIZE)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.rate_limiter = rate_limiter
+        self.sent_count = 0
+        self.failed_count = 0
+        self.rate_limited_count = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._senders: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the sender tasks on the running loop (idempotent)"""
+        if self._senders:
+            return
+        self._queue = asyncio.Queue()
+        self._senders = [asyncio.create_task(self._sender()) for _ in range(self.concurrency)]
+
+    async def enqueue(self, message: EmailMessage) -> bool:
+        """Queue a message. Returns False if the recipient is over their limit."""
+        if self.rate_limiter and not self.rate_limiter.is_allowed(message.to_email):
+            self.rate_limited_count += 1
+            print(f"Email to {message.to_email} dropped: recipient rate limit reached")
+            return False
+        self.start()
+        await self._queue.put(message)
+        return True
+
+    async def flush(self):
+        """Wait until every queued message has been sent or given up on"""
+        if self._queue:
+            await self._queue.join()
+
+    async def stop(self):
+        """Flush, then stop the senders"""
+        await self.flush()
+        for sender in self._senders:
+            sender.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        self._senders = []
+        self._queue = None
+
+    def _next_batch(self, first: EmailMessage) -> List[EmailMessage]:
+        batch = [first]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _send_with_retry(self, batch: List[EmailMessage]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self.transport.send_batch, batch)
+                self.sent_count += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed_count += len(batch)
+                    print(f"Failed to send batch of {len(batch)} emails after {attempt + 1} attempts: {e}")
+                    return
+                delay = self.retry_base_seconds * (2 ** attempt)
+                print(f"Email batch failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _sender(self):
+        while True:
+            first = await self._queue.get()
+            batch = self._next_batch(first)
+            try:
+                await self._send_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def build_transport():
+    """Transport for the configured EMAIL_TRANSPORT"""
+    if settings.email_transport == "memory":
+        return InMemoryTransport()
+    return ResendTransport(settings.email_from)
+
+# Global instance
+email_outbox = EmailOutbox(
+    build_transport(),
+    concurrency=settings.email_send_concurrency,
+    batch_size=settings.email_batch_size,
+    max_retries=settings.email_max_retries,
+    rate_limiter=RecipientRateLimiter(settings.email_recipient_hourly_limit),
+)
@@ -0,0 +1,125 @@
+"""
+Email template rendering
+Templates load from the package directory (so rendering works from any CWD),
+are compiled once at startup and backed by a bytecode cache so restarts skip
+parsing. Shared fragments (footer, etc.) are rendered once per distinct
+context and reused. Large batches from scheduled jobs render in a process
+pool, since template rendering is CPU bound and would otherwise hold the GIL.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_templates")
+
+# (template_name, context) pairs for render_many
+RenderJob = Tuple[str, Dict[str, Any]]
+
+
+class EmailRenderer:
+    """
+    Render email templates, serially or across a process pool
+
+    Usage:
+        renderer.precompile()
+        html = renderer.render("task_reminder.html", context)
+        htmls = renderer.render_many([(name, context), ...])
+    """
+
+    def __init__(
+        self,
+        template_dir: str = TEMPLATE_DIR,
+        cache_dir: Optional[str] = None,
+        pool_threshold: int = 200,
+        processes: Optional[int] = None,
+        max_fragments: int = 1024,
+    ):
+        self.template_dir = template_dir
+        self.cache_dir = cache_dir
+        # Batches smaller than this render in-process; the pool isn't worth the pickling
+        self.pool_threshold = pool_threshold
+        self.processes = processes
+        self.max_fragments = max_fragments
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(["html", "xml"]),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else FileSystemBytecodeCache(),
+            # Templates ship with the code; never stat them on each render
+            auto_reload=False,
+        )
+        self.env.globals["fragment"] = self.fragment
+        self._fragments: Dict[Tuple, Markup] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def precompile(self) -> int:
+        """Compile every template now instead of on first send. Returns the count."""
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def fragment(self, name: str, **context) -> Markup:
+        """Render a shared fragment, memoized on its (hashable) context"""
+        key = (name, tuple(sorted(context.items())))
+        html = self._fragments.get(key)
+        if html is None:
+            html = Markup(self.env.get_template(name).render(**context))
+            if len(self._fragments) >= self.max_fragments:
+                self._fragments.clear()
+            self._fragments[key] = html
+        return html
+
+    def render(self, template_name: str, context: Dict[str, Any]) -> str:
+        return self.env.get_template(template_name).render(**context)
+
+    def render_many(self, jobs: List[RenderJob]) -> List[str]:
+        """Render a batch, in the process pool when it's large enough to pay off"""
+        if len(jobs) < self.pool_threshold or self.processes == 0:
+            return [self.render(name, context) for name, context in jobs]
+
+        pool = self._get_pool()
+        workers = self.processes or os.cpu_count() or 1
+        chunk_size = max(1, len(jobs) // (workers * 4))
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        return [html for rendered in pool.map(_render_chunk, chunks) for html in rendered]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # The pool is created lazily from a worker thread; forking a threaded
+            # process can deadlock children on locks other threads held
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+                initargs=(self.template_dir, self.cache_dir),
+            )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# Each pool worker keeps its own compiled renderer
+_worker_renderer: Optional[EmailRenderer] = None
+
+def _init_worker(template_dir: str, cache_dir: Optional[str]):
+    global _worker_renderer
+    _worker_renderer = EmailRenderer(template_dir, cache_dir, processes=0)
+    _worker_renderer.precompile()
+
+def _render_chunk(jobs: List[RenderJob]) -> List[str]:
+    return [_worker_renderer.render(name, context) for name, context in jobs]
+
+# Global instance
+email_renderer = EmailRenderer(
+    cache_dir=settings.email_template_cache_dir,
+    pool_threshold=settings.email_render_pool_threshold,
+    processes=settings.email_render_processes,
+)
@@ -0,0 +1,190 @@
+"""
+Fan-out executor for scheduled jobs
+Pages through rows (usually users) with keyset pagination and processes each
+page with a bounded number of concurrent workers. Progress is checkpointed
+after every page so a crashed run resumes where it stopped. Work a page
+hands off (e.g. queued emails) is finished by before_checkpoint first, so
+the cursor never moves past rows whose side effects could still be lost.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from supabase import Client
+from services.monitoring_service import MonitoringService
+from utils.time_helpers import parse_timestamp
+
+
+# fetch_page(after_cursor, limit) -> rows ordered by the cursor column
+PageFetcher = Callable[[Optional[str], int], List[Dict[str, Any]]]
+# prepare_batch(rows) -> rows enriched with bulk lookups for the whole page
+BatchPreparer = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+ItemProcessor = Callable[[Dict[str, Any]], Awaitable[None]]
+# before_checkpoint() -> awaited after each page, before its cursor is saved
+CheckpointHook = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class FanoutResult:
+    """Outcome of one fan-out run"""
+    job_id: str
+    run_id: str
+    processed: int = 0
+    failed: int = 0
+    batches: int = 0
+    batch_timings_ms: List[float] = field(default_factory=list)
+    resumed_from: Optional[str] = None
+
+
+class MemoryCheckpointStore:
+    """In-process checkpoint store (tests and single-run scripts)"""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, Dict[str, Any]] = {}
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._checkpoints.get(job_id)
+
+    def save(self, job_id: str, run_id: str, cursor: Optional[str], status: str):
+        self._checkpoints[job_id] = {
+            "job_id": job_id,
+            "run_id": run_id,
+            "cursor": cursor,
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+class SupabaseCheckpointStore:
+    """Checkpoint store backed by the job_checkpoints table"""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        result = self.supabase.table("job_checkpoints").select("*").eq("job_id", job_id).execute()
+        return result.data[0] if result.data else None
+
+    def save(self, job_id: str, run_id: str, cursor: Optional[str], status: str):
+        self.supabase.table("job_checkpoints").upsert({
+            "job_id": job_id,
+            "run_id": run_id,
+            "cursor": cursor,
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+
+
+class FanoutExecutor:
+    """
+    Run an async processor over every row returned by a page fetcher
+
+    Usage:
+        executor = FanoutExecutor("daily_reminders", store, batch_size=500, max_concurrency=20)
+        result = await executor.run(fetch_page, process_user, cursor_key="user_id")
+
+    prepare_batch, if given, runs once per page (in a worker thread) so
+    per-row lookups can be replaced with one bulk query per page.
+    before_checkpoint, if given, is awaited after each page and before the
+    checkpoint that moves past it.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        checkpoint_store,
+        batch_size: int = 500,
+        max_concurrency: int = 20,
+        max_resume_age: timedelta = timedelta(hours=1),
+    ):
+        self.job_id = job_id
+        self.checkpoint_store = checkpoint_store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        # Interrupted runs older than this are abandoned rather than resumed
+        self.max_resume_age = max_resume_age
+
+    def _is_resumable(self, checkpoint: Optional[Dict[str, Any]]) -> bool:
+        if not checkpoint or checkpoint.get("status") != "running":
+            return False
+        updated_at = parse_timestamp(checkpoint["updated_at"])
+        return datetime.now(timezone.utc) - updated_at <= self.max_resume_age
+
+    def has_interrupted_run(self) -> bool:
+        """Whether the last run stopped midway and is recent enough to resume"""
+        return self._is_resumable(self.checkpoint_store.load(self.job_id))
+
+    async def run(
+        self,
+        fetch_page: PageFetcher,
+        process: ItemProcessor,
+        cursor_key: str = "user_id",
+        prepare_batch: Optional[BatchPreparer] = None,
+        before_checkpoint: Optional[CheckpointHook] = None,
+    ) -> FanoutResult:
+        checkpoint = await asyncio.to_thread(self.checkpoint_store.load, self.job_id)
+
+        # Resume an interrupted run, otherwise start from the beginning
+        if self._is_resumable(checkpoint):
+            run_id = checkpoint["run_id"]
+            cursor = checkpoint.get("cursor")
+            print(f"Resuming {self.job_id} run {run_id} after cursor {cursor}")
+        else:
+            run_id = str(uuid.uuid4())
+            cursor = None
+
+        result = FanoutResult(job_id=self.job_id, run_id=run_id, resumed_from=cursor)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def worker(row: Dict[str, Any]) -> bool:
+            async with semaphore:
+                try:
+                    await process(row)
+                    return True
+                except Exception as e:
+                    print(f"{self.job_id}: failed to process {row.get(cursor_key)}: {e}")
+                    MonitoringService.capture_exception(e, {
+                        "action": self.job_id,
+                        "run_id": run_id,
+                        cursor_key: row.get(cursor_key),
+                    })
+                    return False
+
+        await asyncio.to_thread(self.checkpoint_store.save, self.job_id, run_id, cursor, "running")
+
+        while True:
+            rows = await asyncio.to_thread(fetch_page, cursor, self.batch_size)
+            if not rows:
+                break
+
+            start_time = time.time()
+            batch = await asyncio.to_thread(prepare_batch, rows) if prepare_batch else rows
+            outcomes = await asyncio.gather(*(worker(row) for row in batch))
+            duration_ms = (time.time() - start_time) * 1000
+
+            result.batches += 1
+            result.processed += sum(1 for ok in outcomes if ok)
+            result.failed += sum(1 for ok in outcomes if not ok)
+            result.batch_timings_ms.append(duration_ms)
+
+            MonitoringService.track_custom_metric(
+                metric_name=f"{self.job_id}_batch_ms",
+                value=duration_ms,
+                context={"run_id": run_id, "batch": result.batches, "size": len(rows)},
+            )
+            print(f"{self.job_id}: batch {result.batches} ({len(rows)} rows) in {duration_ms:.0f}ms")
+
+            if before_checkpoint:
+                await before_checkpoint()
+            cursor = rows[-1][cursor_key]
+            await asyncio.to_thread(self.checkpoint_store.save, self.job_id, run_id, cursor, "running")
+
+            if len(rows) < self.batch_size:
+                break
+
+        await asyncio.to_thread(self.checkpoint_store.save, self.job_id, run_id, None, "completed")
+        print(f"{self.job_id}: processed {result.processed} rows ({result.failed} failed) in {result.batches} batches")
+        return result
@@ -0,0 +1,165 @@
+"""
+Leader election for the scheduler
+Every API worker process calls into the lifespan hook, but only one process
+may run the scheduled jobs. Workers compete for a lock; the holder becomes
+leader and starts the scheduler, the rest keep retrying so one of them takes
+over if the leader dies.
+
+Backends:
+- FileLeaderLock: fcntl lock on a local file (single host, tests)
+- PostgresAdvisoryLeaderLock: session-level advisory lock (production, multi-host)
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import os
+from typing import Callable, Optional
+
+
+class FileLeaderLock:
+    """Exclusive, non-blocking lock on a local file. Released if the process dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        if self._file:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def is_held(self) -> bool:
+        return self._file is not None
+
+    def release(self):
+        if self._file:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class PostgresAdvisoryLeaderLock:
+    """
+    Session-level Postgres advisory lock held on a dedicated connection.
+    Postgres releases it automatically when the connection drops.
+    """
+
+    def __init__(self, dsn: str, name: str):
+        self.dsn = dsn
+        # Advisory locks take a signed 64-bit key
+        self.key = int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+        self._conn = None
+
+    def try_acquire(self) -> bool:
+        if self._conn:
+            return True
+        try:
+            import psycopg
+        except ImportError:
+            raise RuntimeError("psycopg is required for the postgres scheduler lock backend")
+
+        conn = psycopg.connect(self.dsn, autocommit=True)
+        acquired = conn.execute("select pg_try_advisory_lock(%s)", (self.key,)).fetchone()[0]
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def is_held(self) -> bool:
+        if not self._conn:
+            return False
+        try:
+            self._conn.execute("select 1")
+            return True
+        except Exception:
+            # Connection is gone and the lock with it
+            self._conn = None
+            return False
+
+    def release(self):
+        if self._conn:
+            try:
+                self._conn.execute("select pg_advisory_unlock(%s)", (self.key,))
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+class LeaderElector:
+    """
+    Keep trying to hold a leader lock and run callbacks on leadership changes
+
+    Usage:
+        elector = LeaderElector(lock, on_elected=start_scheduler, on_demoted=shutdown_scheduler)
+        await elector.start()
+        ...
+        await elector.stop()
+    """
+
+    def __init__(
+        self,
+        lock,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+        retry_seconds: float = 30,
+    ):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._check_lock: Optional[asyncio.Lock] = None
+
+    async def check(self):
+        """Try to become leader, or confirm leadership is still held"""
+        # Created lazily so it binds to the running loop
+        if self._check_lock is None:
+            self._check_lock = asyncio.Lock()
+        async with self._check_lock:
+            await self._check()
+
+    async def _check(self):
+        try:
+            if self.is_leader:
+                if not await asyncio.to_thread(self.lock.is_held):
+                    print(f"Scheduler leadership lost (pid {os.getpid()})")
+                    self.is_leader = False
+                    self.on_demoted()
+            elif await asyncio.to_thread(self.lock.try_acquire):
+                print(f"Scheduler leadership acquired (pid {os.getpid()})")
+                self.is_leader = True
+                self.on_elected()
+        except Exception as e:
+            print(f"Leader election error: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.retry_seconds)
+            await self.check()
+
+    async def start(self):
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            self.on_demoted()
+        await asyncio.to_thread(self.lock.release)
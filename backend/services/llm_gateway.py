@@ -0,0 +1,308 @@
+"""
+LLM gateway: admission control for every OpenAI call
+Each model gets a concurrency limit. Waiting calls queue in two lanes:
+interactive (chat, plan and subtask generation) always goes first, and
+background work (suggestions, templates) is capped to a share of the slots.
+A call that would queue past the depth limit, or waits longer than its
+lane allows, is shed immediately with a 503 and Retry-After rather than
+piling onto the provider and slowing everyone down.
+
+Each model also has a circuit breaker (services/circuit_breaker.py), and
+every call runs under a per-endpoint deadline that covers queueing and the
+request itself, so an outage costs callers at most their budget before they
+fall back.
+
+Calls are synchronous (the OpenAI client blocks), so routes run them in the
+threadpool and waiting happens there, never on the event loop.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from config import settings
+from services.monitoring_service import MonitoringService
+from services.circuit_breaker import CircuitBreaker, is_provider_failure
+from services.llm_hedging import Hedger, HedgeCancelledError
+from services.llm_metering import LLMMeter, llm_meter
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+
+
+class LLMOverloadedError(HTTPException):
+    """Raised when a call is shed; surfaces to the client as 503 with Retry-After"""
+
+    def __init__(self, model: str, lane: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The AI service is busy right now. Please try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.model = model
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class ModelGovernor:
+    """Concurrency limit and two-lane priority queue for one model"""
+
+    def __init__(self, model: str, max_concurrency: int, background_max: int, max_queue_depth: int):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.background_max = min(background_max, max_concurrency)
+        self.max_queue_depth = max_queue_depth
+        self.in_flight = 0
+        self.background_in_flight = 0
+        # Moving average of call duration, used to estimate Retry-After
+        self.avg_latency_seconds = 2.0
+        self._waiting: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self._cond = threading.Condition()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def _retry_after(self) -> float:
+        # Rough time for the current queue to drain through the available slots
+        return self.avg_latency_seconds * (self.queue_depth + 1) / self.max_concurrency
+
+    def _can_start(self, lane: str, ticket: object) -> bool:
+        if self.in_flight >= self.max_concurrency or self._waiting[lane][0] is not ticket:
+            return False
+        if lane == BACKGROUND:
+            # Interactive callers always go first; background never takes every slot
+            return not self._waiting[INTERACTIVE] and self.background_in_flight < self.background_max
+        return True
+
+    def acquire(self, lane: str, max_wait_seconds: float) -> float:
+        """Wait for a slot. Returns seconds waited, raises LLMOverloadedError if shed."""
+        start = time.monotonic()
+        deadline = start + max_wait_seconds
+        with self._cond:
+            must_wait = self.queue_depth > 0 or self.in_flight >= self.max_concurrency
+            if must_wait and self.queue_depth >= self.max_queue_depth:
+                raise LLMOverloadedError(self.model, lane, self._retry_after())
+
+            ticket = object()
+            self._waiting[lane].append(ticket)
+            try:
+                while not self._can_start(lane, ticket):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMOverloadedError(self.model, lane, self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting[lane].remove(ticket)
+                # The head of a lane changed; let the next waiter re-check
+                self._cond.notify_all()
+
+            self.in_flight += 1
+            if lane == BACKGROUND:
+                self.background_in_flight += 1
+        return time.monotonic() - start
+
+    def release(self, lane: str, duration_seconds: float):
+        with self._cond:
+            self.in_flight -= 1
+            if lane == BACKGROUND:
+                self.background_in_flight -= 1
+            self.avg_latency_seconds = 0.8 * self.avg_latency_seconds + 0.2 * duration_seconds
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "queued_interactive": len(self._waiting[INTERACTIVE]),
+                "queued_background": len(self._waiting[BACKGROUND]),
+                "avg_latency_ms": round(self.avg_latency_seconds * 1000),
+            }
+
+
+class LLMGateway:
+    """
+    Route LLM calls through per-model governors
+
+    Usage:
+        response = llm_gateway.create_chat_completion(client, INTERACTIVE, model=..., messages=...)
+
+        with llm_gateway.slot(model, BACKGROUND):
+            ...
+    """
+
+    def __init__(
+        self,
+        default_concurrency: int = 16,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        background_max: int = 4,
+        max_queue_depth: int = 64,
+        max_wait_seconds: Optional[Dict[str, float]] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+        default_deadline_seconds: float = 30.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0,
+        hedger: Optional[Hedger] = None,
+        meter: Optional[LLMMeter] = None,
+    ):
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.background_max = background_max
+        self.max_queue_depth = max_queue_depth
+        self.max_wait_seconds = max_wait_seconds or {INTERACTIVE: 10.0, BACKGROUND: 30.0}
+        # Total budget (queueing + request) per endpoint
+        self.deadlines = deadlines or {}
+        self.default_deadline_seconds = default_deadline_seconds
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_seconds = circuit_reset_seconds
+        # Hedging is opt-in per call and only active when a hedger is configured
+        self.hedger = hedger
+        # Usage metering and per-user budgets (optional)
+        self.meter = meter
+        self._governors: Dict[str, ModelGovernor] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def governor(self, model: str) -> ModelGovernor:
+        with self._lock:
+            if model not in self._governors:
+                self._governors[model] = ModelGovernor(
+                    model,
+                    self.model_concurrency.get(model, self.default_concurrency),
+                    self.background_max,
+                    self.max_queue_depth,
+                )
+            return self._governors[model]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(
+                    model, self.circuit_failure_threshold, self.circuit_reset_seconds
+                )
+            return self._breakers[model]
+
+    @contextmanager
+    def slot(self, model: str, lane: str = INTERACTIVE, max_wait_seconds: Optional[float] = None):
+        """Hold one of `model`'s concurrency slots for the duration of the block"""
+        governor = self.governor(model)
+        context = {"model": model, "lane": lane}
+        if max_wait_seconds is None:
+            max_wait_seconds = self.max_wait_seconds[lane]
+        try:
+            waited = governor.acquire(lane, max_wait_seconds)
+        except LLMOverloadedError:
+            MonitoringService.track_custom_metric("llm_shed", 1, context)
+            print(f"LLM call shed ({model}, {lane}): queue depth {governor.queue_depth}")
+            raise
+
+        MonitoringService.track_custom_metric("llm_queue_wait_ms", waited * 1000, context)
+        MonitoringService.track_custom_metric("llm_queue_depth", governor.queue_depth, context)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            governor.release(lane, time.monotonic() - start)
+
+    def create_chat_completion(
+        self,
+        client,
+        lane: str = INTERACTIVE,
+        endpoint: Optional[str] = None,
+        hedge: bool = False,
+        **kwargs,
+    ):
+        """
+        client.chat.completions.create(**kwargs) inside a slot for kwargs["model"],
+        guarded by the model's circuit breaker and the endpoint's deadline.
+        Raises CircuitOpenError without calling while the circuit is open.
+        With hedge=True (and a hedger configured) slow calls are hedged.
+        """
+        deadline_at = time.monotonic() + self.deadlines.get(endpoint, self.default_deadline_seconds)
+        if self.meter:
+            # Over-budget users get a cheaper model, or LLMBudgetExceededError past the hard limit
+            kwargs = {**kwargs, "model": self.meter.check_budget(kwargs["model"])}
+        if hedge and self.hedger:
+            return self.hedger.call(
+                endpoint, lambda cancelled: self._call(client, lane, endpoint, deadline_at, kwargs, cancelled)
+            )
+        return self._call(client, lane, endpoint, deadline_at, kwargs)
+
+    def _call(
+        self,
+        client,
+        lane: str,
+        endpoint: Optional[str],
+        deadline_at: float,
+        kwargs: Dict[str, Any],
+        cancelled: Optional[threading.Event] = None,
+    ):
+        model = kwargs["model"]
+        breaker = self.breaker(model)
+        breaker.before_call()
+
+        start = time.monotonic()
+        try:
+            with self.slot(model, lane, min(self.max_wait_seconds[lane], deadline_at - start)):
+                if cancelled and cancelled.is_set():
+                    # Lost a hedge race while queued; never reached the provider
+                    breaker.abandon()
+                    raise HedgeCancelledError()
+                try:
+                    # Whatever queueing left of the budget bounds the request itself
+                    response = client.chat.completions.create(
+                        **kwargs, timeout=max(0.1, deadline_at - time.monotonic())
+                    )
+                except Exception as e:
+                    if is_provider_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    raise
+                breaker.record_success()
+                if self.meter:
+                    self.meter.record(
+                        endpoint, model, getattr(response, "usage", None), (time.monotonic() - start) * 1000
+                    )
+                return response
+        except LLMOverloadedError:
+            breaker.abandon()
+            raise
+        finally:
+            MonitoringService.track_custom_metric(
+                "llm_call_ms", (time.monotonic() - start) * 1000, {"model": model, "endpoint": endpoint}
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current in-flight and queue state per model"""
+        with self._lock:
+            governors = list(self._governors.values())
+        return {governor.model: governor.snapshot() for governor in governors}
+
+# Global instance
+llm_gateway = LLMGateway(
+    default_concurrency=settings.llm_max_concurrency,
+    model_concurrency=settings.llm_model_concurrency,
+    background_max=settings.llm_background_max_concurrency,
+    max_queue_depth=settings.llm_max_queue_depth,
+    max_wait_seconds={
+        INTERACTIVE: settings.llm_interactive_max_wait_seconds,
+        BACKGROUND: settings.llm_background_max_wait_seconds,
+    },
+    deadlines=settings.llm_deadlines,
+    default_deadline_seconds=settings.llm_default_deadline_seconds,
+    circuit_failure_threshold=settings.llm_circuit_failure_threshold,
+    circuit_reset_seconds=settings.llm_circuit_reset_seconds,
+    hedger=Hedger(
+        max_ratio=settings.llm_hedge_max_ratio,
+        default_delay_seconds=settings.llm_hedge_default_delay_seconds,
+        min_delay_seconds=settings.llm_hedge_min_delay_seconds,
+        percentile=settings.llm_hedge_percentile,
+    ) if settings.llm_hedging_enabled else None,
+    meter=llm_meter,
+)
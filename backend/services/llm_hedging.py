@@ -0,0 +1,160 @@
+"""
+Hedged LLM requests
+A hedged call starts the request, and if it has not returned within the
+endpoint's recent p95 latency, fires an identical second request; whichever
+succeeds first wins. A budget caps hedges to a fraction of requests so the
+extra cost stays bounded.
+
+OpenAI calls are blocking, so attempts run in a thread pool. A losing attempt
+that has not reached the provider yet (still queued for a slot) is cancelled;
+one already in flight cannot be interrupted and simply finishes in the
+background, its result discarded.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+from services.monitoring_service import MonitoringService
+
+
+class HedgeCancelledError(Exception):
+    """The attempt lost the race before it reached the provider"""
+
+
+class LatencyTracker:
+    """Rolling window of call durations per endpoint"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, endpoint: str, q: float, min_samples: int = 20) -> Optional[float]:
+        """q-th percentile, or None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[int(q / 100 * (len(samples) - 1))]
+
+
+class HedgeBudget:
+    """Allow hedges for at most `max_ratio` of requests"""
+
+    def __init__(self, max_ratio: float):
+        self.max_ratio = max_ratio
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            if self.requests >= 10_000:
+                # Halve both so the ratio follows recent traffic
+                self.requests //= 2
+                self.hedges //= 2
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+
+class Hedger:
+    """
+    Run an attempt, hedging it with a second one if it is slow
+
+    Usage:
+        result = hedger.call("chat", lambda cancelled: make_request(cancelled))
+
+    The attempt receives a threading.Event that is set once it has lost; it
+    should raise HedgeCancelledError if it sees it before calling the provider.
+    """
+
+    def __init__(
+        self,
+        max_ratio: float = 0.1,
+        default_delay_seconds: float = 3.0,
+        min_delay_seconds: float = 1.0,
+        percentile: float = 95,
+        max_workers: int = 32,
+    ):
+        self.default_delay_seconds = default_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.percentile = percentile
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget(max_ratio)
+        self.fired = 0
+        self.won = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    def delay(self, endpoint: str) -> float:
+        """How long to wait for the first attempt before hedging"""
+        p = self.latency.percentile(endpoint, self.percentile)
+        return max(self.min_delay_seconds, p if p is not None else self.default_delay_seconds)
+
+    def _submit(self, endpoint: str, attempt: Callable[[threading.Event], Any], cancelled: threading.Event) -> Future:
+        def timed():
+            start = time.monotonic()
+            result = attempt(cancelled)
+            self.latency.record(endpoint, time.monotonic() - start)
+            return result
+        # Carry the caller's context (e.g. the metered user) into the worker thread
+        return self._executor.submit(contextvars.copy_context().run, timed)
+
+    def call(self, endpoint: str, attempt: Callable[[threading.Event], Any]) -> Any:
+        self.budget.record_request()
+        context = {"endpoint": endpoint}
+
+        primary_cancelled = threading.Event()
+        primary = self._submit(endpoint, attempt, primary_cancelled)
+        done, _ = wait([primary], timeout=self.delay(endpoint))
+        if done:
+            return primary.result()
+
+        if not self.budget.try_acquire():
+            MonitoringService.track_custom_metric("llm_hedge_budget_exhausted", 1, context)
+            return primary.result()
+
+        self.fired += 1
+        MonitoringService.track_custom_metric("llm_hedge_fired", 1, context)
+        hedge_cancelled = threading.Event()
+        hedge = self._submit(endpoint, attempt, hedge_cancelled)
+
+        # First success wins; an error only counts once both attempts have failed
+        pending = {primary: primary_cancelled, hedge: hedge_cancelled}
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for loser, cancelled in pending.items():
+                    cancelled.set()
+                    loser.cancel()
+                if future is hedge:
+                    self.won += 1
+                    MonitoringService.track_custom_metric("llm_hedge_won", 1, context)
+                return result
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.budget.requests,
+            "hedges_fired": self.fired,
+            "hedges_won": self.won,
+        }
@@ -0,0 +1,204 @@
+"""
+LLM usage metering
+The gateway reports every completed call here with its token usage and
+latency, tagged with the endpoint, model and the user from the request
+context. Usage is summed in memory per (day, user, endpoint, model) and
+flushed in batches to llm_usage_daily (migrations/005), which adds it to the
+stored totals atomically so every worker can flush independently.
+
+Each user has a daily budget: past it, calls are downgraded to a cheaper
+model; past the hard limit, they fail fast and callers serve their fallback.
+"""
+
+import asyncio
+import threading
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+from fastapi import Depends
+from config import settings
+from services.auth_service import get_user_from_token
+from services.monitoring_service import MonitoringService
+
+# User the current request's LLM calls are billed to
+current_llm_user: ContextVar[Optional[str]] = ContextVar("current_llm_user", default=None)
+
+# Rows for calls made outside a user request (e.g. template generation)
+SYSTEM_USER = "system"
+
+
+async def get_metered_user(user_id: str = Depends(get_user_from_token)) -> str:
+    """
+    get_user_from_token that also bills this request's LLM calls to the user.
+    Async so the context variable is set in the request's own context.
+    """
+    current_llm_user.set(user_id)
+    return user_id
+
+
+class LLMBudgetExceededError(Exception):
+    """The user is past their hard daily LLM budget; callers serve their fallback"""
+
+    def __init__(self, user_id: str, spent_usd: float):
+        super().__init__(f"Daily LLM budget exceeded for user {user_id} (${spent_usd:.4f})")
+        self.user_id = user_id
+        self.spent_usd = spent_usd
+
+
+def _as_int(value: Any) -> int:
+    return value if isinstance(value, int) else 0
+
+
+class LLMMeter:
+    """
+    Aggregate LLM usage and enforce per-user daily budgets
+
+    Usage:
+        model = meter.check_budget(model)      # may downgrade or raise
+        ... call ...
+        meter.record(endpoint, model, response.usage, latency_ms)
+        await meter.flush(supabase)            # periodically
+    """
+
+    def __init__(
+        self,
+        pricing: Dict[str, Dict[str, float]],
+        daily_budget_usd: float = 0.5,
+        hard_limit_multiplier: float = 2.0,
+        downgrade_model: Optional[str] = None,
+    ):
+        # model -> {"input": $ per 1M tokens, "output": $ per 1M tokens}
+        self.pricing = pricing
+        self.daily_budget_usd = daily_budget_usd
+        self.hard_limit_multiplier = hard_limit_multiplier
+        self.downgrade_model = downgrade_model
+        # (day, user, endpoint, model) -> counters not yet flushed
+        self._pending: Dict[Tuple[str, str, str, str], Dict[str, float]] = {}
+        # user -> (day, spend stored in the database as of the last flush)
+        self._flushed_spend: Dict[str, Tuple[str, float]] = {}
+        # user -> (day, spend recorded in this process since the last flush)
+        self._pending_spend: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = self.pricing.get(model)
+        if not price:
+            return 0.0
+        return (prompt_tokens * price["input"] + completion_tokens * price["output"]) / 1_000_000
+
+    def spent_today(self, user_id: str) -> float:
+        today = date.today().isoformat()
+        with self._lock:
+            total = 0.0
+            for spend in (self._flushed_spend, self._pending_spend):
+                day, amount = spend.get(user_id, (today, 0.0))
+                if day == today:
+                    total += amount
+            return total
+
+    def check_budget(self, model: str) -> str:
+        """Model to use for the current user's next call (raises past the hard limit)"""
+        user_id = current_llm_user.get()
+        if not user_id or self.daily_budget_usd <= 0:
+            return model
+
+        spent = self.spent_today(user_id)
+        if spent >= self.daily_budget_usd * self.hard_limit_multiplier:
+            MonitoringService.track_custom_metric("llm_budget_blocked", 1, {"user_id": user_id})
+            raise LLMBudgetExceededError(user_id, spent)
+        if spent >= self.daily_budget_usd and self.downgrade_model:
+            MonitoringService.track_custom_metric("llm_budget_downgraded", 1, {"user_id": user_id})
+            return self.downgrade_model
+        return model
+
+    def record(self, endpoint: Optional[str], model: str, usage: Any, latency_ms: float):
+        prompt_tokens = _as_int(getattr(usage, "prompt_tokens", 0))
+        completion_tokens = _as_int(getattr(usage, "completion_tokens", 0))
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        user_id = current_llm_user.get() or SYSTEM_USER
+        today = date.today().isoformat()
+        key = (today, user_id, endpoint or "unknown", model)
+
+        with self._lock:
+            counters = self._pending.setdefault(key, {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0, "cost_usd": 0.0,
+            })
+            counters["calls"] += 1
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            counters["latency_ms"] += latency_ms
+            counters["cost_usd"] += cost
+
+            day, amount = self._pending_spend.get(user_id, (today, 0.0))
+            self._pending_spend[user_id] = (today, (amount if day == today else 0.0) + cost)
+
+        MonitoringService.track_custom_metric("llm_tokens", prompt_tokens + completion_tokens, {
+            "endpoint": endpoint, "model": model,
+        })
+
+    def take_pending(self):
+        """Swap out the unflushed counters (for flush)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            pending_spend, self._pending_spend = self._pending_spend, {}
+        return pending, pending_spend
+
+    def flush_sync(self, supabase) -> int:
+        """Write pending usage in one RPC call. Returns the number of rows written."""
+        pending, pending_spend = self.take_pending()
+        if not pending:
+            return 0
+
+        rows = [
+            {
+                "day": day,
+                "user_id": user_id,
+                "endpoint": endpoint,
+                "model": model,
+                "calls": counters["calls"],
+                "prompt_tokens": counters["prompt_tokens"],
+                "completion_tokens": counters["completion_tokens"],
+                "latency_ms": round(counters["latency_ms"]),
+                "cost_usd": round(counters["cost_usd"], 6),
+            }
+            for (day, user_id, endpoint, model), counters in pending.items()
+        ]
+        try:
+            result = supabase.rpc("record_llm_usage", {"usage": rows}).execute()
+        except Exception as e:
+            # Put everything back so the next flush retries it
+            self._restore(pending, pending_spend)
+            raise e
+
+        # The RPC returns each user's stored total for the day; that is now the baseline
+        with self._lock:
+            for row in result.data or []:
+                self._flushed_spend[row["user_id"]] = (str(row["day"]), float(row["cost_usd"]))
+        return len(rows)
+
+    def _restore(self, pending, pending_spend):
+        with self._lock:
+            for key, counters in pending.items():
+                current = self._pending.setdefault(key, {name: 0 for name in counters})
+                for name, value in counters.items():
+                    current[name] += value
+            for user_id, (day, amount) in pending_spend.items():
+                current_day, current_amount = self._pending_spend.get(user_id, (day, 0.0))
+                self._pending_spend[user_id] = (day, amount + (current_amount if current_day == day else 0.0))
+
+    async def run_flusher(self, get_supabase, interval_seconds: float):
+        """Flush every interval until cancelled (started from the app lifespan)"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.flush_sync, get_supabase())
+            except Exception as e:
+                print(f"LLM usage flush failed: {e}")
+
+# Global instance
+llm_meter = LLMMeter(
+    pricing=settings.llm_pricing,
+    daily_budget_usd=settings.llm_user_daily_budget_usd,
+    hard_limit_multiplier=settings.llm_budget_hard_limit_multiplier,
+    downgrade_model=settings.llm_budget_downgrade_model,
+)
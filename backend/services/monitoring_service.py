@@ -144,6 +144,17 @@ class MonitoringService:
             },
         )
 
+    @staticmethod
+    def track_custom_metric(metric_name: str, value: float, context: Optional[Dict[str, Any]] = None):
+        """Record a custom numeric metric as a measurement plus a breadcrumb with its context"""
+        sentry_sdk.set_measurement(metric_name, value)
+        MonitoringService.add_breadcrumb(
+            message=f"{metric_name}: {value:.2f}",
+            category="metrics",
+            level="info",
+            data={"value": value, **(context or {})},
+        )
+
     @staticmethod
     def set_user_context(user_id: str, email: Optional[str] = None):
         """Set user context for all subsequent events"""
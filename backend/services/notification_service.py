@@ -1,19 +1,42 @@
 import resend
+import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 from config import settings
+from services.email_delivery_service import EmailMessage
+from services.email_render_service import email_renderer
 
 # Initialize Resend
 resend.api_key = settings.resend_api_key
 
-# Initialize Jinja2 environment for email templates
-template_env = Environment(
-    loader=FileSystemLoader("services/email_templates"),
-    autoescape=select_autoescape(["html", "xml"]),
-)
-
 class NotificationService:
+    @staticmethod
+    def render_email(
+        to_email: str,
+        subject: str,
+        template_name: str,
+        context: Dict[str, Any]
+    ) -> EmailMessage:
+        """Render a Jinja2 email template into a message"""
+        return EmailMessage(
+            to_email=to_email,
+            subject=subject,
+            html=email_renderer.render(template_name, context),
+        )
+
+    @staticmethod
+    def render_emails(emails: List[Dict[str, Any]]) -> List[EmailMessage]:
+        """
+        Render a batch of emails (to_email, subject, template_name, context) in one go.
+        Scheduled jobs send the result through email_outbox.
+        Large batches render in a process pool; call from a worker thread, not the event loop.
+        """
+        htmls = email_renderer.render_many([(email["template_name"], email["context"]) for email in emails])
+        return [
+            EmailMessage(to_email=email["to_email"], subject=email["subject"], html=html)
+            for email, html in zip(emails, htmls)
+        ]
+
     @staticmethod
     async def send_email(
         to_email: str,
@@ -22,22 +45,22 @@ class NotificationService:
         context: Dict[str, Any]
     ) -> bool:
         """
-        Send an email using Resend and Jinja2 templates
+        Send an email immediately using Resend and Jinja2 templates
         """
         try:
             # Render template
-            template = template_env.get_template(template_name)
-            html_content = template.render(**context)
+            message = NotificationService.render_email(to_email, subject, template_name, context)
 
             # Send email
             params = {
-                "from": "PlanGenie <notifications@plangenie.app>",
+                "from": settings.email_from,
                 "to": [to_email],
                 "subject": subject,
-                "html": html_content,
+                "html": message.html,
             }
 
-            email = resend.Emails.send(params)
+            # Resend's client is blocking; keep it off the event loop
+            email = await asyncio.to_thread(resend.Emails.send, params)
             print(f"Email sent successfully to {to_email}: {email}")
             return True
 
@@ -46,41 +69,62 @@ class NotificationService:
             return False
 
     @staticmethod
-    async def send_task_reminder(
+    def _task_reminder_email(
         user_email: str,
         task: Dict[str, Any],
         plan: Dict[str, Any]
-    ) -> bool:
-        """Send a reminder for a specific task"""
-        return await NotificationService.send_email(
-            to_email=user_email,
-            subject=f"Reminder: {task['title']} is due soon",
-            template_name="task_reminder.html",
-            context={
+    ) -> Dict[str, Any]:
+        return {
+            "to_email": user_email,
+            "subject": f"Reminder: {task['title']} is due soon",
+            "template_name": "task_reminder.html",
+            "context": {
                 "task": task,
                 "plan": plan,
                 "user_email": user_email,
                 "action_url": f"{settings.frontend_url}/plans/{plan['id']}",
-            }
+                "dashboard_url": f"{settings.frontend_url}/dashboard",
+            },
+        }
+
+    @staticmethod
+    async def send_task_reminder(
+        user_email: str,
+        task: Dict[str, Any],
+        plan: Dict[str, Any]
+    ) -> bool:
+        """Send a reminder for a specific task"""
+        return await NotificationService.send_email(
+            **NotificationService._task_reminder_email(user_email, task, plan)
         )
 
     @staticmethod
-    async def send_weekly_digest(
+    def _weekly_digest_email(
         user_email: str,
         stats: Dict[str, Any],
         upcoming_tasks: List[Dict[str, Any]]
-    ) -> bool:
-        """Send weekly digest email"""
-        return await NotificationService.send_email(
-            to_email=user_email,
-            subject="Your Weekly PlanGenie Digest",
-            template_name="weekly_digest.html",
-            context={
+    ) -> Dict[str, Any]:
+        return {
+            "to_email": user_email,
+            "subject": "Your Weekly PlanGenie Digest",
+            "template_name": "weekly_digest.html",
+            "context": {
                 "stats": stats,
                 "upcoming_tasks": upcoming_tasks,
                 "user_email": user_email,
                 "dashboard_url": f"{settings.frontend_url}/dashboard",
-            }
+            },
+        }
+
+    @staticmethod
+    async def send_weekly_digest(
+        user_email: str,
+        stats: Dict[str, Any],
+        upcoming_tasks: List[Dict[str, Any]]
+    ) -> bool:
+        """Send weekly digest email"""
+        return await NotificationService.send_email(
+            **NotificationService._weekly_digest_email(user_email, stats, upcoming_tasks)
         )
 
     @staticmethod
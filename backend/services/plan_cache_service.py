@@ -0,0 +1,219 @@
+"""
+Semantic plan cache
+Serves a previous generate_plan_with_ai result for a near-duplicate request
+("Learn Spanish in 3 months" vs "3-month Spanish learning plan") instead of
+calling the LLM again. Requests are embedded locally as hashed TF-IDF
+vectors and compared against a NumPy matrix of cached requests; the best
+match above the similarity threshold (with the same timeline) is reused,
+with the old title swapped for the new one.
+
+The cache is per process, holds `capacity` plans and evicts the least
+recently used. By default entries are only shared between one user's
+requests (PLAN_CACHE_SCOPE=user).
+"""
+
+import copy
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import settings
+from services.llm_metering import current_llm_user
+from services.monitoring_service import MonitoringService
+
+_WORD = re.compile(r"[a-z]+|\d+")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "by", "from", "into",
+    "my", "our", "your", "we", "i", "me", "it", "is", "be", "want", "plan", "plans", "this", "that",
+    "before", "after",
+}
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping: learning/learn, months/month, moving/move all meet"""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def normalize_timeline(timeline: Optional[str]) -> str:
+    return " ".join(_stem(word) for word in _WORD.findall((timeline or "").lower()))
+
+
+class HashedTfidfEmbedder:
+    """
+    Hashed bag-of-words term frequencies; IDF weights come from the cached
+    documents. Unigrams only: paraphrases rarely keep the word order.
+    """
+
+    def __init__(self, n_features: int = 2 ** 12):
+        self.n_features = n_features
+
+    def terms(self, text: str) -> List[str]:
+        return [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+    def term_frequencies(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for term in self.terms(text):
+            vector[zlib.crc32(term.encode()) % self.n_features] += 1
+        # Sublinear tf so a repeated word doesn't dominate
+        np.log1p(vector, out=vector)
+        return vector
+
+
+class SemanticPlanCache:
+    """
+    Near-duplicate cache of generated plans
+
+    Usage:
+        plan = plan_cache.lookup(title, description, timeline)
+        if plan is None:
+            plan = generate(...)
+            plan_cache.insert(title, description, timeline, plan, generation_ms)
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1000,
+        threshold: float = 0.85,
+        n_features: int = 2 ** 12,
+        scope: str = "user",
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.scope = scope
+        self.embedder = HashedTfidfEmbedder(n_features)
+        # One row per slot: term frequencies of title + description, and their squares
+        self._vectors = np.zeros((capacity, n_features), dtype=np.float32)
+        self._squares = np.zeros((capacity, n_features), dtype=np.float32)
+        # Number of cached documents containing each hashed term (for IDF)
+        self._document_frequency = np.zeros(n_features, dtype=np.float32)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.lookup_ms = 0.0
+
+    def _scope_key(self) -> str:
+        return (current_llm_user.get() or "") if self.scope == "user" else ""
+
+    def _idf(self) -> np.ndarray:
+        return (np.log((1 + self._size) / (1 + self._document_frequency)) + 1).astype(np.float32)
+
+    def lookup(self, title: str, description: str, timeline: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A cached plan for a near-duplicate request, adapted to `title`, or None"""
+        start = time.perf_counter()
+        query = self.embedder.term_frequencies(f"{title} {description}")
+        scope_key = self._scope_key()
+        timeline_key = normalize_timeline(timeline)
+
+        with self._lock:
+            match = None
+            if self._size and query.any():
+                # Cosine similarity of the IDF-weighted vectors, as two matrix-vector products
+                idf_squared = self._idf() ** 2
+                dots = self._vectors[: self._size] @ (query * idf_squared)
+                norms = np.sqrt(self._squares[: self._size] @ idf_squared) * np.sqrt((query ** 2) @ idf_squared)
+                similarities = dots / np.maximum(norms, 1e-9)
+                for slot in np.argsort(-similarities):
+                    if similarities[slot] < self.threshold:
+                        break
+                    entry = self._entries[slot]
+                    if entry["scope"] == scope_key and entry["timeline"] == timeline_key:
+                        match = (int(slot), float(similarities[slot]))
+                        break
+
+            if match is None:
+                self.misses += 1
+            else:
+                slot, similarity = match
+                self._clock += 1
+                self._last_used[slot] = self._clock
+                entry = self._entries[slot]
+                self.hits += 1
+                self.saved_ms += entry["generation_ms"]
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.lookup_ms += elapsed_ms
+
+        if match is None:
+            MonitoringService.track_custom_metric("plan_cache_miss", 1, {})
+            return None
+        MonitoringService.track_custom_metric("plan_cache_hit", 1, {"similarity": round(similarity, 3)})
+        MonitoringService.track_custom_metric("plan_cache_saved_ms", entry["generation_ms"], {})
+        print(f"Plan cache hit ({similarity:.2f}): '{title}' reuses '{entry['title']}'")
+        return adapt_plan(entry["plan"], entry["title"], title)
+
+    def insert(
+        self,
+        title: str,
+        description: str,
+        timeline: Optional[str],
+        plan: Dict[str, Any],
+        generation_ms: float = 0.0,
+    ):
+        vector = self.embedder.term_frequencies(f"{title} {description}")
+        if not vector.any():
+            return
+        with self._lock:
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+            else:
+                # Evict the least recently used plan
+                slot = int(np.argmin(self._last_used))
+                self._document_frequency -= self._vectors[slot] > 0
+            self._vectors[slot] = vector
+            self._squares[slot] = vector ** 2
+            self._document_frequency += vector > 0
+            self._entries[slot] = {
+                "title": title,
+                "timeline": normalize_timeline(timeline),
+                "scope": self._scope_key(),
+                "plan": copy.deepcopy(plan),
+                "generation_ms": generation_ms,
+            }
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_ms": round(self.saved_ms),
+            "avg_lookup_ms": round(self.lookup_ms / lookups, 3) if lookups else 0.0,
+        }
+
+
+def adapt_plan(plan: Dict[str, Any], old_title: str, new_title: str) -> Dict[str, Any]:
+    """Copy of a cached plan with mentions of the old title replaced by the new one"""
+    adapted = copy.deepcopy(plan)
+    if old_title.strip().lower() == new_title.strip().lower():
+        return adapted
+    pattern = re.compile(re.escape(old_title.strip()), re.IGNORECASE)
+    for task in adapted.get("tasks", []):
+        for field in ("title", "description"):
+            if isinstance(task.get(field), str):
+                task[field] = pattern.sub(new_title.strip(), task[field])
+    return adapted
+
+# Global instance
+plan_cache = SemanticPlanCache(
+    capacity=settings.plan_cache_capacity,
+    threshold=settings.plan_cache_similarity_threshold,
+    scope=settings.plan_cache_scope,
+)
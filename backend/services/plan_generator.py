@@ -1,15 +1,18 @@
-from openai import OpenAI
+from services.ai_service import LazyOpenAIClient, model_for
 from config import get_settings
 import json
+import time
 from typing import Dict
 
 # Import utilities
-from utils.plan_config import SYSTEM_PROMPT, TASK_CATEGORIES
+from utils.plan_config import TASK_CATEGORIES
 from utils.json_helpers import clean_json_response, validate_plan_structure
-from utils.prompt_builder import determine_plan_type, build_plan_prompt
+from utils.prompt_builder import determine_plan_type, build_plan_messages
+from services.llm_gateway import llm_gateway, INTERACTIVE, LLMOverloadedError
+from services.plan_cache_service import plan_cache
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+client = LazyOpenAIClient()
 
 
 def generate_plan_with_ai(title: str, description: str, timeline: str = None) -> Dict:
@@ -26,18 +29,26 @@ def generate_plan_with_ai(title: str, description: str, timeline: str = None) ->
         Format: {"tasks": [...], "resources": [...]}
     """
     
+    # A plan generated for a near-duplicate request can be reused as is
+    if settings.plan_cache_enabled:
+        cached = plan_cache.lookup(title, description, timeline)
+        if cached is not None:
+            return cached
+    start = time.monotonic()
+    
     # Determine plan type and build prompt
     plan_type = determine_plan_type(title, description, client)
-    prompt = build_plan_prompt(title, description, timeline, plan_type)
+    messages = build_plan_messages(title, description, timeline, plan_type)
     
     try:
         # Call OpenAI API with JSON mode for guaranteed valid JSON
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
+        response = llm_gateway.create_chat_completion(
+            client,
+            INTERACTIVE,
+            endpoint="plan_generation",
+            hedge=True,
+            model=model_for("plan_generation"),
+            messages=messages,
             response_format={"type": "json_object"},  # Force JSON output
             temperature=0.7,
             max_tokens=4000,  # Increased for additional metadata
@@ -51,8 +62,16 @@ def generate_plan_with_ai(title: str, description: str, timeline: str = None) ->
         # Validate structure
         validate_plan_structure(plan_data)
         
+        # Stored with the plan (and used to retrain the plan type classifier)
+        plan_data["plan_type"] = plan_type
+        if settings.plan_cache_enabled:
+            plan_cache.insert(title, description, timeline, plan_data, (time.monotonic() - start) * 1000)
         return plan_data
     
+    except LLMOverloadedError:
+        # Shed by the gateway: let the client retry rather than serve a template plan
+        raise
+
     except json.JSONDecodeError as e:
         print(f"❌ JSON parsing error: {e}")
         print(f"📄 Raw response (first 500 chars): {content[:500]}")
@@ -78,6 +97,7 @@ def create_fallback_plan(title: str, description: str, timeline: str = None) ->
     timeline_context = f"within your {timeline} timeline" if timeline else "at your own pace"
     
     return {
+        "plan_type": plan_type,
         "tasks": [
             {
                 "title": f"{categories[0]}: Define clear, specific goals",
@@ -0,0 +1,214 @@
+"""
+Per-plan retrieval index
+BM25 over a plan's tasks and resources, built in process without any
+network calls, so chat can ground each message in the few tasks and
+resources it is about instead of the whole plan.
+
+Indexes are kept for recently used plans (LRU). They are updated
+incrementally: task events (services/task_event_service.py) upsert or
+remove single tasks, and every search reconciles against the rows the
+caller already loaded, re-indexing only documents whose text changed.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from supabase import Client
+from config import settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "the", "and", "for", "with", "what", "how", "should", "can", "you", "this", "that", "about",
+    "are", "was", "does", "did", "have", "has", "will", "would", "could", "my", "me", "our",
+    "your", "any", "all", "from", "into", "when", "where", "which", "who", "why", "next", "task",
+    "tasks", "plan", "please", "need", "want", "help", "do", "is", "it", "to", "of", "in", "on",
+}
+
+TASK = "task"
+RESOURCE = "resource"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords or very short words"""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def task_text(task: Dict[str, Any]) -> str:
+    # Title counts twice: it is the best short description of the task
+    return f"{task.get('title') or ''} {task.get('title') or ''} {task.get('description') or ''}"
+
+
+def resource_text(resource: Dict[str, Any]) -> str:
+    return f"{resource.get('title') or ''} {resource.get('type') or ''} {resource.get('url') or ''}"
+
+
+class PlanIndex:
+    """
+    Incremental BM25 index over one plan's documents
+
+    Documents are keyed (kind, id). Each occupies a slot; a removed
+    document's slot is reused. Postings map term -> {slot: term frequency}.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._slots: Dict[Tuple[str, str], int] = {}
+        self._keys: List[Optional[Tuple[str, str]]] = []
+        self._fingerprints: List[Optional[str]] = []
+        self._terms: List[Dict[str, int]] = []
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._free: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def upsert(self, kind: str, doc_id: str, text: str):
+        fingerprint = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+        slot = self._slots.get((kind, doc_id))
+        if slot is not None and self._fingerprints[slot] == fingerprint:
+            return
+        if slot is not None:
+            self._clear(slot)
+        else:
+            slot = self._allocate((kind, doc_id))
+
+        counts: Dict[str, int] = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[slot] = count
+        length = sum(counts.values())
+        self._terms[slot] = counts
+        self._fingerprints[slot] = fingerprint
+        self._lengths[slot] = length
+        self._total_length += length
+
+    def remove(self, kind: str, doc_id: str):
+        slot = self._slots.pop((kind, doc_id), None)
+        if slot is None:
+            return
+        self._clear(slot)
+        self._keys[slot] = None
+        self._fingerprints[slot] = None
+        self._free.append(slot)
+
+    def _allocate(self, key: Tuple[str, str]) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._fingerprints.append(None)
+            self._terms.append({})
+            self._lengths = np.append(self._lengths, np.float32(0))
+        self._slots[key] = slot
+        return slot
+
+    def _clear(self, slot: int):
+        for term in self._terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+        self._terms[slot] = {}
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0
+
+    def sync(self, kind: str, documents: Dict[str, str]):
+        """Make the index's `kind` documents match {id: text}, touching only what changed"""
+        for key in [key for key in self._slots if key[0] == kind and key[1] not in documents]:
+            self.remove(*key)
+        for doc_id, text in documents.items():
+            self.upsert(kind, doc_id, text)
+
+    def search(self, query: str, kind: Optional[str] = None, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Best-matching (id, score) pairs, optionally only documents of one kind"""
+        if not self._slots:
+            return []
+        scores = np.zeros(len(self._keys), dtype=np.float32)
+        n_docs = len(self._slots)
+        avg_length = max(self._total_length / n_docs, 1.0)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            idf = np.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[slots] / avg_length)
+            scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = np.flatnonzero(scores > 0)
+        if kind is not None:
+            candidates = np.array([slot for slot in candidates if self._keys[slot][0] == kind], dtype=np.int64)
+        if candidates.size == 0:
+            return []
+        best = candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+        return [(self._keys[slot][1], float(scores[slot])) for slot in best]
+
+
+class PlanIndexRegistry:
+    """
+    Retrieval indexes for recently used plans
+
+    Usage:
+        hits = plan_indexes.search(plan_id, question, tasks, resources, top_k=8)
+        # {"task": [(task_id, score), ...], "resource": [(resource_id, score), ...]}
+    """
+
+    def __init__(self, max_plans: int = 500):
+        self.max_plans = max_plans
+        self._indexes: "OrderedDict[str, PlanIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, plan_id: str, create: bool = True) -> Optional[PlanIndex]:
+        with self._lock:
+            index = self._indexes.get(plan_id)
+            if index is not None:
+                self._indexes.move_to_end(plan_id)
+            elif create:
+                index = self._indexes[plan_id] = PlanIndex()
+                while len(self._indexes) > self.max_plans:
+                    self._indexes.popitem(last=False)
+            return index
+
+    def search(
+        self,
+        plan_id: str,
+        query: str,
+        tasks: Iterable[Dict[str, Any]],
+        resources: Optional[Iterable[Dict[str, Any]]] = None,
+        top_k: int = 8,
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """Top-k tasks and resources for a query, syncing the index with the given rows first"""
+        index = self.get(plan_id)
+        with index.lock:
+            index.sync(TASK, {str(task["id"]): task_text(task) for task in tasks})
+            if resources is not None:
+                index.sync(RESOURCE, {str(resource["id"]): resource_text(resource) for resource in resources})
+            return {
+                TASK: index.search(query, TASK, top_k),
+                RESOURCE: index.search(query, RESOURCE, top_k),
+            }
+
+    def handle_task_event(self, supabase: Client, event: Dict[str, Any]):
+        """Keep an already loaded plan index current as tasks change"""
+        index = self.get(event["plan_id"], create=False)
+        if index is None:
+            return
+        with index.lock:
+            if event["type"] == "deleted" or not event.get("task"):
+                index.remove(TASK, str(event["task_id"]))
+            else:
+                index.upsert(TASK, str(event["task_id"]), task_text(event["task"]))
+
+# Global instance
+plan_indexes = PlanIndexRegistry(max_plans=settings.retrieval_index_max_plans)
@@ -0,0 +1,76 @@
+"""
+Reminder coalescing
+Collapses everything one user should hear about in a reminder run (tasks
+due in their reminder window, overdue tasks, high priority tasks due soon)
+into as few emails as possible: a couple of items still get individual
+reminders, anything more becomes a single digest.
+"""
+
+from typing import Any, Dict, List
+from config import settings
+from services.notification_service import NotificationService
+
+
+def _count(count: int, noun: str) -> str:
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+class ReminderCoalescer:
+    """Decide which reminder emails to send for one user"""
+
+    def __init__(self, individual_max: int = 2):
+        # Send individual reminders only up to this many items (and never for overdue ones)
+        self.individual_max = individual_max
+
+    def build_emails(
+        self,
+        user_email: str,
+        due_tasks: List[Dict[str, Any]],
+        overdue_tasks: List[Dict[str, Any]],
+        high_priority_tasks: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns one dict (to_email, subject, template_name, context) per email,
+        for NotificationService.render_emails; the scheduler sends the rendered
+        messages through email_outbox
+        """
+        upcoming = due_tasks + high_priority_tasks
+        dashboard_url = f"{settings.frontend_url}/dashboard"
+
+        if not upcoming and not overdue_tasks:
+            return []
+
+        # A few upcoming items: one reminder each
+        if not overdue_tasks and len(upcoming) <= self.individual_max:
+            return [
+                NotificationService._task_reminder_email(user_email, task, task["plans"])
+                for task in upcoming
+            ]
+
+        # Overdue work leads the digest, with upcoming items underneath
+        if overdue_tasks:
+            return [{
+                "to_email": user_email,
+                "subject": f"Action Required: {_count(len(overdue_tasks), 'Overdue Task')}",
+                "template_name": "overdue.html",
+                "context": {
+                    "tasks": overdue_tasks,
+                    "due_soon_tasks": upcoming,
+                    "user_email": user_email,
+                    "dashboard_url": dashboard_url,
+                },
+            }]
+
+        return [{
+            "to_email": user_email,
+            "subject": f"Heads Up: {_count(len(upcoming), 'Task')} Due Soon",
+            "template_name": "due_soon.html",
+            "context": {
+                "tasks": upcoming,
+                "user_email": user_email,
+                "dashboard_url": dashboard_url,
+            },
+        }]
+
+# Global instance
+reminder_coalescer = ReminderCoalescer(individual_max=settings.reminder_individual_max)
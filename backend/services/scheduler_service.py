@@ -1,61 +1,297 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from services.notification_service import NotificationService
-from services.alert_engine_service import AlertEngineService
+from services.email_delivery_service import email_outbox
+from services.alert_engine_service import AlertEngineService, alert_time_wheel, USER_ID_CHUNK_SIZE
+from services.fanout_service import FanoutExecutor, SupabaseCheckpointStore
+from services.leader_election_service import LeaderElector, FileLeaderLock, PostgresAdvisoryLeaderLock
 from services.supabase_service import get_supabase_client
-from datetime import datetime, timedelta
+from services.user_email_service import user_email_resolver
+from services.reminder_coalescing_service import reminder_coalescer
+from config import settings
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
 import asyncio
 
 scheduler = AsyncIOScheduler()
 
+def fetch_user_preferences_page(supabase, columns: str, after: Optional[str], limit: int, **filters) -> List[Dict[str, Any]]:
+    """Keyset-paginated page of user_preferences rows ordered by user_id"""
+    query = supabase.table("user_preferences").select(columns)
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    if after:
+        query = query.gt("user_id", after)
+    return query.order("user_id").limit(limit).execute().data
+
+# Every fan-out job runs once a day
+FANOUT_JOB_PERIOD = timedelta(days=1)
+
+def build_fanout_executor(supabase, job_id: str) -> FanoutExecutor:
+    """Fan-out executor for a scheduled job, checkpointed in the database"""
+    return FanoutExecutor(
+        job_id,
+        SupabaseCheckpointStore(supabase),
+        batch_size=settings.scheduler_batch_size,
+        max_concurrency=settings.scheduler_max_concurrency,
+        # Resume within the same period; by the next scheduled run the
+        # interrupted one is stale and a fresh run starts from the beginning
+        max_resume_age=FANOUT_JOB_PERIOD / 2,
+    )
+
+# PostgREST caps rows per response; bulk task queries are read in ranges
+TASK_QUERY_PAGE_SIZE = 1000
+
+def fetch_due_tasks_for_users(supabase, user_ids: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Every incomplete task due in [start, end) across the given users' plans"""
+    tasks = []
+    # A full fan-out page of ids in one IN (...) filter makes the URL too long
+    for i in range(0, len(user_ids), USER_ID_CHUNK_SIZE):
+        offset = 0
+        while True:
+            result = (
+                supabase.table("tasks")
+                .select("*, plans!inner(id, user_id, title)")
+                .in_("plans.user_id", user_ids[i:i + USER_ID_CHUNK_SIZE])
+                .gte("due_date", start.isoformat())
+                .lt("due_date", end.isoformat())
+                .neq("status", "completed")
+                .order("id")
+                .range(offset, offset + TASK_QUERY_PAGE_SIZE - 1)
+                .execute()
+            )
+            tasks.extend(result.data)
+            if len(result.data) < TASK_QUERY_PAGE_SIZE:
+                break
+            offset += TASK_QUERY_PAGE_SIZE
+    return tasks
+
+# High priority tasks are flagged in reminders once they are this close to due
+HIGH_PRIORITY_WINDOW = timedelta(hours=48)
+
+def load_reminder_batch(supabase, users: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Attach each user's reminder items and email to a page of users:
+    - tasks: due inside the user's reminder window
+    - overdue_tasks: past due, within the overdue lookback
+    - high_priority_tasks: high priority, due within 48 hours, not already in tasks
+    One range query covers every item for the page and one bulk lookup
+    resolves the emails, instead of round trips per user.
+    """
+    now = now or datetime.now()
+    now_iso = now.isoformat()
+    high_priority_end = (now + HIGH_PRIORITY_WINDOW).isoformat()
+
+    # Each user's window is [now + reminder hours, +1 hour)
+    windows = {}
+    for user in users:
+        start_time = now + timedelta(hours=user.get("reminder_time_hours") or 24)
+        windows[user["user_id"]] = (start_time.isoformat(), (start_time + timedelta(hours=1)).isoformat())
+
+    latest = max([end for _, end in windows.values()] + [high_priority_end])
+    tasks = fetch_due_tasks_for_users(
+        supabase,
+        list(windows),
+        now - timedelta(days=settings.reminder_overdue_lookback_days),
+        datetime.fromisoformat(latest),
+    )
+
+    # Classify by owner against that owner's own window
+    items_by_user: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for task in tasks:
+        user_id = task["plans"]["user_id"]
+        start, end = windows[user_id]
+        due_date = task["due_date"]
+        if start <= due_date < end:
+            kind = "tasks"
+        elif due_date < now_iso:
+            kind = "overdue_tasks"
+        elif task.get("priority") == "high" and due_date < high_priority_end:
+            kind = "high_priority_tasks"
+        else:
+            continue
+        items_by_user.setdefault(user_id, {}).setdefault(kind, []).append(task)
+
+    emails = user_email_resolver.resolve_many(supabase, items_by_user)
+
+    enriched = []
+    for user in users:
+        items = items_by_user.get(user["user_id"], {})
+        enriched.append({
+            **user,
+            "tasks": items.get("tasks", []),
+            "overdue_tasks": items.get("overdue_tasks", []),
+            "high_priority_tasks": items.get("high_priority_tasks", []),
+            "email": emails.get(user["user_id"]),
+        })
+    return enriched
+
+def attach_rendered_emails(
+    users: List[Dict[str, Any]],
+    build_emails: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Build each user's emails and render the whole page in one batch
+    (in the render process pool when large), attaching them as "messages".
+    Users without an email address get none.
+    """
+    emails_by_user = [build_emails(user) if user["email"] else [] for user in users]
+    messages = iter(NotificationService.render_emails([email for emails in emails_by_user for email in emails]))
+    return [
+        {**user, "messages": [next(messages) for _ in emails]}
+        for user, emails in zip(users, emails_by_user)
+    ]
+
 async def check_task_reminders():
-    """Daily check for tasks due soon"""
+    """Daily check for tasks due soon, overdue, or high priority"""
     print("Running daily task reminder check...")
     supabase = get_supabase_client()
-    
-    # Get users with reminders enabled
-    users = supabase.table("user_preferences").select("user_id, reminder_time_hours").eq("task_reminders", True).execute()
-    
-    for user in users.data:
-        user_id = user["user_id"]
-        hours = user.get("reminder_time_hours", 24)
-        
-        # Calculate time window
-        start_time = datetime.now() + timedelta(hours=hours)
-        end_time = start_time + timedelta(hours=1) # 1 hour window
-        
-        # Find tasks due in this window
-        tasks = (
-            supabase.table("tasks")
-            .select("*, plans(user_id, title)")
-            .eq("plans.user_id", user_id)
-            .gte("due_date", start_time.isoformat())
-            .lt("due_date", end_time.isoformat())
-            .neq("status", "completed")
-            .execute()
+
+    def fetch_page(after, limit):
+        # Users with reminders enabled
+        return fetch_user_preferences_page(
+            supabase, "user_id, reminder_time_hours", after, limit, task_reminders=True
         )
-        
-        # Get user email
-        user_data = supabase.auth.admin.get_user_by_id(user_id)
-        if user_data and user_data.user and user_data.user.email:
-            for task in tasks.data:
-                await NotificationService.send_task_reminder(
-                    user_email=user_data.user.email,
-                    task=task,
-                    plan=task["plans"]
-                )
+
+    def build_emails(user):
+        # Everything for this user goes out as a few reminders or one digest
+        return reminder_coalescer.build_emails(
+            user["email"], user["tasks"], user["overdue_tasks"], user["high_priority_tasks"]
+        )
+
+    def prepare_batch(users):
+        return attach_rendered_emails(load_reminder_batch(supabase, users), build_emails)
+
+    async def process_user(user):
+        for message in user["messages"]:
+            await email_outbox.enqueue(message)
+
+    # Delivery happens in the outbox; each page is sent before its checkpoint
+    await build_fanout_executor(supabase, "daily_reminders").run(
+        fetch_page, process_user, prepare_batch=prepare_batch, before_checkpoint=email_outbox.flush
+    )
+
+# Upcoming tasks listed in a weekly digest
+DIGEST_UPCOMING_LIMIT = 5
+
+def digest_day_of_week(now: datetime) -> int:
+    """Today as stored in user_preferences.digest_day_of_week (0=Sunday, 6=Saturday)"""
+    return (now.weekday() + 1) % 7
+
+def build_digest_stats(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Template stats from a get_weekly_digest_stats row (None for users without plans)"""
+    row = row or {}
+    total = row.get("total_tasks") or 0
+    completed = row.get("completed_tasks") or 0
+    return {
+        "completed_tasks": row.get("completed_this_week") or 0,
+        "upcoming_tasks": row.get("upcoming") or 0,
+        "overdue_tasks": row.get("overdue") or 0,
+        "hours_remaining": round(float(row.get("hours_remaining") or 0), 1),
+        "cost_remaining": round(float(row.get("cost_remaining") or 0), 2),
+        "active_plans": row.get("active_plans") or 0,
+        "completion_rate": round(completed / total * 100) if total else 0,
+    }
+
+def load_digest_batch(supabase, users: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Attach weekly digest stats, upcoming tasks and email to a page of users.
+    Stats for the whole page come from one grouped query (get_weekly_digest_stats),
+    upcoming tasks from one range query.
+    """
+    now = now or datetime.now()
+    week_end = now + timedelta(days=7)
+    user_ids = [user["user_id"] for user in users]
+
+    result = supabase.rpc("get_weekly_digest_stats", {
+        "user_ids": user_ids,
+        "week_start": (now - timedelta(days=7)).isoformat(),
+        "now_at": now.isoformat(),
+        "week_end": week_end.isoformat(),
+    }).execute()
+    stats_by_user = {str(row["user_id"]): row for row in result.data}
+
+    upcoming_by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for task in fetch_due_tasks_for_users(supabase, user_ids, now, week_end):
+        upcoming_by_user.setdefault(task["plans"]["user_id"], []).append(task)
+
+    emails = user_email_resolver.resolve_many(supabase, user_ids)
+
+    return [
+        {
+            **user,
+            "stats": build_digest_stats(stats_by_user.get(user["user_id"])),
+            "upcoming_tasks": sorted(
+                upcoming_by_user.get(user["user_id"], []), key=lambda task: task["due_date"]
+            )[:DIGEST_UPCOMING_LIMIT],
+            "email": emails.get(user["user_id"]),
+        }
+        for user in users
+    ]
+
+async def send_weekly_digests():
+    """Daily check that sends the weekly digest to users whose digest day is today"""
+    print("Sending weekly digests...")
+    supabase = get_supabase_client()
+    today = digest_day_of_week(datetime.now())
+
+    def fetch_page(after, limit):
+        return fetch_user_preferences_page(
+            supabase, "user_id", after, limit,
+            email_notifications=True, weekly_digest=True, digest_day_of_week=today
+        )
+
+    def build_emails(user):
+        return [NotificationService._weekly_digest_email(user["email"], user["stats"], user["upcoming_tasks"])]
+
+    def prepare_batch(users):
+        return attach_rendered_emails(load_digest_batch(supabase, users), build_emails)
+
+    async def process_user(user):
+        for message in user["messages"]:
+            await email_outbox.enqueue(message)
+
+    await build_fanout_executor(supabase, "weekly_digests").run(
+        fetch_page, process_user, prepare_batch=prepare_batch, before_checkpoint=email_outbox.flush
+    )
 
 async def generate_dashboard_alerts():
-    """Hourly generation of dashboard alerts"""
+    """Hourly time-wheel tick: refresh alerts for tasks crossing a due-date threshold"""
     print("Generating dashboard alerts...")
     supabase = get_supabase_client()
-    
-    # Get all active users (simplified: just getting all users from preferences for now)
-    users = supabase.table("user_preferences").select("user_id").execute()
-    
-    for user in users.data:
-        alerts = AlertEngineService.generate_alerts_for_user(supabase, user["user_id"])
-        AlertEngineService.save_alerts(supabase, alerts)
+
+    count = await asyncio.to_thread(alert_time_wheel.tick, supabase)
+    print(f"Time wheel tick evaluated {count} alerts")
+
+def reconcile_user_alerts(supabase, user_id: str):
+    """Full alert rescan for one user"""
+    alerts = AlertEngineService.generate_alerts_for_user(supabase, user_id)
+    AlertEngineService.save_alerts(supabase, alerts, {user_id: None})
+
+async def reconcile_dashboard_alerts():
+    """Nightly full rescan to catch anything the incremental path missed"""
+    print("Reconciling dashboard alerts...")
+    supabase = get_supabase_client()
+
+    def fetch_page(after, limit):
+        return fetch_user_preferences_page(supabase, "user_id", after, limit)
+
+    async def process_user(user):
+        await asyncio.to_thread(reconcile_user_alerts, supabase, user["user_id"])
+
+    await build_fanout_executor(supabase, "nightly_alert_reconciliation").run(fetch_page, process_user)
+
+# Fan-out jobs, by scheduler job id (also their checkpoint job id)
+FANOUT_JOBS = ("daily_reminders", "weekly_digests", "nightly_alert_reconciliation")
+
+async def resume_interrupted_jobs():
+    """Run fan-out jobs a previous leader left unfinished now, instead of at their next scheduled time"""
+    supabase = get_supabase_client()
+    for job_id in FANOUT_JOBS:
+        if await asyncio.to_thread(build_fanout_executor(supabase, job_id).has_interrupted_run):
+            print(f"Resuming interrupted job {job_id}")
+            # Runs as the scheduled job itself, so it can't overlap another run of it
+            scheduler.get_job(job_id).modify(next_run_time=datetime.now(timezone.utc))
 
 def start_scheduler():
     """Initialize and start the scheduler"""
@@ -66,7 +302,15 @@ def start_scheduler():
         id="daily_reminders",
         replace_existing=True
     )
-    
+
+    # Weekly digests at 8 AM, for users whose digest day is today
+    scheduler.add_job(
+        send_weekly_digests,
+        CronTrigger(hour=8, minute=0),
+        id="weekly_digests",
+        replace_existing=True
+    )
+
     # Hourly alerts
     scheduler.add_job(
         generate_dashboard_alerts,
@@ -74,10 +318,38 @@ def start_scheduler():
         id="hourly_alerts",
         replace_existing=True
     )
-    
+
+    # Nightly alert reconciliation at 3 AM
+    scheduler.add_job(
+        reconcile_dashboard_alerts,
+        CronTrigger(hour=3, minute=0),
+        id="nightly_alert_reconciliation",
+        replace_existing=True
+    )
+
+    # A new leader picks up where the previous one stopped
+    scheduler.add_job(resume_interrupted_jobs, id="resume_interrupted_jobs", replace_existing=True)
+
     scheduler.start()
     print("Scheduler started successfully")
 
 def shutdown_scheduler():
     """Shutdown the scheduler"""
-    scheduler.shutdown()
+    if scheduler.running:
+        scheduler.shutdown()
+
+def build_leader_lock():
+    """Leader lock for the configured backend"""
+    if settings.scheduler_lock_backend == "postgres":
+        if not settings.database_url:
+            raise RuntimeError("DATABASE_URL is required for the postgres scheduler lock backend")
+        return PostgresAdvisoryLeaderLock(settings.database_url, "plangenie:scheduler")
+    return FileLeaderLock(settings.scheduler_lock_path)
+
+def build_scheduler_elector() -> LeaderElector:
+    """Elector that runs the scheduler only while this process holds the leader lock"""
+    return LeaderElector(
+        build_leader_lock(),
+        on_elected=start_scheduler,
+        on_demoted=shutdown_scheduler,
+    )
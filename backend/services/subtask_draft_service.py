@@ -0,0 +1,188 @@
+"""
+Speculative subtask drafts
+Users usually ask for subtasks on the first few tasks right after a plan is
+created. When enabled, plan generation schedules a background breakdown of
+the first SUBTASK_SPECULATION_TASKS tasks (one batched call in the
+background lane) and stores the results in subtask_drafts.
+/api/subtasks/generate then serves a matching draft instead of waiting for
+a fresh completion.
+
+A draft is only served while it is fresh and the task's title and
+description are unchanged; otherwise it is discarded. Used and discarded
+drafts stay in the table so the use rate and wasted spend can be reported.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from supabase import Client
+from config import settings
+from services.llm_gateway import BACKGROUND, LLMOverloadedError
+from services.monitoring_service import MonitoringService
+from services.subtask_generator import fallback_subtasks, generate_subtasks_batch
+from utils.time_helpers import parse_timestamp
+
+ENDPOINT = "subtasks_speculative"
+
+
+def source_hash(title: Optional[str], description: Optional[str]) -> str:
+    return hashlib.blake2b(f"{title or ''}\n{description or ''}".encode(), digest_size=8).hexdigest()
+
+
+class SubtaskDraftService:
+    """
+    Pre-generated subtasks for a new plan's first tasks
+
+    Usage:
+        background_tasks.add_task(subtask_drafts.speculate, supabase, tasks)
+        subtasks = subtask_drafts.take(supabase, task_id, title, description)
+        if subtasks is None:
+            subtasks = generate_subtasks_with_ai(title, description)
+    """
+
+    def __init__(self, enabled: bool = False, max_tasks: int = 3, ttl_hours: float = 24.0):
+        self.enabled = enabled
+        self.max_tasks = max_tasks
+        self.ttl = timedelta(hours=ttl_hours)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def speculate(self, supabase: Client, tasks: List[Dict[str, Any]]) -> int:
+        """Draft subtasks for the first tasks of a new plan. Returns the number of drafts stored."""
+        if not self.enabled or self.max_tasks <= 0:
+            return 0
+        tasks = sorted(tasks, key=lambda task: task.get("order") or 0)[:self.max_tasks]
+        if not tasks:
+            return 0
+        try:
+            subtasks_by_task = generate_subtasks_batch(tasks, lane=BACKGROUND, endpoint=ENDPOINT)
+        except LLMOverloadedError:
+            # Speculation is optional; leave the slots to interactive calls
+            return 0
+
+        rows = []
+        for task in tasks:
+            subtasks = subtasks_by_task.get(str(task["id"]))
+            # The generic fallback steps are not worth serving as a draft
+            if not subtasks or subtasks == fallback_subtasks(task["title"]):
+                continue
+            rows.append({
+                "task_id": task["id"],
+                "plan_id": task["plan_id"],
+                "subtasks": subtasks,
+                "source_hash": source_hash(task["title"], task.get("description")),
+                "status": "ready",
+            })
+        if not rows:
+            return 0
+        try:
+            supabase.table("subtask_drafts").upsert(rows).execute()
+        except Exception as e:
+            print(f"Error saving subtask drafts: {e}")
+            return 0
+        MonitoringService.track_custom_metric("subtask_draft_generated", len(rows), {})
+        return len(rows)
+
+    def take(
+        self,
+        supabase: Client,
+        task_id: str,
+        title: str,
+        description: Optional[str],
+    ) -> Optional[List[Dict]]:
+        """The task's draft subtasks (marking the draft used), or None"""
+        if not self.enabled:
+            return None
+        subtasks = None
+        try:
+            result = supabase.table("subtask_drafts")\
+                .select("subtasks, source_hash, created_at")\
+                .eq("task_id", task_id)\
+                .eq("status", "ready")\
+                .execute()
+            draft = result.data[0] if result.data else None
+            if draft is not None:
+                fresh = datetime.now(timezone.utc) - parse_timestamp(draft["created_at"]) <= self.ttl
+                if fresh and draft["source_hash"] == source_hash(title, description):
+                    # Conditional update: two concurrent requests can't both use the draft
+                    used = self._resolve(supabase, task_id, "used")
+                    subtasks = draft["subtasks"] if used else None
+                else:
+                    self._resolve(supabase, task_id, "discarded")
+        except Exception as e:
+            print(f"Error reading subtask draft: {e}")
+
+        with self._lock:
+            if subtasks is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        MonitoringService.track_custom_metric("subtask_draft_hit" if subtasks is not None else "subtask_draft_miss", 1, {})
+        return subtasks
+
+    def _resolve(self, supabase: Client, task_id: str, status: str) -> bool:
+        result = supabase.table("subtask_drafts")\
+            .update({"status": status, "resolved_at": datetime.now(timezone.utc).isoformat()})\
+            .eq("task_id", task_id)\
+            .eq("status", "ready")\
+            .execute()
+        if status == "discarded" and result.data:
+            MonitoringService.track_custom_metric("subtask_draft_wasted", 1, {})
+        return bool(result.data)
+
+    def handle_task_event(self, supabase: Client, event: Dict[str, Any]):
+        """Discard a ready draft once its task is deleted or its text changes"""
+        if not self.enabled:
+            return
+        task = event.get("task")
+        if event["type"] == "deleted" or not task:
+            self._resolve(supabase, event["task_id"], "discarded")
+        elif event["type"] == "updated" and ("title" in task or "description" in task):
+            result = supabase.table("subtask_drafts")\
+                .select("source_hash")\
+                .eq("task_id", event["task_id"])\
+                .eq("status", "ready")\
+                .execute()
+            if result.data and result.data[0]["source_hash"] != source_hash(task.get("title"), task.get("description")):
+                self._resolve(supabase, event["task_id"], "discarded")
+
+    def stats(self, drafts: List[Dict[str, Any]], spend_usd: float) -> Dict[str, Any]:
+        """
+        Use rate and wasted spend for drafts created in a period
+
+        Args:
+            drafts: subtask_drafts rows (status, created_at) created in the period
+            spend_usd: LLM spend on speculation in the same period
+        """
+        now = datetime.now(timezone.utc)
+        counts = {"used": 0, "discarded": 0, "ready": 0}
+        for draft in drafts:
+            status = draft["status"]
+            # Expired drafts will never be served
+            if status == "ready" and now - parse_timestamp(draft["created_at"]) > self.ttl:
+                status = "discarded"
+            counts[status] += 1
+        generated = len(drafts)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "generated": generated,
+            "used": counts["used"],
+            "wasted": counts["discarded"],
+            "pending": counts["ready"],
+            "use_rate": round(counts["used"] / generated, 4) if generated else 0.0,
+            "spend_usd": round(spend_usd, 4),
+            "wasted_spend_usd": round(spend_usd * counts["discarded"] / generated, 4) if generated else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# Global instance
+subtask_drafts = SubtaskDraftService(
+    enabled=settings.subtask_speculation_enabled,
+    max_tasks=settings.subtask_speculation_tasks,
+    ttl_hours=settings.subtask_draft_ttl_hours,
+)
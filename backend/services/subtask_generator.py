@@ -1,22 +1,16 @@
-from openai import OpenAI
+from services.ai_service import LazyOpenAIClient, model_for
 from config import get_settings
+import contextvars
 import json
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional
+from services.llm_gateway import llm_gateway, INTERACTIVE, LLMOverloadedError
+from utils.prompt_layout import PromptTemplate, FULL
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+client = LazyOpenAIClient()
 
-def generate_subtasks_with_ai(task_title: str, task_description: str) -> List[Dict]:
-    """
-    Generate 4-8 specific subtasks for a given task using AI
-    """
-    
-    prompt = f"""You are PlanGenie's task breakdown assistant. Break down this task into 4-8 actionable subtasks that someone can check off one by one.
-
-Task: {task_title}
-Description: {task_description}
-
-Create subtasks that are:
+SUBTASK_GUIDELINES = """Create subtasks that are:
 1. SPECIFIC and ACTIONABLE (each can be completed in one sitting)
 2. SEQUENTIAL (in logical order of execution)
 3. CLEAR (no ambiguity about what needs to be done)
@@ -35,6 +29,16 @@ Example - GOOD subtasks:
 ✅ "Check availability and prices for 4 rooms"
 ✅ "Book rooms and screenshot confirmation"
 ✅ "Forward confirmation email to group"
+"""
+
+SUBTASK_SYSTEM = "You are an expert at breaking down tasks into clear, actionable steps. Each subtask should be specific enough that someone knows exactly what to do."
+
+SUBTASK_PROMPT = PromptTemplate("subtasks", "2", {
+    FULL: f"""{SUBTASK_SYSTEM}
+
+You are PlanGenie's task breakdown assistant. Break down the task in the user message into 4-8 actionable subtasks that someone can check off one by one.
+
+{SUBTASK_GUIDELINES}
 
 Return JSON with this structure:
 {{
@@ -44,56 +48,181 @@ Return JSON with this structure:
             "description": "Optional 1-sentence clarification if needed"
         }}
     ]
-}}
+}}""",
+})
+
+BATCH_SUBTASK_PROMPT = PromptTemplate("subtasks_batch", "1", {
+    FULL: f"""{SUBTASK_SYSTEM}
+
+You are PlanGenie's task breakdown assistant. The user message lists several numbered tasks. Break down EACH of them into 4-8 actionable subtasks that someone can check off one by one.
+
+{SUBTASK_GUIDELINES}
+
+Return JSON with one entry per task, using the task's number as "task":
+{{
+    "tasks": [
+        {{
+            "task": 1,
+            "subtasks": [
+                {{
+                    "title": "Specific subtask title (action-oriented)",
+                    "description": "Optional 1-sentence clarification if needed"
+                }}
+            ]
+        }}
+    ]
+}}""",
+})
+
+
+def _parse_json(content: str) -> Dict[str, Any]:
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return json.loads(content.strip())
+
+
+def fallback_subtasks(task_title: str) -> List[Dict]:
+    """Generic steps used when the AI can't break a task down"""
+    return [
+        {
+            "title": f"Step 1: Start with {task_title.lower()}",
+            "description": "Begin working on this task"
+        },
+        {
+            "title": "Step 2: Gather required information and resources",
+            "description": "Collect everything needed"
+        },
+        {
+            "title": "Step 3: Execute the main action",
+            "description": "Complete the core part of the task"
+        },
+        {
+            "title": "Step 4: Verify and finalize",
+            "description": "Review and confirm completion"
+        }
+    ]
 
-Generate 4-8 subtasks now:"""
 
+def generate_subtasks_with_ai(task_title: str, task_description: str) -> List[Dict]:
+    """
+    Generate 4-8 specific subtasks for a given task using AI
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert at breaking down tasks into clear, actionable steps. Each subtask should be specific enough that someone knows exactly what to do."
-                },
-                {"role": "user", "content": prompt}
-            ],
+        response = llm_gateway.create_chat_completion(
+            client,
+            INTERACTIVE,
+            endpoint="subtasks",
+            model=model_for("subtasks"),
+            messages=SUBTASK_PROMPT.messages([
+                {"role": "user", "content": f"Task: {task_title}\nDescription: {task_description}\n\nGenerate 4-8 subtasks now:"}
+            ]),
             temperature=0.7,
             max_tokens=800
         )
         
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
+        data = _parse_json(response.choices[0].message.content)
         return data.get("subtasks", [])
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"AI subtask generation error: {e}")
         # Return fallback subtasks
-        return [
-            {
-                "title": f"Step 1: Start with {task_title.lower()}",
-                "description": "Begin working on this task"
-            },
-            {
-                "title": "Step 2: Gather required information and resources",
-                "description": "Collect everything needed"
-            },
-            {
-                "title": "Step 3: Execute the main action",
-                "description": "Complete the core part of the task"
-            },
-            {
-                "title": "Step 4: Verify and finalize",
-                "description": "Review and confirm completion"
-            }
+        return fallback_subtasks(task_title)
+
+
+def _generate_chunk(tasks: List[Dict[str, Any]], lane: str, endpoint: str) -> Dict[str, List[Dict]]:
+    """One LLM call breaking down every task in `tasks`"""
+    task_list = "\n\n".join(
+        f"{number}. Task: {task['title']}\n   Description: {task.get('description') or ''}"
+        for number, task in enumerate(tasks, start=1)
+    )
+    try:
+        response = llm_gateway.create_chat_completion(
+            client,
+            lane,
+            endpoint=endpoint,
+            model=model_for(endpoint),
+            messages=BATCH_SUBTASK_PROMPT.messages([
+                {"role": "user", "content": f"{task_list}\n\nGenerate 4-8 subtasks for each task now:"}
+            ]),
+            response_format={"type": "json_object"},
+            temperature=0.7,
+            max_tokens=700 * len(tasks),
+        )
+        entries = _parse_json(response.choices[0].message.content).get("tasks", [])
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        print(f"AI batch subtask generation error: {e}")
+        entries = []
+
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("subtasks"), list):
+            continue
+        try:
+            number = int(entry.get("task"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= number <= len(tasks) and entry["subtasks"]:
+            results[str(tasks[number - 1]["id"])] = entry["subtasks"]
+
+    # Anything the model skipped gets the generic steps
+    for task in tasks:
+        if str(task["id"]) not in results:
+            results[str(task["id"])] = fallback_subtasks(task["title"])
+    return results
+
+
+def generate_subtasks_batch(
+    tasks: List[Dict[str, Any]],
+    lane: str = INTERACTIVE,
+    batch_size: Optional[int] = None,
+    endpoint: str = "subtasks_batch",
+) -> Dict[str, List[Dict]]:
+    """
+    Generate subtasks for several tasks ({"id", "title", "description"}).
+    Up to `batch_size` tasks share one structured LLM call; larger sets are
+    split into chunks that run in parallel (each still admitted by the LLM
+    gateway). `endpoint` names the calls for deadlines, model overrides and
+    metering. Returns {task_id: [subtask, ...]}.
+    """
+    batch_size = batch_size or settings.subtask_batch_size
+    chunks = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        return _generate_chunk(chunks[0], lane, endpoint)
+
+    results: Dict[str, List[Dict]] = {}
+    with ThreadPoolExecutor(max_workers=len(chunks), thread_name_prefix="subtask-batch") as executor:
+        # Each worker carries the caller's context (the metered user)
+        futures = [
+            executor.submit(contextvars.copy_context().run, _generate_chunk, chunk, lane, endpoint)
+            for chunk in chunks
         ]
+        for future in futures:
+            results.update(future.result())
+    return results
+
+
+def build_subtask_rows(subtasks_by_task: Dict[str, List[Dict]], max_per_task: Optional[int] = None) -> List[Dict]:
+    """Rows for one bulk insert into subtasks"""
+    rows = []
+    for task_id, subtasks in subtasks_by_task.items():
+        subtasks = [st for st in subtasks if isinstance(st, dict) and st.get("title")][:max_per_task]
+        for i, subtask in enumerate(subtasks):
+            rows.append({
+                "task_id": task_id,
+                "title": subtask["title"],
+                "description": subtask.get("description"),
+                "status": "pending",
+                "order": i
+            })
+    return rows
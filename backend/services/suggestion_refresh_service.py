@@ -0,0 +1,171 @@
+"""
+Change-driven suggestion refresh
+Proactive suggestions are regenerated in the background when a plan
+changes, so GET /api/chat/plans/{plan_id}/suggestions only ever reads the
+precomputed ones.
+
+Task writes mark their plan dirty (via task events). A plan is refreshed
+once it has been quiet for SUGGESTION_REFRESH_QUIET_SECONDS, or at the
+latest SUGGESTION_REFRESH_MAX_DELAY_SECONDS after its first change, so a
+burst of edits costs one LLM call. Each refresh stores a hash of the plan
+content it analyzed; when a later refresh sees the same hash, it skips the
+LLM call. A plan refreshed elsewhere moments ago is rescheduled, not dropped.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from supabase import Client
+from config import settings
+from services.chat_suggestion_service import generate_proactive_suggestions
+from services.llm_gateway import LLMOverloadedError
+from services.llm_metering import current_llm_user
+from services.monitoring_service import MonitoringService
+from utils.time_helpers import parse_timestamp
+
+# Task fields the suggestions depend on
+HASHED_TASK_FIELDS = ("id", "title", "description", "status", "order", "estimated_time_hours", "due_date")
+
+
+def content_hash(plan: Dict[str, Any], tasks: List[Dict[str, Any]]) -> str:
+    content = {
+        "title": plan.get("title"),
+        "description": plan.get("description"),
+        "tasks": sorted(
+            ([task.get(field) for field in HASHED_TASK_FIELDS] for task in tasks),
+            key=lambda fields: str(fields[0]),
+        ),
+    }
+    return hashlib.blake2b(json.dumps(content, default=str).encode(), digest_size=16).hexdigest()
+
+
+class SuggestionRefresher:
+    """
+    Debounced background refresh of a plan's suggestions
+
+    Usage:
+        suggestion_refresher.mark_dirty(plan_id, user_id)
+        # started from the app lifespan:
+        asyncio.create_task(suggestion_refresher.run(get_supabase_client, interval_seconds))
+    """
+
+    def __init__(self, quiet_seconds: float = 30.0, max_delay_seconds: float = 300.0, max_concurrency: int = 4):
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_concurrency = max_concurrency
+        # plan_id -> {"user_id", "first", "last", "force"}
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, plan_id: str, user_id: str, force: bool = False, now: Optional[float] = None):
+        """
+        Schedule a refresh. A forced refresh (the user asked for one) runs on
+        the next check, even if the plan content is unchanged.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._dirty.get(plan_id)
+            if entry is None:
+                self._dirty[plan_id] = {"user_id": user_id, "first": now, "last": now, "force": force}
+            else:
+                entry["last"] = now
+                entry["force"] = entry["force"] or force
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, str, bool]]:
+        """Take the (plan_id, user_id, force) entries whose debounce has elapsed"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            ready = [
+                plan_id for plan_id, entry in self._dirty.items()
+                if entry["force"]
+                or now - entry["last"] >= self.quiet_seconds
+                or now - entry["first"] >= self.max_delay_seconds
+            ]
+            entries = [(plan_id, self._dirty.pop(plan_id)) for plan_id in ready]
+        return [(plan_id, entry["user_id"], entry["force"]) for plan_id, entry in entries]
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def refresh(self, supabase: Client, plan_id: str, user_id: str, force: bool = False) -> Optional[int]:
+        """
+        Regenerate a plan's suggestions if its content changed.
+        Returns the number of new suggestions, or None if the refresh was skipped.
+        """
+        plan_result = supabase.table("plans").select("*, tasks(*)").eq("id", plan_id).execute()
+        if not plan_result.data:
+            return None
+        plan = plan_result.data[0]
+        tasks = plan.get("tasks") or []
+
+        digest = content_hash(plan, tasks)
+        state_result = supabase.table("suggestion_refresh_state").select("*").eq("plan_id", plan_id).execute()
+        state = state_result.data[0] if state_result.data else None
+        if state and not force:
+            if state["content_hash"] == digest:
+                MonitoringService.track_custom_metric("suggestion_refresh_skipped", 1, {})
+                return None
+            # Another worker just refreshed the plan, before this change: try again after a quiet period
+            if datetime.now(timezone.utc) - parse_timestamp(state["refreshed_at"]) < timedelta(seconds=self.quiet_seconds):
+                self.mark_dirty(plan_id, user_id)
+                return None
+
+        # Bill the plan owner for the background call
+        token = current_llm_user.set(user_id)
+        try:
+            new_suggestions = generate_proactive_suggestions(plan, tasks, user_id, supabase)
+        finally:
+            current_llm_user.reset(token)
+
+        supabase.table("suggestion_refresh_state").upsert({
+            "plan_id": plan_id,
+            "content_hash": digest,
+            "refreshed_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+        MonitoringService.track_custom_metric("suggestion_refresh", 1, {"new_suggestions": len(new_suggestions)})
+        return len(new_suggestions)
+
+    async def run_due(self, supabase: Client) -> int:
+        """Refresh every plan whose debounce has elapsed. Returns the number processed."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def refresh_one(plan_id: str, user_id: str, force: bool):
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.refresh, supabase, plan_id, user_id, force)
+                except LLMOverloadedError:
+                    # Shed: try again on a later check
+                    self.mark_dirty(plan_id, user_id, force)
+                except Exception as e:
+                    print(f"Suggestion refresh for plan {plan_id} failed: {e}")
+                    # Keep the change for a later check
+                    self.mark_dirty(plan_id, user_id, force)
+
+        due = self.due()
+        await asyncio.gather(*(refresh_one(*entry) for entry in due))
+        return len(due)
+
+    async def run(self, get_supabase, interval_seconds: float):
+        """Check for due plans every interval until cancelled (started from the app lifespan)"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.run_due(get_supabase())
+            except Exception as e:
+                print(f"Suggestion refresh failed: {e}")
+
+    def handle_task_event(self, supabase: Client, event: Dict[str, Any]):
+        """Any task write may change what the plan needs"""
+        self.mark_dirty(event["plan_id"], event["user_id"])
+
+# Global instance
+suggestion_refresher = SuggestionRefresher(
+    quiet_seconds=settings.suggestion_refresh_quiet_seconds,
+    max_delay_seconds=settings.suggestion_refresh_max_delay_seconds,
+    max_concurrency=settings.suggestion_refresh_max_concurrency,
+)
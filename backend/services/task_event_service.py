@@ -0,0 +1,74 @@
+"""
+Task change events
+Fans task create/update/delete out to the services that keep derived state
+(alerts, indexes, suggestions) up to date, so they only process what changed.
+"""
+
+from typing import Dict, Any, List, Optional
+from supabase import Client
+from services.alert_engine_service import AlertEngineService
+from services.plan_index_service import plan_indexes
+from services.subtask_draft_service import subtask_drafts
+from services.suggestion_refresh_service import suggestion_refresher
+from services.monitoring_service import MonitoringService
+
+# Handlers are called as handler(supabase, event)
+TASK_EVENT_HANDLERS = [
+    AlertEngineService.handle_task_event,
+    plan_indexes.handle_task_event,
+    subtask_drafts.handle_task_event,
+    suggestion_refresher.handle_task_event,
+]
+
+
+class TaskEventService:
+    """Dispatch task change events to registered handlers"""
+
+    @staticmethod
+    def build_event(
+        event_type: str,
+        user_id: str,
+        plan_id: str,
+        task_id: str,
+        task: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a task event
+
+        Args:
+            event_type: "created", "updated" or "deleted"
+            user_id: Owner of the plan the task belongs to
+            plan_id: Plan the task belongs to
+            task_id: Task that changed
+            task: Task row after the change (None for deletes)
+        """
+        return {
+            "type": event_type,
+            "user_id": user_id,
+            "plan_id": plan_id,
+            "task_id": task_id,
+            "task": task,
+        }
+
+    @staticmethod
+    def dispatch(supabase: Client, event: Dict[str, Any]):
+        """Run every handler for the event; one failing handler doesn't stop the others"""
+        for handler in TASK_EVENT_HANDLERS:
+            try:
+                handler(supabase, event)
+            except Exception as e:
+                print(f"Task event handler {handler.__name__} failed: {e}")
+                MonitoringService.capture_exception(e, {
+                    "action": "task_event",
+                    "event_type": event["type"],
+                    "task_id": event["task_id"],
+                })
+
+    @staticmethod
+    def dispatch_created(supabase: Client, user_id: str, tasks: List[Dict[str, Any]]):
+        """Dispatch a "created" event for each task inserted in bulk (plan generation, accepted suggestions)"""
+        for task in tasks:
+            TaskEventService.dispatch(
+                supabase,
+                TaskEventService.build_event("created", user_id, task["plan_id"], task["id"], task),
+            )
@@ -1,11 +1,13 @@
 from typing import List, Dict, Optional
-from openai import OpenAI
+from services.ai_service import LazyOpenAIClient, model_for
 from config import get_settings
 import json
+import asyncio
 import random
+from services.llm_gateway import llm_gateway, BACKGROUND
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+client = LazyOpenAIClient()
 
 class TemplateService:
     """
@@ -155,8 +157,13 @@ class TemplateService:
         """
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
+            # Blocking call: run it in a thread, in the background lane
+            response = await asyncio.to_thread(
+                llm_gateway.create_chat_completion,
+                client,
+                BACKGROUND,
+                endpoint="templates",
+                model=model_for("templates"),
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that creates plan templates."},
                     {"role": "user", "content": prompt}
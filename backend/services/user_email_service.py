@@ -0,0 +1,75 @@
+"""
+Bulk user email lookup with a TTL cache
+Emails live in auth.users, which PostgREST does not expose. The
+get_user_emails RPC (migrations/003) returns them for a whole page of users
+in one call; per-user admin lookups are only a fallback.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from supabase import Client
+
+
+class UserEmailResolver:
+    """Resolve user ids to emails in bulk, caching results for ttl_seconds"""
+
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 200_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # user_id -> (email, expires_at), oldest first
+        self._cache: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def _get_cached(self, user_id: str) -> Tuple[bool, Optional[str]]:
+        entry = self._cache.get(user_id)
+        if not entry:
+            return False, None
+        email, expires_at = entry
+        if expires_at < time.time():
+            del self._cache[user_id]
+            return False, None
+        return True, email
+
+    def _store(self, user_id: str, email: Optional[str]):
+        self._cache[user_id] = (email, time.time() + self.ttl_seconds)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def resolve_many(self, supabase: Client, user_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Return {user_id: email or None} using one RPC for all cache misses"""
+        emails = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            hit, email = self._get_cached(user_id)
+            if hit:
+                emails[user_id] = email
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return emails
+
+        try:
+            result = supabase.rpc("get_user_emails", {"user_ids": missing}).execute()
+            found = {str(row["id"]): row["email"] for row in result.data}
+        except Exception as e:
+            print(f"Bulk email lookup failed, falling back to per-user lookups: {e}")
+            found = {}
+            for user_id in missing:
+                user_data = supabase.auth.admin.get_user_by_id(user_id)
+                if user_data and user_data.user:
+                    found[user_id] = user_data.user.email
+
+        for user_id in missing:
+            email = found.get(user_id)
+            self._store(user_id, email)
+            emails[user_id] = email
+
+        return emails
+
+    def clear(self):
+        self._cache.clear()
+
+# Global instance
+user_email_resolver = UserEmailResolver()
@@ -0,0 +1,27 @@
+from unittest.mock import patch
+from services.ai_service import LLMClientRegistry, LazyOpenAIClient, model_for
+
+def test_registry_builds_one_client_lazily():
+    registry = LLMClientRegistry()
+    assert registry._clients == {}
+
+    first = registry.get()
+    assert registry.get() is first
+    assert first.max_retries == 0
+    registry.close()
+    assert registry._clients == {}
+
+def test_lazy_client_forwards_to_shared_client():
+    registry = LLMClientRegistry()
+    with patch("services.ai_service.llm_clients", registry):
+        lazy = LazyOpenAIClient()
+        assert registry._clients == {}
+        assert lazy.chat is registry.get().chat
+    registry.close()
+
+def test_model_for_uses_endpoint_override():
+    with patch("services.ai_service.settings") as settings:
+        settings.llm_model = "gpt-4o-mini"
+        settings.llm_endpoint_models = {"chat": "gpt-4o"}
+        assert model_for("chat") == "gpt-4o"
+        assert model_for("subtasks") == "gpt-4o-mini"
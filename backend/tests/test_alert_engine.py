@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta
-from services.alert_engine_service import AlertEngineService
+from services.alert_engine_service import AlertEngineService, AlertTimeWheel
 
 @pytest.fixture
 def mock_supabase():
@@ -92,3 +92,96 @@ def test_generate_high_priority_due_soon(mock_supabase):
     priority_alerts = [a for a in alerts if a["type"] == "high_priority"]
     assert len(priority_alerts) == 1
     assert priority_alerts[0]["task_id"] == "t1"
+
+def test_completed_task_has_no_alerts():
+    task = {
+        "id": "t1", "plan_id": "p1", "title": "Done Task",
+        "estimated_time_hours": 0.5, "priority": "high", "status": "completed",
+        "due_date": (datetime.now() - timedelta(days=1)).isoformat(),
+    }
+
+    assert AlertEngineService.build_task_alerts(task, "user123") == []
+
+def test_handle_task_event_saves_alerts_for_changed_task():
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.in_.return_value.in_.return_value.is_.return_value.execute.return_value.data = []
+    task = {
+        "id": "t1", "plan_id": "p1", "title": "Overdue Task",
+        "due_date": (datetime.now() - timedelta(days=1)).isoformat(), "status": "pending",
+    }
+
+    AlertEngineService.handle_task_event(mock_supabase, {
+        "type": "updated", "user_id": "user123", "plan_id": "p1", "task_id": "t1", "task": task,
+    })
+
+    mock_supabase.rpc.assert_called_once()
+    assert mock_supabase.rpc.call_args[0][0] == "insert_dashboard_alerts"
+    inserted = mock_supabase.rpc.call_args[0][1]["alerts"]
+    assert [a["type"] for a in inserted] == ["overdue_task"]
+    assert inserted[0]["task_id"] == "t1"
+
+def test_save_alerts_skips_existing_and_bulk_inserts():
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.in_.return_value.in_.return_value.is_.return_value.execute.return_value.data = [
+        {"id": "a1", "user_id": "user123", "type": "overdue_task", "task_id": "t1"},
+    ]
+    alerts = [
+        {"user_id": "user123", "type": "overdue_task", "task_id": "t1"},
+        {"user_id": "user123", "type": "quick_win", "task_id": "t2"},
+        {"user_id": "user123", "type": "quick_win", "task_id": "t3"},
+    ]
+
+    AlertEngineService.save_alerts(mock_supabase, alerts)
+
+    # One lookup, one conflict-tolerant insert, nothing resolved without an evaluated scope
+    assert mock_supabase.table.return_value.select.call_count == 1
+    mock_supabase.rpc.assert_called_once()
+    inserted = mock_supabase.rpc.call_args[0][1]["alerts"]
+    assert [a["task_id"] for a in inserted] == ["t2", "t3"]
+    mock_supabase.table.return_value.update.assert_not_called()
+
+def test_save_alerts_resolves_alerts_that_no_longer_apply():
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.in_.return_value.in_.return_value.is_.return_value.execute.return_value.data = [
+        {"id": "a1", "user_id": "user123", "type": "overdue_task", "task_id": "t1"},
+        {"id": "a2", "user_id": "user123", "type": "quick_win", "task_id": "t2"},
+    ]
+
+    # t1 was completed, so re-evaluating it produced no alerts
+    AlertEngineService.save_alerts(mock_supabase, [], {"user123": ["t1"]})
+
+    mock_supabase.rpc.assert_not_called()
+    mock_supabase.table.return_value.update.return_value.in_.assert_called_once_with("id", ["a1"])
+
+def test_time_wheel_only_fetches_threshold_slots():
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value.gt.return_value.lte.return_value.neq.return_value
+    query.execute.return_value.data = []
+    wheel = AlertTimeWheel()
+    now = datetime(2024, 1, 10, 12, 0)
+    wheel.last_tick = now - timedelta(hours=1)
+
+    wheel.tick(mock_supabase, now)
+
+    gt_calls = [c[0] for c in mock_supabase.table.return_value.select.return_value.gt.call_args_list]
+    assert gt_calls == [
+        ("due_date", (now - timedelta(hours=1)).isoformat()),
+        ("due_date", (now - timedelta(hours=1) + timedelta(days=2)).isoformat()),
+    ]
+    assert wheel.last_tick == now
+
+def test_bulk_inserted_tasks_dispatch_created_events(monkeypatch):
+    from services import task_event_service
+    from services.task_event_service import TaskEventService
+
+    events = []
+    monkeypatch.setattr(task_event_service, "TASK_EVENT_HANDLERS", [lambda supabase, event: events.append(event)])
+    tasks = [{"id": "t1", "plan_id": "p1", "title": "A"}, {"id": "t2", "plan_id": "p1", "title": "B"}]
+
+    TaskEventService.dispatch_created(MagicMock(), "user123", tasks)
+
+    assert [(e["type"], e["user_id"], e["plan_id"], e["task_id"]) for e in events] == [
+        ("created", "user123", "p1", "t1"),
+        ("created", "user123", "p1", "t2"),
+    ]
+    assert events[0]["task"] is tasks[0]
@@ -0,0 +1,127 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from services.chat_context_service import ChatContextBuilder
+from utils.prompt_layout import count_tokens
+
+PLAN = {"id": "plan-1", "title": "Japan trip", "description": "Two weeks", "status": "active"}
+
+
+def make_tasks(count):
+    return [
+        {
+            "id": f"task-{i}",
+            "order": i,
+            "status": "pending",
+            "title": f"Task about topic{i}",
+            "description": f"Details for topic{i} " * 20,
+        }
+        for i in range(count)
+    ]
+
+
+def make_messages(count, words=5):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "word " * words,
+         "created_at": f"2026-01-01T00:{i:02d}:00"}
+        for i in range(count)
+    ]
+
+
+def test_history_keeps_newest_messages_within_budget():
+    builder = ChatContextBuilder(max_messages=12)
+    messages = make_messages(12, words=50)
+
+    selected = builder.select_history(messages, budget=200)
+
+    assert selected
+    assert selected[-1] is messages[-1]
+    assert selected == messages[-len(selected):]
+    assert sum(count_tokens(m["content"]) for m in selected) <= 200
+
+
+def test_tasks_prefer_those_the_question_is_about():
+    builder = ChatContextBuilder()
+    tasks = make_tasks(50)
+
+    text = builder.select_tasks("How should I approach task 40?", tasks, budget=150)
+
+    assert "40. [PENDING] Task about topic39" in text
+    assert "Details for topic39" in text
+    assert "more tasks not shown" in text
+    assert count_tokens(text) <= 160
+
+
+def test_context_stays_within_budget_for_large_plans():
+    builder = ChatContextBuilder(token_budget=800)
+
+    context = builder.build("What next?", PLAN, make_tasks(300), make_messages(12, words=200), summary="Earlier talk")
+
+    assert context["tokens"] <= 800
+    assert "EARLIER CONVERSATION" in context["plan_context"]
+    assert context["history"][-1]["content"].startswith("message 11")
+
+
+def test_load_history_fetches_latest_messages_after_summary():
+    builder = ChatContextBuilder(max_messages=5, summary_trigger_messages=3)
+    supabase = MagicMock()
+    summaries = MagicMock()
+    summaries.select.return_value.eq.return_value.execute.return_value.data = [
+        {"summary": "So far", "summarized_until": "2026-01-01T00:00:00"}
+    ]
+    messages = MagicMock()
+    query = messages.select.return_value.eq.return_value.gt.return_value
+    query.order.return_value.limit.return_value.execute.return_value.data = [{"content": "b"}, {"content": "a"}]
+    supabase.table.side_effect = lambda name: summaries if name == "chat_summaries" else messages
+
+    history = builder.load_history(supabase, "plan-1")
+
+    query.order.assert_called_once_with("created_at", desc=True)
+    # The window plus the older messages not yet folded into the summary
+    query.order.return_value.limit.assert_called_once_with(8)
+    assert history == {"summary": "So far", "messages": [{"content": "a"}, {"content": "b"}]}
+
+
+@patch("services.chat_context_service.llm_gateway")
+def test_refresh_summary_folds_messages_out_of_the_window(mock_gateway):
+    builder = ChatContextBuilder(max_messages=4, summary_trigger_messages=3)
+    supabase = MagicMock()
+    summaries = MagicMock()
+    summaries.select.return_value.eq.return_value.execute.return_value.data = []
+    messages = MagicMock()
+    messages.select.return_value.eq.return_value.order.return_value.execute.return_value.data = make_messages(8)
+    supabase.table.side_effect = lambda name: summaries if name == "chat_summaries" else messages
+    mock_gateway.create_chat_completion.return_value.choices = [MagicMock(message=MagicMock(content="Summary"))]
+
+    assert builder.refresh_summary(supabase, "plan-1") is True
+
+    row = summaries.upsert.call_args[0][0]
+    assert row["summary"] == "Summary"
+    assert row["summarized_until"] == "2026-01-01T00:03:00"
+    assert row["message_count"] == 4
+
+
+def test_refresh_summary_waits_for_enough_messages():
+    builder = ChatContextBuilder(max_messages=4, summary_trigger_messages=3)
+    supabase = MagicMock()
+    supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+    supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value.data = make_messages(6)
+
+    assert builder.refresh_summary(supabase, "plan-1") is False
+    supabase.table.return_value.upsert.assert_not_called()
+
+
+def test_context_includes_retrieved_tasks_and_resources():
+    builder = ChatContextBuilder(token_budget=1200, top_k=3)
+    tasks = make_tasks(100)
+    tasks[70]["title"] = "Book ryokan in Kyoto"
+    tasks[70]["description"] = "Reserve a traditional ryokan with onsen near Gion"
+    resources = [
+        {"id": "r1", "title": "Japanese Guest Houses - ryokan booking", "url": "https://japaneseguesthouses.com"},
+        {"id": "r2", "title": "Japan Rail Pass", "url": "https://japanrailpass.net"},
+    ]
+
+    context = builder.build("Which ryokan should I pick in Kyoto?", PLAN, tasks, [], resources=resources)
+
+    assert "71. [PENDING] Book ryokan in Kyoto\n   Description: Reserve a traditional ryokan" in context["plan_context"]
+    assert "RELEVANT RESOURCES:\n- Japanese Guest Houses" in context["plan_context"]
+    assert "Japan Rail Pass" not in context["plan_context"]
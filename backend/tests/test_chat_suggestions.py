@@ -0,0 +1,133 @@
+import json
+from unittest.mock import MagicMock, patch
+from services.chat_suggestion_service import (
+    generate_proactive_suggestions,
+    _reorder_tasks,
+    _handle_add_task_action,
+    _handle_optimize_action,
+)
+
+TASK_A = "11111111-1111-1111-1111-111111111111"
+TASK_B = "22222222-2222-2222-2222-222222222222"
+TASK_C = "44444444-4444-4444-4444-444444444444"
+OTHER_PLAN_TASK = "33333333-3333-3333-3333-333333333333"
+PLAN = {"id": "plan-1", "title": "Trip to Japan", "description": "Two weeks"}
+TASKS = [
+    {"id": TASK_A, "title": "Book flights", "status": "pending"},
+    {"id": TASK_B, "title": "Find a hotel", "status": "pending"},
+]
+
+
+def _llm_response(suggestions):
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=json.dumps({"suggestions": suggestions})))]
+    return response
+
+
+def _suggestion(title, **overrides):
+    suggestion = {
+        "title": title,
+        "description": "Why",
+        "suggestion_type": "breakdown",
+        "priority": "high",
+        "related_task_ids": [TASK_A],
+        "confidence_score": 0.9,
+    }
+    suggestion.update(overrides)
+    return suggestion
+
+
+@patch("services.chat_suggestion_service.llm_gateway")
+def test_refresh_validates_in_memory_and_inserts_once(mock_gateway):
+    mock_gateway.create_chat_completion.return_value = _llm_response([
+        _suggestion("Break down flights", related_task_ids=[TASK_A, OTHER_PLAN_TASK, "not-a-uuid"]),
+        _suggestion("Already pending"),
+        _suggestion("Break down flights"),
+        _suggestion("Reorder", suggestion_type="optimize", metadata={"operations": [
+            {"type": "reorder", "task_id": TASK_B, "before_task_id": TASK_A},
+            {"type": "reorder", "task_id": OTHER_PLAN_TASK, "before_task_id": TASK_A},
+        ]}),
+    ])
+    supabase = MagicMock()
+    table = supabase.table.return_value
+    table.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"title": "Already pending"}]
+    table.insert.return_value.execute.return_value.data = [{"id": "s1"}, {"id": "s2"}]
+
+    result = generate_proactive_suggestions(PLAN, TASKS, "user-1", supabase)
+
+    assert result == [{"id": "s1"}, {"id": "s2"}]
+    # One dedupe query and one insert
+    assert table.select.call_count == 1
+    assert table.insert.call_count == 1
+    rows = table.insert.call_args.args[0]
+    assert [row["title"] for row in rows] == ["Break down flights", "Reorder"]
+    assert rows[0]["related_task_ids"] == [TASK_A]
+    assert rows[1]["metadata"]["operations"] == [{"type": "reorder", "task_id": TASK_B, "before_task_id": TASK_A}]
+
+
+@patch("services.chat_suggestion_service.llm_gateway")
+def test_pending_suggestions_from_caller_skip_the_query(mock_gateway):
+    mock_gateway.create_chat_completion.return_value = _llm_response([_suggestion("Already pending")])
+    supabase = MagicMock()
+
+    result = generate_proactive_suggestions(PLAN, TASKS, "user-1", supabase, [{"title": "Already pending"}])
+
+    assert result == []
+    supabase.table.assert_not_called()
+
+
+def test_reorder_operations_are_applied_in_memory():
+    tasks = [{"id": TASK_C, "order": 3}, {"id": TASK_A, "order": 1}, {"id": TASK_B, "order": 2}]
+    operations = [
+        {"type": "reorder", "task_id": TASK_C, "before_task_id": TASK_A},
+        {"type": "reorder", "task_id": OTHER_PLAN_TASK, "before_task_id": TASK_A},
+        {"type": "reorder", "task_id": TASK_B, "before_task_id": TASK_A},
+    ]
+    # C, B, A; only changed orders are written
+    assert _reorder_tasks(tasks, operations) == [
+        {"id": TASK_C, "order": 1},
+        {"id": TASK_A, "order": 3},
+    ]
+
+
+def test_optimize_loads_tasks_once_and_writes_in_one_call():
+    supabase = MagicMock()
+    supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+        {"id": TASK_A, "order": 1}, {"id": TASK_B, "order": 2},
+    ]
+    suggestion = {"plan_id": "plan-1", "metadata": {"operations": [
+        {"type": "reorder", "task_id": TASK_B, "before_task_id": TASK_A},
+    ]}}
+
+    _handle_optimize_action(suggestion, supabase)
+
+    assert supabase.table.call_count == 1
+    supabase.rpc.assert_called_once_with("apply_plan_task_changes", {
+        "target_plan_id": "plan-1",
+        "task_orders": [{"id": TASK_B, "order": 1}, {"id": TASK_A, "order": 2}],
+        "new_tasks": [],
+    })
+
+
+def test_add_task_appends_all_tasks_in_one_call():
+    supabase = MagicMock()
+    suggestion = {"plan_id": "plan-1", "title": "Add tasks", "description": "", "metadata": {"suggested_tasks": [
+        {"title": "Buy flour", "description": "All purpose"},
+        "not a task",
+        {"title": "<i>Buy sugar</i>"},
+    ]}}
+
+    supabase.rpc.return_value.execute.return_value.data = [{"id": TASK_C, "plan_id": "plan-1", "title": "Buy flour"}]
+
+    # The inserted tasks come back so the caller can dispatch task events for them
+    assert _handle_add_task_action(suggestion, supabase) == [{"id": TASK_C, "plan_id": "plan-1", "title": "Buy flour"}]
+
+    supabase.table.assert_not_called()
+    supabase.rpc.assert_called_once_with("apply_plan_task_changes", {
+        "target_plan_id": "plan-1",
+        "task_orders": [],
+        "new_tasks": [
+            {"title": "Buy flour", "description": "All purpose"},
+            {"title": "Buy sugar", "description": ""},
+        ],
+    })
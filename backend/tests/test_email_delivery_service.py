@@ -0,0 +1,62 @@
+import pytest
+from services.email_delivery_service import (
+    EmailMessage,
+    EmailOutbox,
+    InMemoryTransport,
+    RecipientRateLimiter,
+)
+
+def make_messages(count, to_email=None):
+    return [
+        EmailMessage(to_email=to_email or f"user{i}@example.com", subject=f"Subject {i}", html="<p>Hi</p>")
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_outbox_sends_in_batches():
+    transport = InMemoryTransport()
+    outbox = EmailOutbox(transport, concurrency=2, batch_size=10)
+
+    for message in make_messages(35):
+        await outbox.enqueue(message)
+    await outbox.stop()
+
+    assert len(transport.sent) == 35
+    assert all(len(batch) <= 10 for batch in transport.batches)
+    assert len(transport.batches) < 35
+    assert outbox.sent_count == 35
+
+@pytest.mark.asyncio
+async def test_outbox_retries_failed_batches():
+    transport = InMemoryTransport(fail_times=2)
+    outbox = EmailOutbox(transport, concurrency=1, retry_base_seconds=0)
+
+    for message in make_messages(3):
+        await outbox.enqueue(message)
+    await outbox.stop()
+
+    assert len(transport.sent) == 3
+    assert outbox.failed_count == 0
+
+@pytest.mark.asyncio
+async def test_outbox_gives_up_after_max_retries():
+    transport = InMemoryTransport(fail_times=10)
+    outbox = EmailOutbox(transport, concurrency=1, max_retries=2, retry_base_seconds=0)
+
+    await outbox.enqueue(make_messages(1)[0])
+    await outbox.stop()
+
+    assert transport.sent == []
+    assert outbox.failed_count == 1
+
+@pytest.mark.asyncio
+async def test_outbox_enforces_per_recipient_limit():
+    transport = InMemoryTransport()
+    outbox = EmailOutbox(transport, rate_limiter=RecipientRateLimiter(limit=2))
+
+    results = [await outbox.enqueue(m) for m in make_messages(4, to_email="busy@example.com")]
+    await outbox.stop()
+
+    assert results == [True, True, False, False]
+    assert len(transport.sent) == 2
+    assert outbox.rate_limited_count == 2
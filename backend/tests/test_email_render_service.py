@@ -0,0 +1,39 @@
+from services.email_render_service import EmailRenderer
+
+DASHBOARD_URL = "https://app.example.com/dashboard"
+
+def reminder_job(title):
+    plan = {"id": "p1", "title": "Plan"}
+    return ("task_reminder.html", {
+        "task": {"title": title, "due_date": "2024-01-10T09:00:00", "priority": "high"},
+        "plan": plan,
+        "action_url": "https://app.example.com/plans/p1",
+        "dashboard_url": DASHBOARD_URL,
+    })
+
+def test_renders_independent_of_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    renderer = EmailRenderer(cache_dir=str(tmp_path), processes=0)
+
+    assert renderer.precompile() >= 4
+    html = renderer.render(*reminder_job("Write tests"))
+    assert "Write tests" in html
+    assert f"{DASHBOARD_URL}/profile/settings" in html
+
+def test_fragments_are_memoized(tmp_path):
+    renderer = EmailRenderer(cache_dir=str(tmp_path), processes=0)
+
+    first = renderer.fragment("_footer.html", reason="Because", dashboard_url=DASHBOARD_URL)
+    second = renderer.fragment("_footer.html", reason="Because", dashboard_url=DASHBOARD_URL)
+
+    assert first is second
+    assert len(renderer._fragments) == 1
+
+def test_process_pool_matches_serial_rendering(tmp_path):
+    jobs = [reminder_job(f"Task {i}") for i in range(10)]
+    serial = EmailRenderer(cache_dir=str(tmp_path), processes=0)
+    pooled = EmailRenderer(cache_dir=str(tmp_path), pool_threshold=0, processes=2)
+    try:
+        assert pooled.render_many(jobs) == serial.render_many(jobs)
+    finally:
+        pooled.shutdown()
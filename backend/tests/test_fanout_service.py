@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from services.fanout_service import FanoutExecutor, MemoryCheckpointStore
+
+USERS = [{"user_id": f"user{i:03d}"} for i in range(10)]
+
+def fetch_page(after, limit):
+    rows = [u for u in USERS if after is None or u["user_id"] > after]
+    return rows[:limit]
+
+@pytest.mark.asyncio
+async def test_fanout_processes_every_row_in_batches():
+    processed = []
+
+    async def process(user):
+        processed.append(user["user_id"])
+
+    store = MemoryCheckpointStore()
+    executor = FanoutExecutor("test_job", store, batch_size=4, max_concurrency=2)
+    result = await executor.run(fetch_page, process)
+
+    assert sorted(processed) == [u["user_id"] for u in USERS]
+    assert result.processed == 10
+    assert result.batches == 3
+    assert len(result.batch_timings_ms) == 3
+    assert store.load("test_job")["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_fanout_bounds_concurrency():
+    active = 0
+    peak = 0
+
+    async def process(user):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    executor = FanoutExecutor("test_job", MemoryCheckpointStore(), batch_size=10, max_concurrency=3)
+    await executor.run(fetch_page, process)
+
+    assert peak == 3
+
+@pytest.mark.asyncio
+async def test_fanout_resumes_after_crash():
+    store = MemoryCheckpointStore()
+    store.save("test_job", "run-1", "user005", "running")
+    processed = []
+
+    async def process(user):
+        processed.append(user["user_id"])
+
+    result = await FanoutExecutor("test_job", store, batch_size=4).run(fetch_page, process)
+
+    assert result.run_id == "run-1"
+    assert result.resumed_from == "user005"
+    assert processed == ["user006", "user007", "user008", "user009"]
+
+@pytest.mark.asyncio
+async def test_fanout_counts_failures_without_stopping():
+    async def process(user):
+        if user["user_id"] == "user003":
+            raise RuntimeError("boom")
+
+    result = await FanoutExecutor("test_job", MemoryCheckpointStore()).run(fetch_page, process)
+
+    assert result.processed == 9
+    assert result.failed == 1
+
+@pytest.mark.asyncio
+async def test_fanout_abandons_stale_checkpoint():
+    store = MemoryCheckpointStore()
+    store.save("test_job", "run-1", "user005", "running")
+    store.load("test_job")["updated_at"] = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+
+    result = await FanoutExecutor("test_job", store, batch_size=4).run(fetch_page, lambda user: asyncio.sleep(0))
+
+    assert result.run_id != "run-1"
+    assert result.processed == 10
+
+@pytest.mark.asyncio
+async def test_fanout_finishes_page_side_effects_before_checkpointing():
+    store = MemoryCheckpointStore()
+    events = []
+
+    async def process(user):
+        events.append(("queued", user["user_id"]))
+
+    async def flush():
+        events.append(("flushed", store.load("test_job")["cursor"]))
+
+    await FanoutExecutor("test_job", store, batch_size=4).run(fetch_page, process, before_checkpoint=flush)
+
+    # Each flush happens while the checkpoint still points before the page
+    flushes = [cursor for kind, cursor in events if kind == "flushed"]
+    assert flushes == [None, "user003", "user007"]
+    assert events.index(("flushed", None)) == 4
+
+def test_interrupted_run_is_detected_until_it_is_stale():
+    store = MemoryCheckpointStore()
+    executor = FanoutExecutor("test_job", store, max_resume_age=timedelta(hours=12))
+    assert not executor.has_interrupted_run()
+
+    store.save("test_job", "run-1", "user005", "running")
+    assert executor.has_interrupted_run()
+
+    store.load("test_job")["updated_at"] = (datetime.now(timezone.utc) - timedelta(hours=13)).isoformat()
+    assert not executor.has_interrupted_run()
@@ -0,0 +1,47 @@
+import pytest
+from services.leader_election_service import FileLeaderLock, LeaderElector
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "scheduler.lock")
+    first = FileLeaderLock(path)
+    second = FileLeaderLock(path)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+@pytest.mark.asyncio
+async def test_only_one_elector_runs_the_scheduler(tmp_path):
+    path = str(tmp_path / "scheduler.lock")
+    started = []
+    stopped = []
+
+    electors = [
+        LeaderElector(
+            FileLeaderLock(path),
+            on_elected=lambda i=i: started.append(i),
+            on_demoted=lambda i=i: stopped.append(i),
+            retry_seconds=60,
+        )
+        for i in range(3)
+    ]
+    for elector in electors:
+        await elector.start()
+
+    assert started == [0]
+    assert [e.is_leader for e in electors] == [True, False, False]
+
+    # Leader shuts down; exactly one follower takes over
+    await electors[0].stop()
+    for elector in electors[1:]:
+        await elector.check()
+
+    assert stopped == [0]
+    assert len(started) == 2
+    assert sum(e.is_leader for e in electors) == 1
+
+    for elector in electors[1:]:
+        await elector.stop()
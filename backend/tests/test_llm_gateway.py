@@ -0,0 +1,163 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+import openai
+from services.llm_gateway import LLMGateway, LLMOverloadedError, INTERACTIVE, BACKGROUND
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+def hold_slot(gateway, lane, started, release):
+    with gateway.slot("model", lane):
+        started.set()
+        release.wait(5)
+
+def test_sheds_when_queue_wait_exceeds_lane_limit():
+    gateway = LLMGateway(default_concurrency=1, max_wait_seconds={INTERACTIVE: 0.05, BACKGROUND: 0.05})
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold_slot, args=(gateway, INTERACTIVE, started, release))
+    holder.start()
+    started.wait(5)
+
+    with pytest.raises(LLMOverloadedError) as exc:
+        with gateway.slot("model", INTERACTIVE):
+            pass
+    assert exc.value.status_code == 503
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+    release.set()
+    holder.join()
+
+def test_sheds_immediately_when_queue_is_full():
+    gateway = LLMGateway(default_concurrency=1, max_queue_depth=0)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold_slot, args=(gateway, INTERACTIVE, started, release))
+    holder.start()
+    started.wait(5)
+
+    start = time.monotonic()
+    with pytest.raises(LLMOverloadedError):
+        with gateway.slot("model", INTERACTIVE):
+            pass
+    assert time.monotonic() - start < 0.5
+
+    release.set()
+    holder.join()
+
+def test_interactive_waiters_go_before_background():
+    gateway = LLMGateway(default_concurrency=1)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold_slot, args=(gateway, INTERACTIVE, started, release))
+    holder.start()
+    started.wait(5)
+
+    order = []
+    def call(lane):
+        with gateway.slot("model", lane):
+            order.append(lane)
+
+    background = threading.Thread(target=call, args=(BACKGROUND,))
+    background.start()
+    while gateway.governor("model").queue_depth < 1:
+        time.sleep(0.01)
+    interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+    interactive.start()
+    while gateway.governor("model").queue_depth < 2:
+        time.sleep(0.01)
+
+    release.set()
+    for thread in (holder, background, interactive):
+        thread.join(5)
+    assert order == [INTERACTIVE, BACKGROUND]
+
+def test_background_is_capped_below_model_limit():
+    gateway = LLMGateway(default_concurrency=2, background_max=1, max_wait_seconds={INTERACTIVE: 1, BACKGROUND: 0.05})
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold_slot, args=(gateway, BACKGROUND, started, release))
+    holder.start()
+    started.wait(5)
+
+    with pytest.raises(LLMOverloadedError):
+        with gateway.slot("model", BACKGROUND):
+            pass
+    # The remaining slot is still available to interactive calls
+    client = MagicMock()
+    gateway.create_chat_completion(client, INTERACTIVE, model="model", messages=[])
+    kwargs = client.chat.completions.create.call_args.kwargs
+    assert kwargs["model"] == "model"
+    assert 0 < kwargs["timeout"] <= 30
+
+    release.set()
+    holder.join()
+
+def test_call_timeout_is_what_is_left_of_the_endpoint_deadline():
+    gateway = LLMGateway(deadlines={"chat": 5.0})
+    client = MagicMock()
+
+    gateway.create_chat_completion(client, INTERACTIVE, endpoint="chat", model="model", messages=[])
+
+    assert 4.5 < client.chat.completions.create.call_args.kwargs["timeout"] <= 5.0
+
+def test_circuit_opens_after_consecutive_provider_failures_and_fails_fast():
+    gateway = LLMGateway(circuit_failure_threshold=2, circuit_reset_seconds=60)
+    client = MagicMock()
+    client.chat.completions.create.side_effect = openai.APITimeoutError(request=MagicMock())
+
+    for _ in range(2):
+        with pytest.raises(openai.APITimeoutError):
+            gateway.create_chat_completion(client, model="model", messages=[])
+
+    with pytest.raises(CircuitOpenError):
+        gateway.create_chat_completion(client, model="model", messages=[])
+    assert client.chat.completions.create.call_count == 2
+
+def test_non_provider_errors_do_not_open_the_circuit():
+    gateway = LLMGateway(circuit_failure_threshold=1)
+    client = MagicMock()
+    client.chat.completions.create.side_effect = ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        gateway.create_chat_completion(client, model="model", messages=[])
+    assert gateway.breaker("model").state == CLOSED
+
+def test_half_open_allows_one_probe_then_closes_on_success():
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+def test_hedge_fires_for_slow_attempt_and_first_response_wins():
+    from services.llm_hedging import Hedger
+    hedger = Hedger(max_ratio=1.0, default_delay_seconds=0.05, min_delay_seconds=0.05)
+    calls = []
+
+    def attempt(cancelled):
+        calls.append(cancelled)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    assert hedger.call("chat", attempt) == "fast"
+    assert hedger.stats()["hedges_won"] == 1
+    # The loser is told it lost
+    assert calls[0].is_set()
+
+def test_no_hedge_when_attempt_is_fast_or_budget_is_spent():
+    from services.llm_hedging import Hedger
+    hedger = Hedger(max_ratio=0.0, default_delay_seconds=0.05, min_delay_seconds=0.05)
+
+    assert hedger.call("chat", lambda cancelled: "quick") == "quick"
+
+    def slow(cancelled):
+        time.sleep(0.1)
+        return "slow"
+    assert hedger.call("chat", slow) == "slow"
+    assert hedger.stats()["hedges_fired"] == 0
@@ -0,0 +1,113 @@
+from datetime import date
+import pytest
+from unittest.mock import MagicMock
+from services.llm_metering import LLMMeter, LLMBudgetExceededError, current_llm_user
+from services.llm_gateway import LLMGateway
+from api.routes.admin import summarize_usage, fetch_all_rows, ADMIN_QUERY_PAGE_SIZE
+
+PRICING = {"big": {"input": 10.0, "output": 30.0}, "small": {"input": 1.0, "output": 2.0}}
+
+def usage(prompt, completion):
+    return MagicMock(prompt_tokens=prompt, completion_tokens=completion)
+
+def test_records_tokens_and_cost_per_user_endpoint_and_model():
+    meter = LLMMeter(PRICING)
+    token = current_llm_user.set("u1")
+    try:
+        meter.record("chat", "big", usage(1000, 500), 120)
+        meter.record("chat", "big", usage(1000, 500), 80)
+    finally:
+        current_llm_user.reset(token)
+
+    pending, _ = meter.take_pending()
+    (key, counters), = pending.items()
+    assert key[1:] == ("u1", "chat", "big")
+    assert counters["calls"] == 2
+    assert counters["prompt_tokens"] == 2000
+    assert counters["cost_usd"] == pytest.approx(2 * (1000 * 10 + 500 * 30) / 1_000_000)
+
+def test_budget_downgrades_then_blocks():
+    meter = LLMMeter(PRICING, daily_budget_usd=0.01, hard_limit_multiplier=2, downgrade_model="small")
+    token = current_llm_user.set("u1")
+    try:
+        assert meter.check_budget("big") == "big"
+        meter.record("chat", "big", usage(1000, 0), 10)   # $0.01
+        assert meter.check_budget("big") == "small"
+        meter.record("chat", "big", usage(1000, 0), 10)   # $0.02
+        with pytest.raises(LLMBudgetExceededError):
+            meter.check_budget("big")
+    finally:
+        current_llm_user.reset(token)
+
+def test_flush_writes_one_batch_and_adopts_stored_totals():
+    meter = LLMMeter(PRICING, daily_budget_usd=1.0)
+    token = current_llm_user.set("u1")
+    try:
+        meter.record("chat", "big", usage(1000, 0), 10)
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"user_id": "u1", "day": date.today().isoformat(), "cost_usd": "0.75"},
+        ]
+
+        assert meter.flush_sync(supabase) == 1
+        name, params = supabase.rpc.call_args[0]
+        assert name == "record_llm_usage"
+        assert params["usage"][0]["calls"] == 1
+        # Other workers' spend came back with the flush
+        assert meter.spent_today("u1") == pytest.approx(0.75)
+        assert meter.flush_sync(supabase) == 0
+    finally:
+        current_llm_user.reset(token)
+
+def test_failed_flush_keeps_usage_for_the_next_flush():
+    meter = LLMMeter(PRICING, daily_budget_usd=1.0)
+    token = current_llm_user.set("u1")
+    try:
+        meter.record("chat", "big", usage(1000, 0), 10)
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.side_effect = Exception("column reference \"day\" is ambiguous")
+
+        with pytest.raises(Exception):
+            meter.flush_sync(supabase)
+        # Still counted against the budget, and retried in full
+        assert meter.spent_today("u1") == pytest.approx(0.01)
+        supabase.rpc.return_value.execute.side_effect = None
+        supabase.rpc.return_value.execute.return_value.data = []
+        assert meter.flush_sync(supabase) == 1
+        assert supabase.rpc.call_args[0][1]["usage"][0]["calls"] == 1
+    finally:
+        current_llm_user.reset(token)
+
+def test_gateway_meters_successful_calls():
+    meter = LLMMeter(PRICING)
+    gateway = LLMGateway(meter=meter)
+    client = MagicMock()
+    client.chat.completions.create.return_value.usage = usage(10, 5)
+
+    gateway.create_chat_completion(client, endpoint="subtasks", model="small", messages=[])
+
+    pending, _ = meter.take_pending()
+    (key, counters), = pending.items()
+    assert key[1:] == ("system", "subtasks", "small")
+    assert counters["completion_tokens"] == 5
+
+def test_summarize_usage_orders_by_cost():
+    rows = [
+        {"user_id": "a", "calls": 1, "prompt_tokens": 1, "completion_tokens": 1, "cost_usd": 0.1, "latency_ms": 100},
+        {"user_id": "b", "calls": 2, "prompt_tokens": 1, "completion_tokens": 1, "cost_usd": 0.5, "latency_ms": 300},
+        {"user_id": "a", "calls": 1, "prompt_tokens": 1, "completion_tokens": 1, "cost_usd": 0.1, "latency_ms": 100},
+    ]
+
+    summary = summarize_usage(rows, lambda row: row["user_id"], 10)
+
+    assert [item.key for item in summary] == ["b", "a"]
+    assert summary[1].calls == 2
+    assert summary[0].avg_latency_ms == 150
+
+def test_fetch_all_rows_reads_past_the_response_cap():
+    rows = [{"n": i} for i in range(ADMIN_QUERY_PAGE_SIZE + 5)]
+    query = MagicMock()
+    query.range.side_effect = lambda start, end: MagicMock(**{"execute.return_value.data": rows[start:end + 1]})
+
+    assert fetch_all_rows(lambda: query) == rows
+    assert query.range.call_count == 2
@@ -0,0 +1,63 @@
+from services.plan_cache_service import SemanticPlanCache, adapt_plan
+from services.llm_metering import current_llm_user
+
+PLAN = {
+    "plan_type": "learning",
+    "tasks": [{"title": "📋 Planning: Set goals for Learn Spanish in 3 months", "description": "Define what Learn Spanish in 3 months means to you."}],
+    "resources": [],
+}
+
+
+def test_paraphrase_hits_and_title_is_adapted():
+    cache = SemanticPlanCache(capacity=10)
+    cache.insert("Learn Spanish in 3 months", "Reach conversational Spanish before moving to Madrid", "3 months", PLAN, 9000)
+
+    plan = cache.lookup("3-month Spanish learning plan", "Reach conversational Spanish before my move to Madrid", "3 months")
+
+    assert plan is not None
+    assert plan["tasks"][0]["title"] == "📋 Planning: Set goals for 3-month Spanish learning plan"
+    # The cached copy is untouched
+    assert cache.lookup("Learn Spanish in 3 months", "Reach conversational Spanish before moving to Madrid", "3 months")["tasks"] == PLAN["tasks"]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["saved_ms"] == 18000
+
+
+def test_different_topic_or_timeline_misses():
+    cache = SemanticPlanCache(capacity=10)
+    cache.insert("Learn Spanish in 3 months", "Reach conversational Spanish before moving to Madrid", "3 months", PLAN)
+    cache.insert("Run a marathon", "Train for my first race", "4 months", PLAN)
+
+    assert cache.lookup("Learn French in 3 months", "Reach conversational French before moving to Paris", "3 months") is None
+    assert cache.lookup("Learn Spanish in 3 months", "Reach conversational Spanish before moving to Madrid", "6 months") is None
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+def test_user_scope_keeps_plans_private():
+    cache = SemanticPlanCache(capacity=10, scope="user")
+    token = current_llm_user.set("alice")
+    cache.insert("Learn Spanish", "Conversational level", None, PLAN)
+    current_llm_user.reset(token)
+
+    token = current_llm_user.set("bob")
+    try:
+        assert cache.lookup("Learn Spanish", "Conversational level") is None
+    finally:
+        current_llm_user.reset(token)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticPlanCache(capacity=2, scope="global")
+    cache.insert("Learn Spanish", "Conversational level", None, PLAN)
+    cache.insert("Run a marathon", "First race", None, PLAN)
+    assert cache.lookup("Learn Spanish", "Conversational level") is not None
+
+    cache.insert("Build a website", "Portfolio site", None, PLAN)
+
+    assert cache.lookup("Run a marathon", "First race") is None
+    assert cache.lookup("Learn Spanish", "Conversational level") is not None
+    assert cache.lookup("Build a website", "Portfolio site") is not None
+
+
+def test_adapt_plan_same_title_is_a_copy():
+    adapted = adapt_plan(PLAN, "Learn Spanish in 3 months", "learn spanish in 3 months")
+    assert adapted == PLAN and adapted is not PLAN
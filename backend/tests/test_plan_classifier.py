@@ -0,0 +1,69 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from utils.plan_classifier import PlanTypeClassifier, load_plan_classifier, plan_text
+from utils import prompt_builder
+
+TRAINING = [
+    ("Trip to Japan", "travel"), ("Vacation in Italy", "travel"), ("Visit Paris museums", "travel"),
+    ("Learn Python", "learning"), ("Study for the GRE", "learning"), ("Online course in statistics", "learning"),
+    ("Go to the gym", "fitness"), ("Marathon training", "fitness"), ("Lose weight with diet", "fitness"),
+]
+
+
+def test_fit_predict_and_round_trip(tmp_path):
+    model = PlanTypeClassifier.fit([text for text, _ in TRAINING], [label for _, label in TRAINING])
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = PlanTypeClassifier.load(path)
+
+    assert loaded.predict("weekend trip to Rome")[0] == "travel"
+    assert loaded.predict("visit the gym three times a week")[0] == "fitness"
+    proba = loaded.predict_proba("learn statistics")
+    assert max(proba, key=proba.get) == "learning"
+    assert sum(proba.values()) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_bundled_model_loads_fast_and_classifies():
+    start = time.perf_counter()
+    model = load_plan_classifier()
+    assert (time.perf_counter() - start) < 0.05
+
+    assert model.predict(plan_text("Visit the gym", "Three workouts a week"))[0] == "fitness"
+    assert model.predict(plan_text("Plan my wedding", "Venue and catering for 100 guests"))[0] == "event"
+
+
+def test_missing_artifact_returns_none(tmp_path):
+    assert load_plan_classifier(str(tmp_path / "missing.npz")) is None
+
+
+@patch("utils.prompt_builder.llm_gateway")
+def test_confident_local_prediction_skips_the_llm(mock_gateway):
+    plan_type = prompt_builder.determine_plan_type("Run a marathon", "16 week training program", MagicMock())
+
+    assert plan_type == "fitness"
+    mock_gateway.create_chat_completion.assert_not_called()
+
+
+@patch("utils.prompt_builder.llm_gateway")
+def test_low_confidence_asks_the_llm(mock_gateway):
+    mock_gateway.create_chat_completion.return_value.choices = [MagicMock(message=MagicMock(content="project"))]
+    classifier = MagicMock()
+    classifier.predict.return_value = ("default", 0.3)
+
+    with patch.object(prompt_builder, "plan_classifier", classifier):
+        assert prompt_builder.determine_plan_type("Fix my bike", "", MagicMock()) == "project"
+    mock_gateway.create_chat_completion.assert_called_once()
+
+
+def test_keyword_fallback_counts_whole_words():
+    with patch.object(prompt_builder, "plan_classifier", None):
+        assert prompt_builder.determine_plan_type_fallback("Visit the gym", "workout and diet") == "fitness"
+        assert prompt_builder.determine_plan_type_fallback("Something else", "") == "default"
+
+
+def test_keyword_fallback_ties_are_not_guessed():
+    with patch.object(prompt_builder, "plan_classifier", None):
+        # "visit" (travel) and "gym" (fitness) match once each
+        assert prompt_builder.determine_plan_type_fallback("Visit the gym", "") == "default"
+        assert prompt_builder.determine_plan_type_fallback("visit the gym", "") == "default"
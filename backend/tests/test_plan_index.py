@@ -0,0 +1,54 @@
+from services.plan_index_service import PlanIndex, PlanIndexRegistry, TASK, RESOURCE
+
+
+def test_bm25_ranks_matching_documents_first():
+    index = PlanIndex()
+    index.upsert(TASK, "1", "Book flights to Tokyo")
+    index.upsert(TASK, "2", "Reserve hotel near Shinjuku station")
+    index.upsert(TASK, "3", "Buy travel insurance")
+    index.upsert(RESOURCE, "r1", "Skyscanner flights comparison")
+
+    assert [doc_id for doc_id, _ in index.search("cheap flights", TASK)] == ["1"]
+    assert {doc_id for doc_id, _ in index.search("flights")} == {"1", "r1"}
+    assert index.search("ramen") == []
+
+
+def test_updates_and_removals_are_incremental():
+    index = PlanIndex()
+    index.upsert(TASK, "1", "Book flights")
+    index.upsert(TASK, "2", "Pack luggage")
+
+    index.upsert(TASK, "1", "Renew passport")
+    index.remove(TASK, "2")
+    index.upsert(TASK, "3", "Exchange currency")
+
+    assert index.search("flights") == []
+    assert index.search("luggage") == []
+    assert [doc_id for doc_id, _ in index.search("passport")] == ["1"]
+    assert len(index) == 2
+    # The removed document's slot was reused
+    assert len(index._keys) == 2
+
+
+def test_sync_only_reindexes_changed_documents():
+    index = PlanIndex()
+    index.sync(TASK, {"1": "Book flights", "2": "Pack luggage"})
+    fingerprints = list(index._fingerprints)
+
+    index.sync(TASK, {"1": "Book flights", "3": "Buy insurance"})
+
+    assert index._fingerprints[index._slots[(TASK, "1")]] == fingerprints[0]
+    assert {key[1] for key in index._slots} == {"1", "3"}
+
+
+def test_registry_applies_task_events_to_loaded_plans_only():
+    registry = PlanIndexRegistry(max_plans=1)
+    registry.search("plan-1", "anything", [{"id": "t1", "title": "Book flights"}])
+
+    registry.handle_task_event(None, {"type": "updated", "plan_id": "plan-1", "task_id": "t1",
+                                      "task": {"title": "Renew passport"}})
+    registry.handle_task_event(None, {"type": "created", "plan_id": "plan-2", "task_id": "t9",
+                                      "task": {"title": "Not loaded"}})
+
+    assert [doc_id for doc_id, _ in registry.get("plan-1").search("passport")] == ["t1"]
+    assert registry.get("plan-2", create=False) is None
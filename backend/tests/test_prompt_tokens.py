@@ -0,0 +1,98 @@
+"""
+Prompt token regression tests
+Budgets live in prompt_token_budgets.json, one per prompt version and
+variant, for the fixed requests below. A change that grows a prompt past
+its budget fails here; raise the budget (or bump the prompt version) in
+the same change so the growth is visible in review.
+"""
+
+import json
+import os
+import pytest
+from utils.prompt_layout import count_message_tokens, FULL, COMPACT
+from utils.prompt_builder import build_plan_messages, PLAN_PROMPT, CLASSIFICATION_PROMPT
+from services.chat_ai_service import build_chat_messages, CHAT_PROMPT
+from services.chat_context_service import SUMMARY_PROMPT
+from services.subtask_generator import SUBTASK_PROMPT, BATCH_SUBTASK_PROMPT
+
+with open(os.path.join(os.path.dirname(__file__), "prompt_token_budgets.json")) as f:
+    BUDGETS = json.load(f)
+
+PLAN = {"id": "plan-1", "title": "Two weeks in Japan", "description": "Tokyo, Kyoto and Osaka on a mid-range budget", "status": "active"}
+TASKS = [
+    {
+        "id": f"task-{i}",
+        "status": "completed" if i < 3 else "pending",
+        "title": f"📋 Planning: Task number {i + 1}",
+        "description": "Compare options on Google Flights and Skyscanner, then set a price alert. " * 3,
+    }
+    for i in range(10)
+]
+HISTORY = [
+    {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} about hotels near Shinjuku station"}
+    for i in range(10)
+]
+
+
+def plan_messages(variant):
+    return build_plan_messages(PLAN["title"], PLAN["description"], "2 weeks", "travel", variant)
+
+
+def chat_messages(variant):
+    return build_chat_messages("What should I book first?", PLAN, TASKS, HISTORY, variant)
+
+
+@pytest.mark.parametrize("template,build,variant", [
+    (PLAN_PROMPT, plan_messages, FULL),
+    (PLAN_PROMPT, plan_messages, COMPACT),
+    (CHAT_PROMPT, chat_messages, FULL),
+    (CHAT_PROMPT, chat_messages, COMPACT),
+])
+def test_prompt_within_token_budget(template, build, variant):
+    tokens = count_message_tokens(build(variant))
+    assert tokens <= BUDGETS[f"{template.key}.{variant}"], f"{template.key}.{variant} uses {tokens} tokens"
+
+
+def test_classification_prompt_within_token_budget():
+    messages = CLASSIFICATION_PROMPT.messages([{"role": "user", "content": "Plan Title: Trip\nCategory:"}])
+    assert count_message_tokens(messages) <= BUDGETS[f"{CLASSIFICATION_PROMPT.key}.{FULL}"]
+
+
+def test_subtask_prompts_within_token_budget():
+    task = "Task: Book flights\n   Description: Round trip to Tokyo"
+    single = SUBTASK_PROMPT.messages([{"role": "user", "content": f"{task}\n\nGenerate 4-8 subtasks now:"}])
+    batch = BATCH_SUBTASK_PROMPT.messages([
+        {"role": "user", "content": "\n\n".join(f"{i}. {task}" for i in range(1, 6)) + "\n\nGenerate 4-8 subtasks for each task now:"}
+    ])
+    assert count_message_tokens(single) <= BUDGETS[f"{SUBTASK_PROMPT.key}.{FULL}"]
+    assert count_message_tokens(batch) <= BUDGETS[f"{BATCH_SUBTASK_PROMPT.key}.{FULL}"]
+
+
+def test_every_prompt_variant_has_a_budget():
+    for template in (PLAN_PROMPT, CHAT_PROMPT, CLASSIFICATION_PROMPT, SUMMARY_PROMPT, SUBTASK_PROMPT, BATCH_SUBTASK_PROMPT):
+        for variant in template.variants:
+            assert f"{template.key}.{variant}" in BUDGETS
+
+
+def test_compact_variants_are_smaller():
+    assert count_message_tokens(plan_messages(COMPACT)) < count_message_tokens(plan_messages(FULL))
+    assert count_message_tokens(chat_messages(COMPACT)) < count_message_tokens(chat_messages(FULL))
+
+
+def test_plan_prompt_static_prefix_is_shared():
+    first = build_plan_messages("Learn Rust", "Systems programming", None, "learning")
+    second = build_plan_messages("Run a marathon", "First race", "6 months", "fitness")
+
+    # Identical leading system message lets the provider cache the prefix
+    assert first[0] == second[0]
+    assert "Learn Rust" not in first[0]["content"]
+    assert "Learn Rust" in first[1]["content"]
+
+
+def test_chat_prompt_puts_static_instructions_first():
+    messages = chat_messages(FULL)
+
+    assert messages[0]["content"] == CHAT_PROMPT.static(FULL)
+    assert PLAN["title"] in messages[1]["content"]
+    assert [m["role"] for m in messages[2:-1]] == [m["role"] for m in HISTORY]
+    assert messages[-1] == {"role": "user", "content": "What should I book first?"}
@@ -0,0 +1,64 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from services.auth_service import get_user_from_token
+from utils.rate_limiter import MemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore, rate_limit
+
+def test_allows_limit_then_blocks_until_an_interval_passes():
+    limiter = RateLimiter("test", limit=5, period_seconds=3600)
+
+    results = [limiter.hit("k", now=0) for _ in range(6)]
+
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[5].retry_after == 720
+    assert limiter.hit("k", now=719).allowed is False
+    assert limiter.hit("k", now=720).allowed is True
+
+def test_peek_does_not_count():
+    limiter = RateLimiter("test", limit=2, period_seconds=60)
+
+    assert limiter.peek("k", now=0).remaining == 2
+    limiter.hit("k", now=0)
+    assert limiter.peek("k", now=0).remaining == 1
+    assert limiter.peek("k", now=0).remaining == 1
+
+def test_memory_store_evicts_idle_and_excess_keys():
+    store = MemoryRateLimitStore(max_keys=3)
+    limiter = RateLimiter("test", limit=1, period_seconds=10, store=store)
+
+    for i in range(5):
+        limiter.hit(f"k{i}", now=0)
+    assert len(store) == 3
+
+    # Every earlier key is idle by now and gets swept
+    limiter.hit("late", now=100)
+    assert len(store) == 1
+
+def test_sqlite_store_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter("test", limit=2, period_seconds=60, store=SQLiteRateLimitStore(path))
+    second = RateLimiter("test", limit=2, period_seconds=60, store=SQLiteRateLimitStore(path))
+
+    assert first.hit("k", now=0).allowed
+    assert second.hit("k", now=0).allowed
+    assert not first.hit("k", now=0).allowed
+
+def test_dependency_sets_headers_and_returns_429():
+    app = FastAPI()
+    limiter = RateLimiter("test", limit=1, period_seconds=60)
+
+    @app.get("/limited", dependencies=[Depends(rate_limit(limiter))])
+    def limited():
+        return {"ok": True}
+
+    app.dependency_overrides[get_user_from_token] = lambda: "user-1"
+    client = TestClient(app)
+
+    ok = client.get("/limited")
+    assert ok.status_code == 200
+    assert ok.headers["RateLimit-Limit"] == "1"
+    assert ok.headers["RateLimit-Remaining"] == "0"
+
+    limited_response = client.get("/limited")
+    assert limited_response.status_code == 429
+    assert int(limited_response.headers["Retry-After"]) > 0
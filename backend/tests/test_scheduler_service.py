@@ -0,0 +1,166 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+from services.scheduler_service import load_reminder_batch, load_digest_batch, digest_day_of_week, fetch_due_tasks_for_users, resume_interrupted_jobs
+from services.alert_engine_service import USER_ID_CHUNK_SIZE
+from services.user_email_service import UserEmailResolver, user_email_resolver
+from services.reminder_coalescing_service import ReminderCoalescer
+
+def make_task(task_id, user_id, due_date, priority="medium"):
+    return {
+        "id": task_id, "title": f"Task {task_id}", "status": "pending", "priority": priority,
+        "due_date": due_date.isoformat(),
+        "plans": {"id": "p1", "user_id": user_id, "title": "Plan"},
+    }
+
+def test_load_reminder_batch_uses_one_task_query_and_one_email_lookup():
+    now = datetime(2024, 1, 10, 9, 0)
+    users = [
+        {"user_id": "u1", "reminder_time_hours": 24},
+        {"user_id": "u2", "reminder_time_hours": 48},
+        {"user_id": "u3", "reminder_time_hours": 24},
+    ]
+    tasks = [
+        make_task("t1", "u1", now + timedelta(hours=24, minutes=30)),
+        # Inside the page-wide range but outside u1's own window
+        make_task("t2", "u1", now + timedelta(hours=48, minutes=10)),
+        make_task("t3", "u2", now + timedelta(hours=48, minutes=10)),
+    ]
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value.in_.return_value.gte.return_value.lt.return_value.neq.return_value.order.return_value.range.return_value
+    query.execute.return_value.data = tasks
+    supabase.rpc.return_value.execute.return_value.data = [
+        {"id": "u1", "email": "u1@example.com"},
+        {"id": "u2", "email": "u2@example.com"},
+    ]
+    user_email_resolver.clear()
+
+    batch = load_reminder_batch(supabase, users, now)
+
+    assert supabase.table.call_count == 1
+    supabase.rpc.assert_called_once_with("get_user_emails", {"user_ids": ["u1", "u2"]})
+    by_user = {u["user_id"]: u for u in batch}
+    assert [t["id"] for t in by_user["u1"]["tasks"]] == ["t1"]
+    assert [t["id"] for t in by_user["u2"]["tasks"]] == ["t3"]
+    assert by_user["u3"]["tasks"] == []
+    assert by_user["u1"]["email"] == "u1@example.com"
+
+def test_fetch_due_tasks_chunks_user_ids():
+    now = datetime(2024, 1, 10, 9, 0)
+    user_ids = [f"u{i}" for i in range(USER_ID_CHUNK_SIZE * 2 + 5)]
+    supabase = MagicMock()
+    in_ = supabase.table.return_value.select.return_value.in_
+    query = in_.return_value.gte.return_value.lt.return_value.neq.return_value.order.return_value.range.return_value
+    query.execute.side_effect = [
+        MagicMock(data=[make_task("t1", "u1", now)]),
+        MagicMock(data=[]),
+        MagicMock(data=[make_task("t2", "u200", now)]),
+    ]
+
+    tasks = fetch_due_tasks_for_users(supabase, user_ids, now, now + timedelta(days=1))
+
+    assert [len(call.args[1]) for call in in_.call_args_list] == [USER_ID_CHUNK_SIZE, USER_ID_CHUNK_SIZE, 5]
+    assert [t["id"] for t in tasks] == ["t1", "t2"]
+
+def test_load_reminder_batch_classifies_overdue_and_high_priority():
+    now = datetime(2024, 1, 10, 9, 0)
+    users = [{"user_id": "u1", "reminder_time_hours": 24}]
+    tasks = [
+        make_task("due", "u1", now + timedelta(hours=24, minutes=30)),
+        make_task("late", "u1", now - timedelta(days=1)),
+        make_task("urgent", "u1", now + timedelta(hours=30), priority="high"),
+        make_task("later", "u1", now + timedelta(hours=30)),
+    ]
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value.in_.return_value.gte.return_value.lt.return_value.neq.return_value.order.return_value.range.return_value
+    query.execute.return_value.data = tasks
+    supabase.rpc.return_value.execute.return_value.data = [{"id": "u1", "email": "u1@example.com"}]
+    user_email_resolver.clear()
+
+    user = load_reminder_batch(supabase, users, now)[0]
+
+    assert [t["id"] for t in user["tasks"]] == ["due"]
+    assert [t["id"] for t in user["overdue_tasks"]] == ["late"]
+    assert [t["id"] for t in user["high_priority_tasks"]] == ["urgent"]
+
+def test_coalescer_sends_individual_reminders_for_few_items():
+    now = datetime(2024, 1, 10, 9, 0)
+    due = [make_task("t1", "u1", now), make_task("t2", "u1", now)]
+
+    emails = ReminderCoalescer(individual_max=2).build_emails("u1@example.com", due, [], [])
+
+    assert [e["template_name"] for e in emails] == ["task_reminder.html", "task_reminder.html"]
+
+def test_coalescer_sends_one_digest_for_many_or_overdue_items():
+    now = datetime(2024, 1, 10, 9, 0)
+    due = [make_task(f"t{i}", "u1", now) for i in range(3)]
+    coalescer = ReminderCoalescer(individual_max=2)
+
+    emails = coalescer.build_emails("u1@example.com", due, [], [])
+    assert len(emails) == 1
+    assert emails[0]["template_name"] == "due_soon.html"
+    assert len(emails[0]["context"]["tasks"]) == 3
+    assert emails[0]["subject"] == "Heads Up: 3 Tasks Due Soon"
+
+    late = [make_task("late", "u1", now - timedelta(days=1))]
+    emails = coalescer.build_emails("u1@example.com", due[:1], late, [])
+    assert len(emails) == 1
+    assert emails[0]["template_name"] == "overdue.html"
+    assert emails[0]["context"]["due_soon_tasks"] == due[:1]
+    assert emails[0]["subject"] == "Action Required: 1 Overdue Task"
+
+def test_email_resolver_caches_lookups():
+    resolver = UserEmailResolver()
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value.data = [{"id": "u1", "email": "u1@example.com"}]
+
+    assert resolver.resolve_many(supabase, ["u1"]) == {"u1": "u1@example.com"}
+    assert resolver.resolve_many(supabase, ["u1"]) == {"u1": "u1@example.com"}
+    supabase.rpc.assert_called_once()
+
+def test_digest_day_of_week_counts_from_sunday():
+    assert digest_day_of_week(datetime(2024, 1, 7)) == 0  # Sunday
+    assert digest_day_of_week(datetime(2024, 1, 13)) == 6  # Saturday
+
+def test_load_digest_batch_uses_one_stats_query_for_the_page():
+    now = datetime(2024, 1, 10, 9, 0)
+    users = [{"user_id": "u1"}, {"user_id": "u2"}]
+    supabase = MagicMock()
+    supabase.rpc.side_effect = lambda name, params: {
+        "get_weekly_digest_stats": MagicMock(**{"execute.return_value.data": [{
+            "user_id": "u1", "completed_this_week": 3, "upcoming": 1, "overdue": 2,
+            "hours_remaining": 7.25, "cost_remaining": 40, "active_plans": 1,
+            "total_tasks": 8, "completed_tasks": 6,
+        }]}),
+        "get_user_emails": MagicMock(**{"execute.return_value.data": [{"id": "u1", "email": "u1@example.com"}]}),
+    }[name]
+    query = supabase.table.return_value.select.return_value.in_.return_value.gte.return_value.lt.return_value.neq.return_value.order.return_value.range.return_value
+    query.execute.return_value.data = [
+        make_task("t2", "u1", now + timedelta(days=3)),
+        make_task("t1", "u1", now + timedelta(days=1)),
+    ]
+    user_email_resolver.clear()
+
+    batch = load_digest_batch(supabase, users, now)
+
+    assert supabase.table.call_count == 1
+    by_user = {u["user_id"]: u for u in batch}
+    assert by_user["u1"]["stats"]["completed_tasks"] == 3
+    assert by_user["u1"]["stats"]["completion_rate"] == 75
+    assert by_user["u1"]["stats"]["hours_remaining"] == 7.2
+    assert [t["id"] for t in by_user["u1"]["upcoming_tasks"]] == ["t1", "t2"]
+    assert by_user["u2"]["stats"]["completed_tasks"] == 0
+    assert by_user["u2"]["email"] is None
+
+@patch("services.scheduler_service.get_supabase_client")
+@patch("services.scheduler_service.scheduler")
+@patch("services.scheduler_service.build_fanout_executor")
+def test_new_leader_resumes_interrupted_jobs_now(mock_build, mock_scheduler, mock_get_supabase):
+    mock_build.side_effect = lambda supabase, job_id: MagicMock(**{
+        "has_interrupted_run.return_value": job_id == "daily_reminders",
+    })
+
+    asyncio.run(resume_interrupted_jobs())
+
+    mock_scheduler.get_job.assert_called_once_with("daily_reminders")
+    assert "next_run_time" in mock_scheduler.get_job.return_value.modify.call_args.kwargs
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from services.subtask_draft_service import SubtaskDraftService, source_hash
+from services.llm_gateway import BACKGROUND
+
+TASKS = [
+    {"id": "task-3", "plan_id": "plan-1", "title": "Pack", "description": None, "order": 3},
+    {"id": "task-1", "plan_id": "plan-1", "title": "Book flights", "description": "Round trip", "order": 1},
+    {"id": "task-2", "plan_id": "plan-1", "title": "Find a hotel", "description": "", "order": 2},
+]
+SUBTASKS = [{"title": "Search flights"}]
+
+
+def _draft(hash_value, age_hours=1):
+    created_at = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).isoformat()
+    return {"subtasks": SUBTASKS, "source_hash": hash_value, "created_at": created_at}
+
+
+def _supabase(draft=None, updated=True):
+    supabase = MagicMock()
+    table = supabase.table.return_value
+    table.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = [draft] if draft else []
+    table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{}] if updated else []
+    return supabase, table
+
+
+@patch("services.subtask_draft_service.generate_subtasks_batch")
+def test_speculate_drafts_the_first_tasks_in_the_background_lane(mock_batch):
+    mock_batch.return_value = {
+        "task-1": SUBTASKS,
+        # The model failed on this one; its fallback steps are not stored
+        "task-2": [
+            {"title": "Step 1: Start with find a hotel", "description": "Begin working on this task"},
+            {"title": "Step 2: Gather required information and resources", "description": "Collect everything needed"},
+            {"title": "Step 3: Execute the main action", "description": "Complete the core part of the task"},
+            {"title": "Step 4: Verify and finalize", "description": "Review and confirm completion"},
+        ],
+    }
+    supabase, table = _supabase()
+    drafts = SubtaskDraftService(enabled=True, max_tasks=2)
+
+    assert drafts.speculate(supabase, TASKS) == 1
+
+    assert [task["id"] for task in mock_batch.call_args.args[0]] == ["task-1", "task-2"]
+    assert mock_batch.call_args.kwargs["lane"] == BACKGROUND
+    rows = table.upsert.call_args.args[0]
+    assert rows == [{
+        "task_id": "task-1",
+        "plan_id": "plan-1",
+        "subtasks": SUBTASKS,
+        "source_hash": source_hash("Book flights", "Round trip"),
+        "status": "ready",
+    }]
+
+
+@patch("services.subtask_draft_service.generate_subtasks_batch")
+def test_speculation_is_off_by_default(mock_batch):
+    supabase, _ = _supabase()
+    assert SubtaskDraftService().speculate(supabase, TASKS) == 0
+    mock_batch.assert_not_called()
+
+
+def test_take_does_not_query_when_speculation_is_off():
+    supabase, _ = _supabase(_draft(source_hash("Book flights", "Round trip")))
+    drafts = SubtaskDraftService()
+
+    assert drafts.take(supabase, "task-1", "Book flights", "Round trip") is None
+    supabase.table.assert_not_called()
+    assert drafts.misses == 0
+
+
+def test_take_serves_a_fresh_matching_draft():
+    supabase, table = _supabase(_draft(source_hash("Book flights", "Round trip")))
+    drafts = SubtaskDraftService(enabled=True)
+
+    assert drafts.take(supabase, "task-1", "Book flights", "Round trip") == SUBTASKS
+    assert table.update.call_args.args[0]["status"] == "used"
+    assert drafts.hits == 1
+
+
+def test_take_reads_postgrest_timestamps():
+    draft = _draft(source_hash("Book flights", "Round trip"))
+    draft["created_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.12345+00:00")
+    supabase, _ = _supabase(draft)
+
+    assert SubtaskDraftService(enabled=True).take(supabase, "task-1", "Book flights", "Round trip") == SUBTASKS
+
+
+def test_take_discards_stale_or_expired_drafts():
+    drafts = SubtaskDraftService(enabled=True, ttl_hours=24)
+
+    supabase, table = _supabase(_draft(source_hash("Book flights", "Round trip")))
+    assert drafts.take(supabase, "task-1", "Book train tickets", "Round trip") is None
+    assert table.update.call_args.args[0]["status"] == "discarded"
+
+    supabase, table = _supabase(_draft(source_hash("Book flights", "Round trip"), age_hours=30))
+    assert drafts.take(supabase, "task-1", "Book flights", "Round trip") is None
+    assert table.update.call_args.args[0]["status"] == "discarded"
+
+    # Another request used it first
+    supabase, _ = _supabase(_draft(source_hash("Book flights", "Round trip")), updated=False)
+    assert drafts.take(supabase, "task-1", "Book flights", "Round trip") is None
+    assert drafts.stats([], 0.0)["misses"] == 3
+
+
+def test_stats_report_use_rate_and_wasted_spend():
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"status": "used", "created_at": now.isoformat()},
+        {"status": "used", "created_at": now.isoformat()},
+        {"status": "discarded", "created_at": now.isoformat()},
+        {"status": "ready", "created_at": (now - timedelta(hours=48)).isoformat()},  # expired
+        {"status": "ready", "created_at": now.isoformat()},
+    ]
+    stats = SubtaskDraftService(enabled=True, ttl_hours=24).stats(rows, spend_usd=0.05)
+
+    assert (stats["generated"], stats["used"], stats["wasted"], stats["pending"]) == (5, 2, 2, 1)
+    assert stats["use_rate"] == 0.4
+    assert stats["wasted_spend_usd"] == 0.02
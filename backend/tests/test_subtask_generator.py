@@ -0,0 +1,90 @@
+import json
+from unittest.mock import MagicMock, patch
+from services.subtask_generator import generate_subtasks_batch, build_subtask_rows
+from services.chat_suggestion_service import _handle_breakdown_action
+
+TASK_A = "11111111-1111-1111-1111-111111111111"
+TASK_B = "22222222-2222-2222-2222-222222222222"
+TASKS = [
+    {"id": TASK_A, "title": "Book flights", "description": "Round trip to Tokyo"},
+    {"id": TASK_B, "title": "Find a hotel", "description": None},
+]
+
+
+def _completion(payload):
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=json.dumps(payload)))]
+    return response
+
+
+@patch("services.subtask_generator.llm_gateway")
+def test_batch_is_one_call_keyed_by_task_number(mock_gateway):
+    mock_gateway.create_chat_completion.return_value = _completion({"tasks": [
+        {"task": 2, "subtasks": [{"title": "Compare hotels near Shinjuku"}]},
+        {"task": 1, "subtasks": [{"title": "Search flights", "description": "Use Google Flights"}]},
+    ]})
+
+    result = generate_subtasks_batch(TASKS, batch_size=5)
+
+    assert mock_gateway.create_chat_completion.call_count == 1
+    assert result[TASK_A] == [{"title": "Search flights", "description": "Use Google Flights"}]
+    assert result[TASK_B] == [{"title": "Compare hotels near Shinjuku"}]
+    # Static instructions lead, the task list follows
+    messages = mock_gateway.create_chat_completion.call_args.kwargs["messages"]
+    assert messages[0]["role"] == "system"
+    assert "1. Task: Book flights" in messages[-1]["content"]
+
+
+@patch("services.subtask_generator.llm_gateway")
+def test_missing_or_failed_tasks_fall_back(mock_gateway):
+    mock_gateway.create_chat_completion.return_value = _completion({"tasks": [
+        {"task": 1, "subtasks": [{"title": "Search flights"}]},
+        {"task": 7, "subtasks": [{"title": "Not a task"}]},
+    ]})
+    result = generate_subtasks_batch(TASKS)
+    assert result[TASK_A] == [{"title": "Search flights"}]
+    assert len(result[TASK_B]) == 4
+
+    mock_gateway.create_chat_completion.side_effect = ValueError("bad json")
+    result = generate_subtasks_batch(TASKS)
+    assert set(result) == {TASK_A, TASK_B}
+
+
+@patch("services.subtask_generator.llm_gateway")
+def test_large_batches_are_split_into_chunks(mock_gateway):
+    mock_gateway.create_chat_completion.return_value = _completion({"tasks": [
+        {"task": 1, "subtasks": [{"title": "Step"}]},
+        {"task": 2, "subtasks": [{"title": "Step"}]},
+    ]})
+    tasks = [{"id": str(i), "title": f"Task {i}"} for i in range(5)]
+
+    result = generate_subtasks_batch(tasks, batch_size=2)
+
+    assert mock_gateway.create_chat_completion.call_count == 3
+    assert set(result) == {str(i) for i in range(5)}
+
+
+def test_build_subtask_rows_orders_and_limits():
+    rows = build_subtask_rows({TASK_A: [{"title": "One"}, {"title": ""}, {"title": "Two"}, {"title": "Three"}]}, max_per_task=2)
+    assert [(row["title"], row["order"], row["status"]) for row in rows] == [("One", 0, "pending"), ("Two", 1, "pending")]
+
+
+@patch("services.chat_suggestion_service.generate_subtasks_batch")
+def test_breakdown_action_uses_one_query_and_one_insert(mock_batch):
+    mock_batch.return_value = {
+        TASK_A: [{"title": "<b>Search flights</b>"}],
+        TASK_B: [{"title": "Compare hotels", "description": "Near the station"}],
+    }
+    supabase = MagicMock()
+    tasks_table = MagicMock()
+    subtasks_table = MagicMock()
+    supabase.table.side_effect = lambda name: {"tasks": tasks_table, "subtasks": subtasks_table}[name]
+    tasks_table.select.return_value.in_.return_value.eq.return_value.execute.return_value.data = TASKS
+
+    _handle_breakdown_action({"plan_id": "plan-1", "related_task_ids": [TASK_A, TASK_B, "not-a-uuid", TASK_A]}, supabase)
+
+    tasks_table.select.return_value.in_.assert_called_once_with("id", [TASK_A, TASK_B])
+    mock_batch.assert_called_once_with(TASKS)
+    subtasks_table.insert.assert_called_once()
+    rows = subtasks_table.insert.call_args.args[0]
+    assert [(row["task_id"], row["title"]) for row in rows] == [(TASK_A, "Search flights"), (TASK_B, "Compare hotels")]
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from services.suggestion_refresh_service import SuggestionRefresher, content_hash
+from services.llm_gateway import LLMOverloadedError
+from services.llm_metering import current_llm_user
+
+PLAN = {"id": "plan-1", "title": "Trip", "description": "Japan", "tasks": [
+    {"id": "t1", "title": "Book flights", "status": "pending", "order": 1},
+    {"id": "t2", "title": "Find a hotel", "status": "pending", "order": 2},
+]}
+
+
+def _supabase(state=None):
+    supabase = MagicMock()
+    plans, states = MagicMock(), MagicMock()
+    supabase.table.side_effect = lambda name: {"plans": plans, "suggestion_refresh_state": states}[name]
+    plans.select.return_value.eq.return_value.execute.return_value.data = [PLAN]
+    states.select.return_value.eq.return_value.execute.return_value.data = [state] if state else []
+    return supabase, states
+
+
+def test_burst_of_changes_is_debounced():
+    refresher = SuggestionRefresher(quiet_seconds=30, max_delay_seconds=300)
+    for second in (0, 10, 20):
+        refresher.mark_dirty("plan-1", "user-1", now=second)
+
+    assert refresher.due(now=45) == []
+    assert refresher.due(now=50) == [("plan-1", "user-1", False)]
+    assert refresher.pending == 0
+
+
+def test_constant_edits_refresh_after_max_delay_and_forced_runs_next_check():
+    refresher = SuggestionRefresher(quiet_seconds=30, max_delay_seconds=60)
+    for second in range(0, 60, 10):
+        refresher.mark_dirty("plan-1", "user-1", now=second)
+    assert refresher.due(now=60) == [("plan-1", "user-1", False)]
+
+    refresher.mark_dirty("plan-2", "user-1", force=True, now=100)
+    assert refresher.due(now=100) == [("plan-2", "user-1", True)]
+
+
+def test_content_hash_ignores_task_order_in_the_response():
+    reordered = list(reversed(PLAN["tasks"]))
+    assert content_hash(PLAN, PLAN["tasks"]) == content_hash(PLAN, reordered)
+    changed = [dict(PLAN["tasks"][0], status="completed"), PLAN["tasks"][1]]
+    assert content_hash(PLAN, PLAN["tasks"]) != content_hash(PLAN, changed)
+
+
+@patch("services.suggestion_refresh_service.generate_proactive_suggestions")
+def test_refresh_skips_unchanged_plans(mock_generate):
+    old = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    supabase, states = _supabase({"content_hash": content_hash(PLAN, PLAN["tasks"]), "refreshed_at": old})
+
+    assert SuggestionRefresher().refresh(supabase, "plan-1", "user-1") is None
+    mock_generate.assert_not_called()
+
+    # Forced refreshes run anyway
+    mock_generate.return_value = [{"id": "s1"}]
+    assert SuggestionRefresher().refresh(supabase, "plan-1", "user-1", force=True) == 1
+
+
+@patch("services.suggestion_refresh_service.generate_proactive_suggestions")
+def test_refresh_bills_the_owner_and_stores_the_hash(mock_generate):
+    mock_generate.side_effect = lambda *args: [{"id": "s1"}] if current_llm_user.get() == "user-1" else []
+    supabase, states = _supabase()
+
+    assert SuggestionRefresher().refresh(supabase, "plan-1", "user-1") == 1
+
+    stored = states.upsert.call_args.args[0]
+    assert stored["content_hash"] == content_hash(PLAN, PLAN["tasks"])
+    assert current_llm_user.get() is None
+
+
+def test_shed_refresh_is_retried():
+    refresher = SuggestionRefresher(quiet_seconds=0)
+    refresher.mark_dirty("plan-1", "user-1")
+    with patch.object(refresher, "refresh", side_effect=LLMOverloadedError("gpt-4o-mini", "background", 1.0)):
+        assert asyncio.run(refresher.run_due(MagicMock())) == 1
+    assert refresher.pending == 1
+
+
+@patch("services.suggestion_refresh_service.generate_proactive_suggestions")
+def test_changed_plan_refreshed_moments_ago_is_rescheduled(mock_generate):
+    just_now = datetime.now(timezone.utc).isoformat()
+    supabase, _ = _supabase({"content_hash": "older-content", "refreshed_at": just_now})
+    refresher = SuggestionRefresher(quiet_seconds=30)
+
+    assert refresher.refresh(supabase, "plan-1", "user-1") is None
+    mock_generate.assert_not_called()
+    assert refresher.pending == 1
+
+
+def test_failed_refresh_is_retried():
+    refresher = SuggestionRefresher(quiet_seconds=0)
+    refresher.mark_dirty("plan-1", "user-1")
+    with patch.object(refresher, "refresh", side_effect=RuntimeError("boom")):
+        assert asyncio.run(refresher.run_due(MagicMock())) == 1
+    assert refresher.pending == 1
+
+
+@patch("services.suggestion_refresh_service.generate_proactive_suggestions")
+def test_refresh_reads_postgrest_timestamps(mock_generate):
+    # Five fractional digits, as PostgREST returns when the last digit is 0
+    refreshed_at = (datetime.now(timezone.utc) - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.12345+00:00")
+    supabase, _ = _supabase({"content_hash": "older-content", "refreshed_at": refreshed_at})
+    mock_generate.return_value = [{"id": "s1"}]
+
+    assert SuggestionRefresher().refresh(supabase, "plan-1", "user-1") == 1
@@ -0,0 +1,13 @@
+from datetime import datetime, timedelta, timezone
+from utils.time_helpers import parse_timestamp
+
+
+def test_parse_timestamp_accepts_postgrest_timestamps():
+    expected = datetime(2024, 5, 1, 9, 42, 53, 123450, tzinfo=timezone.utc)
+    assert parse_timestamp("2024-05-01T09:42:53.12345+00:00") == expected
+    assert parse_timestamp("2024-05-01T09:42:53.12345Z") == expected
+    assert parse_timestamp("2024-05-01T11:42:53.1234+02:00") == expected - timedelta(microseconds=50)
+
+
+def test_parse_timestamp_treats_naive_values_as_utc():
+    assert parse_timestamp("2024-05-01T09:42:53") == datetime(2024, 5, 1, 9, 42, 53, tzinfo=timezone.utc)
@@ -0,0 +1,83 @@
+"""
+Train the local plan type classifier
+
+Uses stored plans with a plan_type, the seed examples in
+utils/plan_type_examples.py and PLAN_TYPE_KEYWORDS, and writes the artifact
+the API loads at startup (PLAN_CLASSIFIER_PATH, default
+utils/models/plan_type_classifier.npz):
+    python train_plan_classifier.py [--seed-only] [--eval]
+"""
+
+import argparse
+import random
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import settings
+from utils.plan_classifier import DEFAULT_MODEL_PATH, PlanTypeClassifier, plan_text
+from utils.plan_config import TASK_CATEGORIES, PLAN_TYPE_KEYWORDS
+from utils.plan_type_examples import PLAN_TYPE_EXAMPLES
+
+PAGE_SIZE = 1000
+
+
+def load_stored_plans():
+    from services.supabase_service import get_supabase_client
+
+    supabase = get_supabase_client()
+    examples = []
+    offset = 0
+    while True:
+        rows = supabase.table("plans")\
+            .select("title, description, plan_type")\
+            .not_.is_("plan_type", "null")\
+            .order("id")\
+            .range(offset, offset + PAGE_SIZE - 1)\
+            .execute().data
+        examples += [
+            (row["title"], row.get("description"), row["plan_type"])
+            for row in rows
+            if row["plan_type"] in TASK_CATEGORIES
+        ]
+        if len(rows) < PAGE_SIZE:
+            return examples
+        offset += PAGE_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed-only", action="store_true", help="Train on the seed examples only")
+    parser.add_argument("--eval", action="store_true", help="Report accuracy on a 20%% holdout first")
+    parser.add_argument("--output", default=settings.plan_classifier_path or DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    # Seed examples, plus each fallback keyword as a one-word example
+    examples = list(PLAN_TYPE_EXAMPLES) + [
+        (word, None, plan_type) for plan_type, words in PLAN_TYPE_KEYWORDS.items() for word in words
+    ]
+    if not args.seed_only:
+        stored = load_stored_plans()
+        print(f"Loaded {len(stored)} stored plans")
+        examples += stored
+
+    if args.eval:
+        shuffled = examples[:]
+        random.Random(0).shuffle(shuffled)
+        split = int(len(shuffled) * 0.8)
+        train, test = shuffled[:split], shuffled[split:]
+        model = PlanTypeClassifier.fit([plan_text(t, d) for t, d, _ in train], [label for _, _, label in train])
+        correct = sum(model.predict(plan_text(t, d))[0] == label for t, d, label in test)
+        print(f"Holdout accuracy: {correct}/{len(test)} ({correct / max(len(test), 1):.0%})")
+
+    model = PlanTypeClassifier.fit([plan_text(t, d) for t, d, _ in examples], [label for _, _, label in examples])
+    model.save(args.output)
+
+    start = time.perf_counter()
+    PlanTypeClassifier.load(args.output)
+    print(f"Wrote {args.output} ({len(examples)} examples, loads in {(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
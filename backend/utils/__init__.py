@@ -4,7 +4,7 @@ Utility functions for the planGenie backend.
 
 from .plan_config import SYSTEM_PROMPT, TASK_CATEGORIES
 from .json_helpers import clean_json_response, validate_plan_structure
-from .prompt_builder import determine_plan_type, build_plan_prompt
+from .prompt_builder import determine_plan_type, build_plan_prompt, build_plan_messages
 
 __all__ = [
     "SYSTEM_PROMPT",
@@ -13,4 +13,5 @@ __all__ = [
     "validate_plan_structure",
     "determine_plan_type",
     "build_plan_prompt",
+    "build_plan_messages",
 ]
@@ -0,0 +1,114 @@
+"""
+Local plan type classifier.
+Multinomial naive Bayes over hashed word unigrams and bigrams, trained from
+stored plans and their plan_type (see train_plan_classifier.py). The model
+is a small .npz artifact that loads in a few milliseconds and classifies in
+microseconds, so the LLM is only needed for low-confidence plans.
+"""
+
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "plan_type_classifier.npz")
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Function words appear in every type of plan; leaving them out sharpens the counts
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "by", "from", "into",
+    "my", "our", "your", "we", "i", "me", "it", "is", "be", "get", "plan", "this", "that", "up",
+}
+
+
+def _features(text: str, n_features: int) -> List[int]:
+    """Hashed unigram and bigram ids (crc32, so ids are stable across processes)"""
+    words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return [zlib.crc32(gram.encode()) % n_features for gram in grams]
+
+
+def plan_text(title: str, description: Optional[str]) -> str:
+    return f"{title} {description or ''}"
+
+
+class PlanTypeClassifier:
+    """
+    Hashed n-gram naive Bayes classifier
+
+    Usage:
+        classifier = PlanTypeClassifier.load(path)
+        plan_type, confidence = classifier.predict(plan_text(title, description))
+    """
+
+    def __init__(self, classes: Sequence[str], log_prior: np.ndarray, feature_log_prob: np.ndarray):
+        self.classes = list(classes)
+        self.log_prior = log_prior.astype(np.float32)
+        # classes x n_features
+        self.feature_log_prob = feature_log_prob.astype(np.float32)
+        self.n_features = feature_log_prob.shape[1]
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Iterable[str],
+        labels: Iterable[str],
+        n_features: int = 2 ** 14,
+        alpha: float = 0.5,
+    ) -> "PlanTypeClassifier":
+        texts, labels = list(texts), list(labels)
+        classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(classes)}
+        counts = np.zeros((len(classes), n_features), dtype=np.float64)
+        class_counts = np.zeros(len(classes), dtype=np.float64)
+        for text, label in zip(texts, labels):
+            row = class_index[label]
+            class_counts[row] += 1
+            np.add.at(counts[row], _features(text, n_features), 1)
+
+        smoothed = counts + alpha
+        feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        # Words never seen in training say nothing about the type; score them neutrally
+        feature_log_prob[:, counts.sum(axis=0) == 0] = 0.0
+        log_prior = np.log(class_counts / class_counts.sum())
+        return cls(classes, log_prior, feature_log_prob)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        scores = self.log_prior.copy()
+        features = _features(text, self.n_features)
+        if features:
+            scores += self.feature_log_prob[:, features].sum(axis=1)
+        scores = np.exp(scores - scores.max())
+        scores /= scores.sum()
+        return {label: float(p) for label, p in zip(self.classes, scores)}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely plan type and its probability"""
+        proba = self.predict_proba(text)
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # float16 keeps the artifact small; log-probabilities don't need more precision
+        np.savez_compressed(
+            path,
+            classes=np.array(self.classes),
+            log_prior=self.log_prior.astype(np.float16),
+            feature_log_prob=self.feature_log_prob.astype(np.float16),
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "PlanTypeClassifier":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["classes"]], data["log_prior"], data["feature_log_prob"])
+
+
+def load_plan_classifier(path: Optional[str] = None) -> Optional[PlanTypeClassifier]:
+    """The trained classifier, or None if the artifact is missing or unreadable"""
+    try:
+        return PlanTypeClassifier.load(path or DEFAULT_MODEL_PATH)
+    except Exception as e:
+        print(f"Plan type classifier unavailable, using keyword matching: {e}")
+        return None
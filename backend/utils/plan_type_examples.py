@@ -0,0 +1,86 @@
+"""
+Seed examples for the plan type classifier.
+Used alongside stored plans when training (train_plan_classifier.py), so
+the classifier covers every type even before there is much real data.
+"""
+
+PLAN_TYPE_EXAMPLES = [
+    # travel
+    ("Two weeks in Japan", "Visit Tokyo, Kyoto and Osaka on a mid-range budget", "travel"),
+    ("Summer vacation in Italy", "Rome, Florence and the Amalfi coast with the family", "travel"),
+    ("Weekend trip to Paris", "Museums, cafes and a day at Versailles", "travel"),
+    ("Backpacking Southeast Asia", "Three months through Thailand, Vietnam and Cambodia", "travel"),
+    ("Road trip along the Pacific coast", "Drive from San Francisco to Los Angeles and stay in small towns", "travel"),
+    ("Honeymoon in Bali", "Beach resorts, temples and a cooking class", "travel"),
+    ("Visit my grandparents in Kerala", "Book flights, pack gifts and plan a houseboat day", "travel"),
+    ("Ski holiday in the Alps", "Book a chalet, rent gear and buy lift passes", "travel"),
+    ("Europe by train", "Interrail pass across Germany, Austria and Switzerland", "travel"),
+    ("Business trip to Singapore", "Flights, hotel near the office and visa paperwork", "travel"),
+    ("Camping trip in Yosemite", "Reserve a campsite, plan hikes and pack gear", "travel"),
+    ("Tour of national parks", "Visit Zion, Bryce and the Grand Canyon in one week", "travel"),
+    # learning
+    ("Learn Python", "Go from zero to building small automation scripts", "learning"),
+    ("Learn Spanish in six months", "Reach conversational level for an upcoming move", "learning"),
+    ("Prepare for the GRE", "Study quant and verbal sections and take practice tests", "learning"),
+    ("Master data structures and algorithms", "Study for coding interviews with daily practice", "learning"),
+    ("Learn to play guitar", "Chords, strumming patterns and my first songs", "learning"),
+    ("Get AWS certified", "Study for the Solutions Architect Associate exam", "learning"),
+    ("Take an online course in machine learning", "Finish the course and do the assignments", "learning"),
+    ("Improve my public speaking skills", "Join a club and practice short talks", "learning"),
+    ("Learn watercolor painting", "Basics of brushes, color mixing and landscapes", "learning"),
+    ("Study for final exams", "Revise chemistry, physics and maths with a timetable", "learning"),
+    ("Read 20 books this year", "Build a reading habit and take notes on each book", "learning"),
+    ("Learn to cook Indian food", "Master ten classic recipes and the basic spices", "learning"),
+    # fitness
+    ("Run my first marathon", "Build up mileage over 16 weeks of training", "fitness"),
+    ("Lose 10 kg", "Combine a calorie deficit with strength training", "fitness"),
+    ("Get back into the gym", "Visit the gym three times a week and follow a beginner program", "fitness"),
+    ("Build muscle", "Progressive overload program with a high protein diet", "fitness"),
+    ("Start doing yoga", "Daily morning sessions to improve flexibility", "fitness"),
+    ("Couch to 5K", "Go from no running to a 5K in nine weeks", "fitness"),
+    ("Healthy eating plan", "Meal prep, fewer snacks and track macros", "fitness"),
+    ("Train for a triathlon", "Swim, bike and run sessions for a sprint distance race", "fitness"),
+    ("Improve my sleep and energy", "Consistent bedtime, less caffeine and daily walks", "fitness"),
+    ("Do 50 push-ups in a row", "Progressive push-up workouts over eight weeks", "fitness"),
+    ("Recover from a knee injury", "Physiotherapy exercises and gradual return to running", "fitness"),
+    ("Cut sugar from my diet", "Replace sweets and sugary drinks for 30 days", "fitness"),
+    # project
+    ("Build a personal website", "Portfolio site with a blog, deployed on my own domain", "project"),
+    ("Launch a mobile app", "Develop an iOS and Android habit tracker and publish it", "project"),
+    ("Create a SaaS product", "Build an MVP, get beta users and set up billing", "project"),
+    ("Renovate the kitchen", "New cabinets, countertops and appliances within budget", "project"),
+    ("Write and self-publish a novel", "Finish the draft, edit and publish on Kindle", "project"),
+    ("Start a YouTube channel", "Set up equipment, script and publish weekly videos", "project"),
+    ("Develop an e-commerce store", "Shopify store for handmade candles", "project"),
+    ("Build a home server", "Set up a NAS with backups and media streaming", "project"),
+    ("Open a small bakery", "Business plan, permits, equipment and opening", "project"),
+    ("Migrate our app to the cloud", "Move the backend and database to a managed platform", "project"),
+    ("Build a garden shed", "Design, buy materials and construct the shed", "project"),
+    ("Create a podcast", "Plan episodes, record, edit and publish", "project"),
+    # event
+    ("Plan my wedding", "Venue, catering, guest list and invitations for 120 guests", "event"),
+    ("Organize a birthday party", "Surprise party for my wife's 40th birthday", "event"),
+    ("Host a tech conference", "Two day conference with speakers, sponsors and tickets", "event"),
+    ("Plan a company offsite", "Team building event for 30 people", "event"),
+    ("Throw a baby shower", "Games, decorations and food for 25 guests", "event"),
+    ("Organize a charity fundraiser", "Gala dinner with an auction to raise money", "event"),
+    ("Plan a graduation party", "Backyard celebration with family and friends", "event"),
+    ("Host a meetup", "Monthly developer meetup with talks and pizza", "event"),
+    ("Organize a family reunion", "Gathering of three generations at a lake house", "event"),
+    ("Plan an anniversary dinner", "Restaurant, gift and a surprise for our tenth anniversary", "event"),
+    ("Run a community cleanup day", "Volunteers, supplies and permits for the park cleanup", "event"),
+    ("Organize a holiday party", "Office holiday party with catering and music", "event"),
+    # default
+    ("Get my finances in order", "Budget, pay off credit card debt and start saving", "default"),
+    ("Move to a new apartment", "Find a place, pack and change my address", "default"),
+    ("Declutter my house", "Sort, donate and organize every room", "default"),
+    ("Find a new job", "Update my resume, apply and prepare for interviews", "default"),
+    ("Be more productive", "Better morning routine and fewer distractions", "default"),
+    ("Adopt a dog", "Choose a breed, prepare the home and find a vet", "default"),
+    ("Do my taxes", "Gather documents and file before the deadline", "default"),
+    ("Buy a car", "Compare models, get financing and negotiate", "default"),
+    ("Prepare for a new baby", "Nursery, supplies and parental leave", "default"),
+    ("Plan my retirement savings", "Review accounts and set up contributions", "default"),
+    ("Start journaling", "Write for ten minutes every evening", "default"),
+    ("Organize my digital files", "Clean up photos, documents and backups", "default"),
+]
@@ -1,24 +1,29 @@
 """
 Prompt building utilities for plan generation.
-Handles plan type detection and prompt construction.
+Handles plan type detection (local classifier first, see
+utils/plan_classifier.py) and prompt construction. The instructions,
+examples and schema form a static system message shared by every plan
+request; only the plan details and categories go in the user message.
 """
 
-from typing import Dict
+import re
+from typing import Dict, List
 from openai import OpenAI
-from utils.plan_config import TASK_CATEGORIES, PLAN_TYPE_KEYWORDS
+from config import settings
+from utils.plan_config import SYSTEM_PROMPT, TASK_CATEGORIES, PLAN_TYPE_KEYWORDS
+from utils.prompt_layout import PromptTemplate, FULL, COMPACT
+from services.ai_service import model_for
+from services.llm_gateway import llm_gateway, INTERACTIVE
+from services.monitoring_service import MonitoringService
+from utils.plan_classifier import load_plan_classifier, plan_text
 
+# Loaded once at startup; None if the artifact is missing (keyword matching is used instead)
+plan_classifier = load_plan_classifier(settings.plan_classifier_path)
 
-def determine_plan_type(title: str, description: str, client: OpenAI) -> str:
-    """
-    Determine the plan type using LLM for accurate classification.
-    Falls back to keyword matching if LLM call fails.
-    """
-    try:
-        # Use LLM for intelligent plan type detection
-        classification_prompt = f"""Classify this plan into ONE of these categories: travel, learning, fitness, project, event, or default.
+CLASSIFICATION_PROMPT = PromptTemplate("plan_classification", "2", {
+    FULL: """You are a plan classification expert. Respond with only one word.
 
-Plan Title: {title}
-Plan Description: {description}
+Classify the plan in the user message into ONE of these categories: travel, learning, fitness, project, event, or default.
 
 Respond with ONLY the category name (one word): travel, learning, fitness, project, event, or default.
 
@@ -28,16 +33,32 @@ Guidelines:
 - fitness: workouts, health, diet, exercise programs
 - project: building things, creating products, development work
 - event: planning parties, weddings, conferences, gatherings
-- default: anything that doesn't clearly fit the above
+- default: anything that doesn't clearly fit the above""",
+})
 
-Category:"""
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a plan classification expert. Respond with only one word."},
-                {"role": "user", "content": classification_prompt}
-            ],
+def determine_plan_type(title: str, description: str, client: OpenAI) -> str:
+    """
+    Determine the plan type with the local classifier, asking the LLM only
+    when the classifier isn't confident. Falls back to the classifier's (or
+    keyword) answer if the LLM call fails.
+    """
+    if plan_classifier:
+        plan_type, confidence = plan_classifier.predict(plan_text(title, description))
+        if confidence >= settings.plan_classifier_min_confidence:
+            MonitoringService.track_custom_metric("plan_type_classified", 1, {"source": "local"})
+            return plan_type
+
+    try:
+        # Low confidence: use LLM for intelligent plan type detection
+        response = llm_gateway.create_chat_completion(
+            client,
+            INTERACTIVE,
+            endpoint="plan_classification",
+            model=model_for("plan_classification"),
+            messages=CLASSIFICATION_PROMPT.messages([
+                {"role": "user", "content": f"Plan Title: {title}\nPlan Description: {description}\n\nCategory:"}
+            ]),
             temperature=0.3,
             max_tokens=10,
         )
@@ -47,47 +68,39 @@ Category:"""
         # Validate the response
         valid_types = ["travel", "learning", "fitness", "project", "event", "default"]
         if plan_type in valid_types:
+            MonitoringService.track_custom_metric("plan_type_classified", 1, {"source": "llm"})
             return plan_type
         
-        # If invalid response, fall back to keyword matching
-        print(f"Invalid LLM classification: {plan_type}, falling back to keyword matching")
+        # If invalid response, fall back to local classification
+        print(f"Invalid LLM classification: {plan_type}, falling back to local classification")
         return determine_plan_type_fallback(title, description)
     
     except Exception as e:
-        print(f"LLM classification error: {e}, using keyword fallback")
+        print(f"LLM classification error: {e}, using local fallback")
         return determine_plan_type_fallback(title, description)
 
 
 def determine_plan_type_fallback(title: str, description: str) -> str:
-    """Fallback keyword-based plan type detection."""
-    content = f"{title} {description}".lower()
-    
-    # Find best match
-    for plan_type, words in PLAN_TYPE_KEYWORDS.items():
-        if any(word in content for word in words):
-            return plan_type
-    
-    return "default"
+    """Plan type without the LLM: the local classifier, or keyword matching without a model."""
+    if plan_classifier:
+        return plan_classifier.predict(plan_text(title, description))[0]
 
+    # Type whose keywords match the most whole words
+    words = set(re.findall(r"[a-z]+", f"{title} {description}".lower()))
+    matches = {
+        plan_type: sum(1 for keyword in keywords if keyword in words)
+        for plan_type, keywords in PLAN_TYPE_KEYWORDS.items()
+    }
+    best_count = max(matches.values())
+    best = [plan_type for plan_type, count in matches.items() if count == best_count]
+    # No match, or a tie ("visit the gym"): don't guess between types
+    return best[0] if best_count and len(best) == 1 else "default"
 
-def build_plan_prompt(title: str, description: str, timeline: str = None, plan_type: str = None) -> str:
-    """Build the optimized main prompt for plan generation with AI intelligence metadata."""
-    
-    if plan_type is None:
-        plan_type = "default"
-    
-    categories = TASK_CATEGORIES.get(plan_type, TASK_CATEGORIES["default"])
-    categories_list = ", ".join(categories)
-    
-    timeline_text = f"Timeline: {timeline}" if timeline else "Timeline: Not specified"
-    
-    prompt = f"""Create a detailed, actionable plan with intelligent metadata for:
 
-**Title**: {title}
-**Description**: {description}
-**{timeline_text}**
+PLAN_INSTRUCTIONS = {
+    FULL: """Create a detailed, actionable plan with intelligent metadata for the plan described in the user message.
 
-Generate 8-12 tasks organized into these categories: {categories_list}
+Generate 8-12 tasks organized into the categories listed with the plan.
 
 For each task, provide:
 
@@ -100,7 +113,7 @@ For each task, provide:
    - Important details: costs, tools, timeframes, specific recommendations
    - Pro tip or common pitfall to avoid
 
-3. **Intelligence Metadata** (NEW - REQUIRED):
+3. **Intelligence Metadata** (REQUIRED):
    - **estimated_time_hours**: Realistic time estimate in hours (as decimal, e.g., 2.5 for 2.5 hours)
    - **difficulty**: Rate 1-5 (1=very easy, 2=easy, 3=medium, 4=hard, 5=very hard)
    - **estimated_cost_usd**: Estimated cost in USD (0 if no cost, null if unknown)
@@ -115,7 +128,7 @@ For each task, provide:
    - Make time estimates realistic (consider research, decision-making, execution, and verification time)
 
 EXAMPLE - Enhanced Task:
-{{
+{
     "title": "📋 Planning: Research and compare flight options",
     "description": "Use Google Flights or Skyscanner to compare prices from your departure city. Filter for your preferred dates and set price alerts if costs are above budget. Consider booking 6-8 weeks in advance for best prices (typically $400-700 for domestic, $800-1500 for international). Pro tip: Check prices on Tuesday/Wednesday for potential 10-20% savings.",
     "order": 1,
@@ -125,9 +138,9 @@ EXAMPLE - Enhanced Task:
     "tools_needed": ["Google Flights", "Skyscanner", "Email for alerts"],
     "prerequisites": [],
     "tags": ["research", "online", "price_comparison"]
-}}
+}
 
-{{
+{
     "title": "🎒 Preparation: Book flight tickets",
     "description": "Based on your research, book the best flight option. Have your passport details and payment method ready. Screenshot confirmation and save booking reference. Most airlines allow free cancellation within 24 hours if you change your mind.",
     "order": 4,
@@ -137,7 +150,7 @@ EXAMPLE - Enhanced Task:
     "tools_needed": ["Credit card", "Passport", "Airline website"],
     "prerequisites": [1],
     "tags": ["requires_payment", "online", "booking", "time_sensitive"]
-}}
+}
 
 Also include 6-10 relevant resources with:
 - Specific, useful URLs (actual booking sites, tutorials, tools)
@@ -157,9 +170,9 @@ CRITICAL RULES:
 - MUST respond with valid JSON only - no markdown, no code blocks, no extra text
 
 JSON SCHEMA (respond with ONLY this structure):
-{{
+{
     "tasks": [
-        {{
+        {
             "title": "string with category prefix",
             "description": "string (2-4 sentences)",
             "order": number (1-indexed),
@@ -169,17 +182,72 @@ JSON SCHEMA (respond with ONLY this structure):
             "tools_needed": ["string", "string"],
             "prerequisites": [number, number] (task order numbers),
             "tags": ["string", "string"]
-        }}
+        }
     ],
     "resources": [
-        {{
+        {
             "title": "string",
             "url": "string",
             "type": "link|document|video|other"
-        }}
+        }
     ]
-}}
+}
+
+Respond with valid JSON only.""",
+    COMPACT: """Create an actionable plan for the plan described in the user message.
+
+Generate 8-12 tasks across the listed categories (2-3 each), ordered planning -> preparation -> execution -> review. Each task:
+- title: "[Category Emoji] Category: Specific task name", e.g. "📋 Planning: Research and compare flight options"
+- description: 2-4 sentences with concrete actions, named tools/brands, price ranges and one pro tip
+- order: 1-based
+- estimated_time_hours: realistic decimal hours
+- difficulty: 1-5
+- estimated_cost_usd: 0 if free, null if unknown
+- tools_needed: specific tools/platforms
+- prerequisites: order numbers of tasks to finish first
+- tags: snake_case
+
+Also include 6-10 resources with real, specific URLs (booking sites, guides, tools, communities). No placeholders or "TBD".
 
-Response (valid JSON only):"""
+Respond with valid JSON only:
+{"tasks": [{"title": str, "description": str, "order": int, "estimated_time_hours": float, "difficulty": int, "estimated_cost_usd": float|null, "tools_needed": [str], "prerequisites": [int], "tags": [str]}], "resources": [{"title": str, "url": str, "type": "link|document|video|other"}]}""",
+}
+
+# Bump the version whenever the static text above changes
+PLAN_PROMPT = PromptTemplate(
+    "plan",
+    "2",
+    {variant: f"{SYSTEM_PROMPT}\n\n{instructions}" for variant, instructions in PLAN_INSTRUCTIONS.items()},
+)
+
+
+def build_plan_prompt(title: str, description: str, timeline: str = None, plan_type: str = None) -> str:
+    """Build the request-specific part of the plan prompt (the user message)."""
     
-    return prompt
+    if plan_type is None:
+        plan_type = "default"
+    
+    categories = TASK_CATEGORIES.get(plan_type, TASK_CATEGORIES["default"])
+    categories_list = ", ".join(categories)
+    
+    timeline_text = f"Timeline: {timeline}" if timeline else "Timeline: Not specified"
+    
+    return f"""Categories: {categories_list}
+
+**Title**: {title}
+**Description**: {description}
+**{timeline_text}**"""
+
+
+def build_plan_messages(
+    title: str,
+    description: str,
+    timeline: str = None,
+    plan_type: str = None,
+    variant: str = None,
+) -> List[Dict[str, str]]:
+    """Messages for plan generation: the static plan prompt, then the plan details."""
+    return PLAN_PROMPT.messages(
+        [{"role": "user", "content": build_plan_prompt(title, description, timeline, plan_type)}],
+        variant,
+    )
@@ -0,0 +1,98 @@
+"""
+Prompt layout, versioning and token counting.
+Every prompt is split into a static part (instructions, examples, schema)
+and the per-request part. The static part always comes first and is
+byte-identical across calls, so the provider's prefix cache can reuse it;
+the request-specific content follows in later messages.
+
+Prompts carry a version, bumped whenever their static text changes, and
+come in variants ("full", "compact") selected per prompt via settings.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from config import settings
+from services.monitoring_service import MonitoringService
+
+FULL = "full"
+COMPACT = "compact"
+
+# Chat-format overhead per message and for the reply primer (OpenAI cookbook)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Rough stand-in for a BPE tokenizer: one token per word or punctuation mark
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model, or None if tiktoken or its data is unavailable"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Tokenizer unavailable for {model}, approximating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens in `text` for `model` (approximate if the tokenizer cannot load)"""
+    encoding = _encoding(model or settings.llm_model)
+    if encoding is None:
+        return len(_APPROX_TOKEN.findall(text))
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+    """Prompt tokens for a chat completion request with these messages"""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model) for message in messages
+    )
+
+
+def prompt_variant(name: str) -> str:
+    """Configured variant for a prompt: PROMPT_VARIANTS override, else PROMPT_VARIANT"""
+    return settings.prompt_variants.get(name, settings.prompt_variant)
+
+
+class PromptTemplate:
+    """
+    A versioned prompt whose static system message leads every request
+
+    Usage:
+        messages = PLAN_PROMPT.messages([{"role": "user", "content": request_text}])
+    """
+
+    def __init__(self, name: str, version: str, variants: Dict[str, str]):
+        self.name = name
+        self.version = version
+        self.variants = variants
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}-v{self.version}"
+
+    def static(self, variant: Optional[str] = None) -> str:
+        variant = variant or prompt_variant(self.name)
+        return self.variants.get(variant, self.variants[FULL])
+
+    def messages(
+        self,
+        dynamic: List[Dict[str, str]],
+        variant: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """Static system message first, then the request-specific messages"""
+        variant = variant or prompt_variant(self.name)
+        messages = [{"role": "system", "content": self.static(variant)}, *dynamic]
+        MonitoringService.track_custom_metric(
+            "llm_prompt_tokens",
+            count_message_tokens(messages, model),
+            {"prompt": self.key, "variant": variant},
+        )
+        return messages
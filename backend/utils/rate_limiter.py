@@ -1,49 +1,232 @@
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
-from collections import defaultdict
+"""
+Rate limiting with GCRA (generic cell rate algorithm)
+Each key stores a single float, its theoretical arrival time (TAT), so a
+check is O(1) no matter how many requests a key has made. A key whose TAT is
+in the past is indistinguishable from a new key, which makes idle keys free
+to evict.
+
+Stores:
+- MemoryRateLimitStore: per process, bounded, evicts idle keys
+- SQLiteRateLimitStore: shared by every worker on a host through one SQLite file
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response, status
+from config import settings
+from services.auth_service import get_user_from_token
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the key is back to its full allowance
+    reset_after: float
+    # Seconds until the next request would be allowed (0 when allowed)
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* response headers (plus Retry-After when limited)"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+# decide(stored_tat) -> (tat to store or None to leave unchanged, result)
+Decider = Callable[[Optional[float]], Tuple[Optional[float], RateLimitResult]]
+
+
+class MemoryRateLimitStore:
+    """In-process TAT store, bounded to max_keys and swept of idle keys"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> tat, least recently written first
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def apply(self, key: str, now: float, decide: Decider) -> RateLimitResult:
+        with self._lock:
+            new_tat, result = decide(self._tats.get(key))
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                self._evict(now)
+            return result
+
+    def _evict(self, now: float):
+        # Idle keys collect at the front; drop them until we reach a live one
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[key]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SQLiteRateLimitStore:
+    """TAT store in a SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path: str, sweep_every: int = 1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.execute("create table if not exists rate_limits (key text primary key, tat real not null)")
+
+    def apply(self, key: str, now: float, decide: Decider) -> RateLimitResult:
+        with self._lock:
+            # Immediate transaction: other processes wait instead of racing the read-modify-write
+            self._conn.execute("begin immediate")
+            try:
+                row = self._conn.execute("select tat from rate_limits where key = ?", (key,)).fetchone()
+                new_tat, result = decide(row[0] if row else None)
+                if new_tat is not None:
+                    self._conn.execute(
+                        "insert into rate_limits (key, tat) values (?, ?) "
+                        "on conflict(key) do update set tat = excluded.tat",
+                        (key, new_tat),
+                    )
+                    self._writes += 1
+                    if self._writes % self.sweep_every == 0:
+                        self._conn.execute("delete from rate_limits where tat <= ?", (now,))
+                self._conn.execute("commit")
+            except Exception:
+                self._conn.execute("rollback")
+                raise
+            return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("select count(*) from rate_limits").fetchone()[0]
+
 
 class RateLimiter:
-    """Simple in-memory rate limiter for suggestion generation."""
-    
-    def __init__(self):
-        # Structure: {(user_id, plan_id): [(timestamp, count)]}
-        self._requests: Dict[Tuple[str, str], list] = defaultdict(list)
-        self.max_requests = 5
-        self.window_hours = 1
-    
+    """
+    Allow `limit` requests per `period_seconds` per key, with bursts up to `limit`
+
+    Usage:
+        limiter = RateLimiter("suggestions", limit=5, period_seconds=3600)
+        result = limiter.hit("user-1:plan-1")
+        if not result.allowed: ...
+    """
+
+    def __init__(self, name: str, limit: int, period_seconds: float, store=None):
+        self.name = name
+        self.limit = limit
+        self.period_seconds = period_seconds
+        # One request's worth of time
+        self.interval = period_seconds / limit
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    def _remaining(self, now: float, tat: float) -> int:
+        # Small epsilon guards against float error right at a boundary
+        return max(0, int((now + self.period_seconds - tat) / self.interval + 1e-9))
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitResult:
+        """Count a request against `key` if it is allowed"""
+        now = time.time() if now is None else now
+
+        def decide(stored_tat: Optional[float]):
+            tat = now if stored_tat is None else max(stored_tat, now)
+            new_tat = tat + self.interval
+            if new_tat - now > self.period_seconds:
+                return None, RateLimitResult(
+                    allowed=False,
+                    limit=self.limit,
+                    remaining=0,
+                    reset_after=tat - now,
+                    retry_after=new_tat - self.period_seconds - now,
+                )
+            return new_tat, RateLimitResult(
+                allowed=True,
+                limit=self.limit,
+                remaining=self._remaining(now, new_tat),
+                reset_after=new_tat - now,
+                retry_after=0,
+            )
+
+        return self.store.apply(f"{self.name}:{key}", now, decide)
+
+    def peek(self, key: str, now: Optional[float] = None) -> RateLimitResult:
+        """Current state of `key` without counting a request"""
+        now = time.time() if now is None else now
+
+        def decide(stored_tat: Optional[float]):
+            tat = now if stored_tat is None else max(stored_tat, now)
+            remaining = self._remaining(now, tat)
+            return None, RateLimitResult(
+                allowed=remaining > 0,
+                limit=self.limit,
+                remaining=remaining,
+                reset_after=tat - now,
+                retry_after=0 if remaining > 0 else tat + self.interval - self.period_seconds - now,
+            )
+
+        return self.store.apply(f"{self.name}:{key}", now, decide)
+
+    # Per user/plan helpers used by the suggestion endpoint
+
     def is_allowed(self, user_id: str, plan_id: str) -> bool:
         """Check if request is allowed based on rate limit."""
-        key = (user_id, plan_id)
-        now = datetime.now()
-        cutoff = now - timedelta(hours=self.window_hours)
-        
-        # Clean old requests
-        self._requests[key] = [
-            ts for ts in self._requests[key] 
-            if ts > cutoff
-        ]
-        
-        # Check limit
-        if len(self._requests[key]) >= self.max_requests:
-            return False
-        
-        # Add new request
-        self._requests[key].append(now)
-        return True
-    
+        return self.hit(f"{user_id}:{plan_id}").allowed
+
     def get_remaining(self, user_id: str, plan_id: str) -> int:
         """Get remaining requests for this user/plan."""
-        key = (user_id, plan_id)
-        now = datetime.now()
-        cutoff = now - timedelta(hours=self.window_hours)
-        
-        # Clean old requests
-        self._requests[key] = [
-            ts for ts in self._requests[key] 
-            if ts > cutoff
-        ]
-        
-        return max(0, self.max_requests - len(self._requests[key]))
-
-# Global instance
-suggestion_rate_limiter = RateLimiter()
+        return self.peek(f"{user_id}:{plan_id}").remaining
+
+
+def rate_limit(limiter: RateLimiter, key_func: Optional[Callable[[Request, str], str]] = None):
+    """
+    FastAPI dependency enforcing `limiter` per user (or per key_func(request, user_id))
+
+    Usage:
+        @router.post("/...", dependencies=[Depends(rate_limit(chat_rate_limiter))])
+    """
+    # Sync on purpose: FastAPI runs it in the threadpool, so store I/O never blocks the loop
+    def dependency(request: Request, response: Response, user_id: str = Depends(get_user_from_token)):
+        key = key_func(request, user_id) if key_func else user_id
+        result = limiter.hit(key)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded. Try again in {math.ceil(result.retry_after)} seconds.",
+                headers=result.headers(),
+            )
+        response.headers.update(result.headers())
+
+    return dependency
+
+
+def build_rate_limit_store():
+    """Store for the configured RATE_LIMIT_BACKEND"""
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteRateLimitStore(settings.rate_limit_sqlite_path)
+    return MemoryRateLimitStore()
+
+# Global instances (sharing one store)
+rate_limit_store = build_rate_limit_store()
+suggestion_rate_limiter = RateLimiter("suggestions", limit=5, period_seconds=3600, store=rate_limit_store)
+chat_rate_limiter = RateLimiter(
+    "chat", limit=settings.chat_rate_limit_per_minute, period_seconds=60, store=rate_limit_store
+)
+plan_generation_rate_limiter = RateLimiter(
+    "plan_generation", limit=settings.plan_generation_rate_limit_per_hour, period_seconds=3600, store=rate_limit_store
+)
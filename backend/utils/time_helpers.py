@@ -0,0 +1,22 @@
+"""
+Timestamp parsing utilities.
+Functions for reading timestamptz values returned by Supabase (PostgREST).
+"""
+
+import re
+from datetime import datetime, timezone
+
+_FRACTION = re.compile(r"\.(\d+)")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse a timestamptz as returned by PostgREST (e.g. 2024-05-01T09:42:53.12345+00:00)
+
+    fromisoformat before Python 3.11 rejects a trailing Z and fractions that
+    are not 3 or 6 digits. Naive values are taken as UTC.
+    """
+    value = value.replace("Z", "+00:00")
+    value = _FRACTION.sub(lambda match: "." + match.group(1)[:6].ljust(6, "0"), value, count=1)
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)